@@ -0,0 +1,154 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+from lectura_adc import lecturas_humedad
+from models import MacetaConfig, SensorHumedadConfig
+from planificador_dht import PlanificadorDHT
+
+if TYPE_CHECKING:
+    from hardware import HardwareManager
+
+
+class MotorAdquisicion:
+    def __init__(
+        self,
+        hw: "HardwareManager",
+        max_hilos: int = 4,
+        modo_lectura_adc: str = "canal",
+        planificador_dht: Optional[PlanificadorDHT] = None
+    ):
+        self.hw = hw
+        self.modo_lectura_adc = modo_lectura_adc
+        self.planificador_dht = planificador_dht
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_hilos,
+            thread_name_prefix="adquisicion"
+        )
+
+    def leer_maceta(self, maceta: MacetaConfig) -> Dict[str, Optional[float]]:
+        vectores_adc = self._lanzar_lecturas_adc([maceta])
+        return self._armar_lecturas(maceta, self._lanzar_lecturas(maceta, vectores_adc))
+
+    def leer_macetas(
+        self,
+        macetas: Dict[str, MacetaConfig]
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        # Primero se lanzan las lecturas de todas las macetas y despues se esperan,
+        # asi el ciclo dura lo que el sensor mas lento y no la suma de todos
+        vectores_adc = self._lanzar_lecturas_adc(macetas.values())
+        pendientes = {
+            nombre_maceta: self._lanzar_lecturas(maceta, vectores_adc)
+            for nombre_maceta, maceta in macetas.items()
+        }
+
+        return {
+            nombre_maceta: self._armar_lecturas(macetas[nombre_maceta], futuros)
+            for nombre_maceta, futuros in pendientes.items()
+        }
+
+    def _lanzar_lecturas_adc(self, macetas: Iterable[MacetaConfig]) -> Dict[str, Future]:
+        # En modo rafaga cada ADC se lee una sola vez por ciclo y el vector de
+        # canales se reparte entre todas las macetas que lo comparten
+        if self.modo_lectura_adc != "rafaga":
+            return {}
+
+        vectores = {}
+        for maceta in macetas:
+            for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+                if sensor.enabled and sensor.adc not in vectores:
+                    vectores[sensor.adc] = self.executor.submit(
+                        self.hw.leer_adc_muestreo,
+                        sensor.adc
+                    )
+
+        return vectores
+
+    def _lanzar_lecturas(
+        self,
+        maceta: MacetaConfig,
+        vectores_adc: Dict[str, Future]
+    ) -> Dict[str, Tuple[Future, Optional[int]]]:
+        futuros = {}
+
+        if maceta.sensor_humedad_1.enabled:
+            futuros["humedad_1"] = self._lanzar_humedad(maceta.sensor_humedad_1, vectores_adc)
+
+        if maceta.sensor_humedad_2.enabled:
+            futuros["humedad_2"] = self._lanzar_humedad(maceta.sensor_humedad_2, vectores_adc)
+
+        if maceta.bh1750.enabled:
+            futuros["lux"] = (self.executor.submit(self.hw.leer_lux, maceta.nombre), None)
+
+        if maceta.dht.enabled:
+            futuros["dht"] = (self._lanzar_dht(maceta.nombre), None)
+
+        return futuros
+
+    def _lanzar_dht(self, nombre_maceta: str) -> Future:
+        # Con planificador el valor ya esta en memoria y no se ocupa un hilo
+        if self.planificador_dht is not None:
+            futuro = Future()
+            futuro.set_result(self.planificador_dht.leer(nombre_maceta))
+            return futuro
+
+        return self.executor.submit(self._leer_dht_directo, nombre_maceta)
+
+    def _leer_dht_directo(self, nombre_maceta: str) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        temperatura_c, humedad_ambiente_pct = self.hw.leer_dht(nombre_maceta)
+        return temperatura_c, humedad_ambiente_pct, None
+
+    def _lanzar_humedad(
+        self,
+        sensor: SensorHumedadConfig,
+        vectores_adc: Dict[str, Future]
+    ) -> Tuple[Future, Optional[int]]:
+        if sensor.adc in vectores_adc:
+            return vectores_adc[sensor.adc], sensor.canal
+
+        futuro = self.executor.submit(self.hw.leer_humedad, sensor.adc, sensor.canal)
+        return futuro, None
+
+    def _armar_lecturas(
+        self,
+        maceta: MacetaConfig,
+        futuros: Dict[str, Tuple[Future, Optional[int]]]
+    ) -> Dict[str, Optional[float]]:
+        temperatura_c = None
+        humedad_ambiente_pct = None
+        edad_dht_seg = None
+
+        if "dht" in futuros:
+            temperatura_c, humedad_ambiente_pct, edad_dht_seg = futuros["dht"][0].result()
+
+        return {
+            **lecturas_humedad(1, self._resultado(futuros, "humedad_1")),
+            **lecturas_humedad(2, self._resultado(futuros, "humedad_2")),
+            "lux": self._resultado(futuros, "lux"),
+            "temperatura_c": temperatura_c,
+            "humedad_ambiente_pct": humedad_ambiente_pct,
+            "edad_dht_seg": edad_dht_seg,
+            # Despues de las lecturas, asi refleja los fallos de este ciclo
+            "disyuntores": self.hw.estados_disyuntores(maceta),
+        }
+
+    def _resultado(
+        self,
+        futuros: Dict[str, Tuple[Future, Optional[int]]],
+        clave: str
+    ) -> Any:
+        if clave not in futuros:
+            return None
+
+        futuro, canal = futuros[clave]
+        resultado = futuro.result()
+
+        if canal is None:
+            return resultado
+
+        # Vector de canales de una lectura en rafaga
+        if resultado is None:
+            return None
+        return resultado[canal]
+
+    def cerrar(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,66 @@
+import time
+from typing import Callable, List
+
+from lectura_adc import ESPERA_ENTRE_MUESTRAS_SEG, ESPERA_ESTABILIZACION_SEG, leer_rafaga_pcf8591
+from simulacion import AnalogInSimulado, BusI2CSimulado, PCF8591Simulado
+
+DIRECCION_ADC = 0x48
+VALORES_CANALES = [180, 120, 95, 210]
+MUESTRAS = 5
+REPETICIONES = 3
+
+
+def promediar_canales(muestras_por_canal: List[List[int]]) -> List[int]:
+    return [int(sum(valores) / len(valores)) for valores in muestras_por_canal]
+
+
+def promediar_canal(
+    leer: Callable[[], int],
+    muestras: int,
+    calentar: bool = True,
+    dormir: Callable[[float], None] = time.sleep
+) -> int:
+    # Lectura de un canal antes del muestreo adaptativo, como referencia de
+    # los benchmarks: leer() devuelve el valor de 16 bits de AnalogIn; se
+    # promedia y se pasa a 8 bits
+    if calentar:
+        leer()
+        dormir(ESPERA_ESTABILIZACION_SEG)
+
+    valores = []
+    for _i in range(muestras):
+        valores.append(leer())
+        dormir(ESPERA_ENTRE_MUESTRAS_SEG)
+
+    raw16 = sum(valores) / len(valores)
+    return int(raw16 / 256)
+
+
+def leer_canal_actual(bus, canal: int) -> int:
+    # Igual que HardwareManager.leer_humedad_raw en modo "canal" al cambiar de canal:
+    # lectura de descarte, 0.1 s de estabilizacion y 5 muestras cada 0.05 s
+    canal_adc = AnalogInSimulado(bus, DIRECCION_ADC, canal)
+    return promediar_canal(lambda: canal_adc.value, MUESTRAS)
+
+
+def medir(nombre: str, funcion) -> None:
+    bus = BusI2CSimulado({DIRECCION_ADC: PCF8591Simulado(VALORES_CANALES, ruido=1.0, semilla=1)})
+
+    inicio = time.perf_counter()
+    for _i in range(REPETICIONES):
+        resultado = funcion(bus)
+    duracion = (time.perf_counter() - inicio) / REPETICIONES
+
+    print(
+        f"{nombre:<8} {duracion * 1000:8.1f} ms/ADC | "
+        f"{bus.transacciones / REPETICIONES:5.1f} transacciones | "
+        f"{bus.bytes_transferidos / REPETICIONES:6.1f} bytes | canales={resultado}"
+    )
+
+
+# Los otros benchmarks importan promediar_canal de aca
+if __name__ == "__main__":
+    print(f"PCF8591 simulado, 4 canales, {MUESTRAS} muestras por canal\n")
+
+    medir("canal", lambda bus: [leer_canal_actual(bus, canal) for canal in range(4)])
+    medir("rafaga", lambda bus: promediar_canales(leer_rafaga_pcf8591(bus, DIRECCION_ADC, MUESTRAS)))
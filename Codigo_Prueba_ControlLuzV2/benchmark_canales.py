@@ -0,0 +1,49 @@
+import time
+
+from benchmark_adc import promediar_canal
+from simulacion import AnalogInSimulado, BusI2CSimulado, PCF8591Simulado
+
+DIRECCION_ADC = 0x48
+VALORES_CANALES = [180, 120, 95, 210]
+MUESTRAS = 5
+LECTURAS = 8
+
+
+def sin_registro(bus, canales):
+    # Comportamiento anterior: AnalogIn nuevo y calentamiento en cada lectura
+    for canal in canales:
+        canal_adc = AnalogInSimulado(bus, DIRECCION_ADC, canal)
+        promediar_canal(lambda: canal_adc.value, MUESTRAS)
+
+
+def con_registro(bus, canales):
+    # Igual que HardwareManager.leer_humedad_raw con el registro de canales
+    registro = {canal: AnalogInSimulado(bus, DIRECCION_ADC, canal) for canal in range(4)}
+    ultimo_canal = None
+
+    for canal in canales:
+        canal_adc = registro[canal]
+        promediar_canal(lambda: canal_adc.value, MUESTRAS, calentar=ultimo_canal != canal)
+        ultimo_canal = canal
+
+
+def medir(escenario: str, canales) -> None:
+    print(f"\n{escenario} ({len(canales)} lecturas)")
+
+    for nombre, funcion in (("sin registro", sin_registro), ("con registro", con_registro)):
+        bus = BusI2CSimulado({DIRECCION_ADC: PCF8591Simulado(VALORES_CANALES)})
+
+        inicio = time.perf_counter()
+        funcion(bus, canales)
+        por_lectura = (time.perf_counter() - inicio) / len(canales)
+
+        print(
+            f"  {nombre:<13} {por_lectura * 1000:7.1f} ms/lectura | "
+            f"{bus.transacciones / len(canales):4.1f} transacciones/lectura"
+        )
+
+
+print(f"PCF8591 simulado, {MUESTRAS} muestras por lectura")
+
+medir("Mismo canal repetido", [2] * LECTURAS)
+medir("Canales alternados", [2, 3] * (LECTURAS // 2))
@@ -0,0 +1,74 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models import MacetaEstado, RegistroCSVConfig
+from registro_csv import COLUMNAS_CSV, EscritorCSV, fila_csv
+
+MACETAS = 8
+CICLOS = 2000
+INTERVALO_SEG = 5
+
+
+def estados_ciclo() -> dict:
+    return {
+        f"maceta{i + 1}": MacetaEstado(
+            humedad_suelo_1_pct=55, humedad_suelo_2_pct=57, humedad_suelo_promedio_pct=56,
+            humedad_suelo_raw_1=150, humedad_suelo_raw_2=148, lux=18000.5,
+            temperatura_c=24.1, humedad_ambiente_pct=61.0, dli_acumulado=3.2
+        )
+        for i in range(MACETAS)
+    }
+
+
+def por_ciclo(archivo: str, estados: dict, ahora: datetime, fsync: bool = False) -> None:
+    # Igual que registro_csv.agregar_filas_csv: isfile, open, writer y close por ciclo
+    existe = os.path.isfile(archivo)
+    with open(archivo, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not existe:
+            writer.writerow(COLUMNAS_CSV)
+        for nombre_maceta, estado in estados.items():
+            writer.writerow(fila_csv(nombre_maceta, estado, ahora))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def medir(nombre: str, escribir, cerrar=lambda: None, fsyncs=lambda: 0) -> None:
+    estados = estados_ciclo()
+    inicio_sim = datetime(2026, 1, 1, 8, 0, 0)
+
+    inicio = time.perf_counter()
+    for ciclo in range(CICLOS):
+        escribir(estados, inicio_sim + timedelta(seconds=ciclo * INTERVALO_SEG))
+    cerrar()
+    duracion = time.perf_counter() - inicio
+
+    filas = CICLOS * MACETAS
+    print(
+        f"{nombre:<24} {filas / duracion:10.0f} filas/s | "
+        f"{fsyncs() / filas:.4f} fsync/fila | {duracion * 1000:7.1f} ms en total"
+    )
+
+
+print(f"{MACETAS} macetas, {CICLOS} ciclos de {INTERVALO_SEG} s ({CICLOS * MACETAS} filas)\n")
+
+with tempfile.TemporaryDirectory() as directorio:
+    archivo = os.path.join(directorio, "por_ciclo.csv")
+    medir("abrir/cerrar por ciclo", lambda estados, ahora: por_ciclo(archivo, estados, ahora))
+
+    # Para tener lo mismo asegurado en la SD hay que hacer fsync en cada ciclo
+    archivo = os.path.join(directorio, "por_ciclo_fsync.csv")
+    medir(
+        "por ciclo + fsync",
+        lambda estados, ahora: por_ciclo(archivo, estados, ahora, fsync=True),
+        fsyncs=lambda: CICLOS
+    )
+
+    # Valores por defecto de config.toml
+    escritor = EscritorCSV(os.path.join(directorio, "escritor.csv"), RegistroCSVConfig(enabled=True))
+    medir("EscritorCSV", escritor.escribir, escritor.cerrar, lambda: escritor.fsyncs)
+    print(f"  {escritor.resumen()}")
@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from benchmark_adc import promediar_canal
+from lectura_adc import muestrear_canal
+from simulacion import AnalogInSimulado, BusI2CSimulado, PCF8591Simulado
+
+DIRECCION_ADC = 0x48
+VALOR_REAL = 150
+LECTURAS = 20
+
+
+def fijo(canal_adc) -> int:
+    # Comportamiento anterior: 5 muestras con promedio
+    return promediar_canal(lambda: canal_adc.value, 5, calentar=False)
+
+
+def adaptativo(canal_adc) -> int:
+    # Valores por defecto de config.toml: 3 a 10 muestras, varianza 2, mediana
+    muestreo = muestrear_canal(lambda: canal_adc.value, 3, 10, 2.0, "mediana", calentar=False)
+    return muestreo.raw
+
+
+def medir(escenario: str, ruido: float, picos: float) -> None:
+    print(f"\n{escenario} (ruido={ruido}, picos={picos:.0%}, valor real={VALOR_REAL})")
+
+    for nombre, funcion in (("fijo", fijo), ("adaptativo", adaptativo)):
+        dispositivo = PCF8591Simulado([VALOR_REAL] * 4, ruido=ruido, semilla=3, picos=picos)
+        bus = BusI2CSimulado({DIRECCION_ADC: dispositivo})
+        canal_adc = AnalogInSimulado(bus, DIRECCION_ADC, 0)
+
+        inicio = time.perf_counter()
+        valores = [funcion(canal_adc) for _i in range(LECTURAS)]
+        por_lectura = (time.perf_counter() - inicio) / LECTURAS
+
+        # Cada muestra son dos transacciones (escritura del control y lectura)
+        error_max = max(abs(valor - VALOR_REAL) for valor in valores)
+        print(
+            f"  {nombre:<11} {por_lectura * 1000:6.1f} ms/lectura | "
+            f"{bus.transacciones / 2 / LECTURAS:4.1f} muestras/lectura | "
+            f"desvio={statistics.pstdev(valores):5.2f} | error max={error_max}"
+        )
+
+
+print(f"PCF8591 simulado, {LECTURAS} lecturas por escenario")
+
+medir("Sensor estable", ruido=0.5, picos=0.0)
+medir("Sensor ruidoso", ruido=2.0, picos=0.0)
+medir("Contacto flojo", ruido=0.5, picos=0.1)
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from estado_persistente import escribir_atomico
+from models import ColaSubidaConfig
+
+# Resultado de un envio
+ENVIADO = "enviado"
+REINTENTAR = "reintentar"     # sin red, error del servidor o limite de frecuencia
+DESCARTAR = "descartar"       # rechazo permanente (4xx): reintentar no lo arregla
+
+
+def ruta_confirmadas(ruta: str) -> str:
+    return f"{ruta}.confirmado"
+
+
+def ruta_rechazadas(ruta: str) -> str:
+    return f"{ruta}.rechazadas"
+
+
+def leer_confirmado(ruta: str) -> int:
+    # Numero de la ultima entrada que ThingSpeak acepto (0: ninguna)
+    try:
+        with open(ruta_confirmadas(ruta), encoding="utf-8") as f:
+            return int(json.load(f)["confirmado"])
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Confirmacion de la cola de subida ilegible ({ruta}), se reenvia todo: {e}")
+        return 0
+
+
+class ColaSubida:
+    # Subidas a ThingSpeak que fallaron, en un archivo JSONL solo para agregar:
+    # encolar es escribir una linea al final (sin fsync; el hilo que drena lo
+    # hace despues), asi el control no espera a la SD. Un hilo las reenvia en
+    # orden, de a una cada espaciado_seg (el limite de ThingSpeak) y con
+    # espera creciente mientras no haya red. Cada entrada lleva un numero y
+    # en ruta.confirmado queda el ultimo aceptado: si se corta la luz se
+    # puede reenviar la ultima entrada, pero no se pierde ninguna. Lo
+    # confirmado se borra al vaciarse la cola o al pasar de compactar_bytes.
+    # Una entrada que ThingSpeak rechaza para siempre (4xx) no traba la cola:
+    # se aparta en ruta.rechazadas y se sigue con la proxima.
+    def __init__(self, ruta: str, config: ColaSubidaConfig, enviar: Callable[[Dict[str, Any], float], str]):
+        self.ruta = ruta
+        self.config = config
+        self.enviar = enviar
+        self.encoladas = 0
+        self.enviadas = 0
+        self.descartadas = 0
+        self.rechazadas = 0
+        self.fallos = 0
+        self.compactaciones = 0
+        self.profundidad_max = 0
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._sin_fsync = False
+        self._cerrada = False
+        # Entradas sin confirmar: (numero, posicion, largo) en el archivo
+        self._pendientes: Deque[Tuple[int, int, int]] = deque()
+        self._confirmado = leer_confirmado(ruta)
+        self._guardado = self._confirmado
+        self._siguiente = self._confirmado + 1
+        self._tamano = 0
+
+        self._cargar()
+        self._archivo = open(ruta, "ab")
+        self._lector = open(ruta, "rb")
+        self._hilo = threading.Thread(target=self._drenar, name="cola_subida", daemon=True)
+
+    def _cargar(self) -> None:
+        # Recorre el archivo del arranque: salta lo confirmado y recorta una
+        # linea a medias (corte de luz escribiendo)
+        if not os.path.isfile(self.ruta):
+            return
+
+        posicion = 0
+        with open(self.ruta, "rb") as f:
+            for linea in f:
+                try:
+                    if not linea.endswith(b"\n"):
+                        raise ValueError("linea incompleta")
+                    numero = int(json.loads(linea)["n"])
+                except (ValueError, KeyError, TypeError):
+                    break
+
+                if numero > self._confirmado:
+                    self._pendientes.append((numero, posicion, len(linea)))
+                self._siguiente = max(self._siguiente, numero + 1)
+                posicion += len(linea)
+
+        if posicion < os.path.getsize(self.ruta):
+            print(f"Cola de subida: se recorta una entrada incompleta en {self.ruta}")
+            os.truncate(self.ruta, posicion)
+        self._tamano = posicion
+        self._acotar()
+        self.profundidad_max = len(self._pendientes)
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    @property
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._pendientes)
+
+    def encolar(self, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            linea = (json.dumps({"n": self._siguiente, "payload": payload}) + "\n").encode("utf-8")
+            self._archivo.write(linea)
+            self._archivo.flush()
+            self._pendientes.append((self._siguiente, self._tamano, len(linea)))
+            self._siguiente += 1
+            self._tamano += len(linea)
+            self._sin_fsync = True
+            self.encoladas += 1
+            self._acotar()
+            self.profundidad_max = max(self.profundidad_max, len(self._pendientes))
+
+        self._despertar.set()
+
+    def _acotar(self) -> None:
+        # Llena se descarta lo mas viejo; cuenta como confirmado
+        while len(self._pendientes) > self.config.max_entradas:
+            self._confirmado = self._pendientes.popleft()[0]
+            self.descartadas += 1
+
+    def _primera(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            if not self._pendientes:
+                return None
+            numero, posicion, largo = self._pendientes[0]
+
+        # Solo este hilo lee y compacta, asi que la posicion sigue valiendo
+        self._lector.seek(posicion)
+        return numero, json.loads(self._lector.read(largo))["payload"]
+
+    def _drenar(self) -> None:
+        espera = self.config.espaciado_seg
+        try:
+            while not self._detener.is_set():
+                self._despertar.clear()
+                self._sincronizar()
+                entrada = self._primera()
+                if entrada is None:
+                    self._despertar.wait()
+                    continue
+
+                numero, payload = entrada
+                resultado = self.enviar(payload, self.config.timeout_seg)
+                if resultado == ENVIADO:
+                    self._confirmar(numero)
+                    espera = self.config.espaciado_seg
+                elif resultado == DESCARTAR:
+                    self._apartar(numero, payload)
+                    espera = self.config.espaciado_seg
+                else:
+                    # Sin red: se reintenta la misma entrada cada vez mas espaciado
+                    self.fallos += 1
+                    espera = min(espera * 2, self.config.espera_max_seg)
+
+                # Tambien sin red: lo descartado por max_entradas se va del archivo
+                self._guardar_confirmado()
+                self._compactar()
+                self._detener.wait(espera)
+        finally:
+            self._lector.close()
+
+    def _confirmar(self, numero: int) -> None:
+        with self._lock:
+            if self._pendientes and self._pendientes[0][0] == numero:
+                self._pendientes.popleft()
+                self.enviadas += 1
+            self._confirmado = max(self._confirmado, numero)
+
+    def _apartar(self, numero: int, payload: Dict[str, Any]) -> None:
+        print(f"\nCola de subida: ThingSpeak rechazo la entrada {numero}, se aparta en {ruta_rechazadas(self.ruta)}")
+        try:
+            with open(ruta_rechazadas(self.ruta), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"n": numero, "payload": payload}) + "\n")
+        except OSError as e:
+            print(f"\nCola de subida: no se pudo apartar la entrada {numero}, se descarta: {e}")
+
+        with self._lock:
+            if self._pendientes and self._pendientes[0][0] == numero:
+                self._pendientes.popleft()
+                self.rechazadas += 1
+            self._confirmado = max(self._confirmado, numero)
+
+    def _guardar_confirmado(self) -> None:
+        if self._confirmado == self._guardado:
+            return
+        try:
+            escribir_atomico(ruta_confirmadas(self.ruta), json.dumps({"confirmado": self._confirmado}))
+            self._guardado = self._confirmado
+        except OSError as e:
+            print(f"\nCola de subida: no se pudo guardar la confirmacion: {e}")
+
+    def _sincronizar(self) -> None:
+        # fsync por el descriptor del lector: baja a la SD lo que escribio
+        # encolar sin frenarlo
+        if self._sin_fsync:
+            self._sin_fsync = False
+            os.fsync(self._lector.fileno())
+
+    def _compactar(self) -> None:
+        with self._lock:
+            inicio = self._pendientes[0][1] if self._pendientes else self._tamano
+            if inicio == 0 or self._cerrada:
+                return
+            if self._pendientes and (inicio < self.config.compactar_bytes or inicio < self._tamano / 2):
+                return
+
+            if not self._pendientes:
+                # Todo confirmado: alcanza con vaciar el archivo
+                self._archivo.truncate(0)
+            else:
+                # Se copia lo pendiente a un archivo nuevo que reemplaza al viejo
+                self._archivo.flush()
+                self._lector.seek(inicio)
+                escribir_atomico(self.ruta, self._lector.read(self._tamano - inicio))
+                self._archivo.close()
+                self._lector.close()
+                self._archivo = open(self.ruta, "ab")
+                self._lector = open(self.ruta, "rb")
+                self._pendientes = deque(
+                    (numero, posicion - inicio, largo) for numero, posicion, largo in self._pendientes
+                )
+
+            self._tamano -= inicio
+            self.compactaciones += 1
+
+    def detener(self, timeout_seg: Optional[float] = None) -> None:
+        # Lo que no se llego a enviar queda en el archivo para el proximo arranque
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo.is_alive():
+            self._hilo.join(timeout_seg)
+
+        with self._lock:
+            self._cerrada = True
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._archivo.close()
+        self._guardar_confirmado()
+
+    def resumen(self) -> str:
+        return (
+            f"Cola de subida: {self.pendientes} pendientes (max {self.profundidad_max}) | "
+            f"encoladas: {self.encoladas} | reenviadas: {self.enviadas} | "
+            f"descartadas: {self.descartadas} | rechazadas: {self.rechazadas} | fallos: {self.fallos} | "
+            f"compactaciones: {self.compactaciones} | {self.ruta}"
+        )
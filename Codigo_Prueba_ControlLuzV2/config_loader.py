@@ -5,6 +5,9 @@ try:
 except ModuleNotFoundError:
     import tomli as tomllib
 
+from lectura_adc import AGREGACIONES_ADC
+from planificador_ciclos import POLITICAS_CICLOS
+from planificador_tareas import TAREAS_POR_DEFECTO
 from models import (
     GlobalConfig,
     BombaConfig,
@@ -14,10 +17,24 @@ from models import (
     ADCConfig,
     SensorHumedadConfig,
     BH1750Config,
+    DisyuntorConfig,
     DHTConfig,
     ActuadorConfig,
     MacetaConfig,
+    MuestreoConfig,
+    ParadaEmergenciaConfig,
+    PipelineConfig,
+    FragmentacionConfig,
+    PresupuestoConfig,
+    EstadoPersistenteConfig,
+    RegistroCSVConfig,
+    SQLiteConfig,
+    RegistroBinarioConfig,
+    ColaSubidaConfig,
+    SimulacionConfig,
     SystemConfig,
+    TareaConfig,
+    TareasConfig,
 )
 
 
@@ -43,6 +60,19 @@ def _parsear_configuracion(data: dict) -> SystemConfig:
     i2c_data = data["i2c"]
     adc_data = data["adc"]
     macetas_data = data["macetas"]
+    simulacion_data = data.get("simulacion", {})
+    muestreo_data = data.get("muestreo", {})
+    disyuntores_data = data.get("disyuntores", {})
+    tareas_data = data.get("tareas", {})
+    parada_data = data.get("parada_emergencia", {})
+    pipeline_data = data.get("pipeline", {})
+    fragmentacion_data = data.get("fragmentacion", {})
+    presupuesto_data = data.get("presupuesto", {})
+    estado_data = data.get("estado_persistente", {})
+    registro_csv_data = data.get("registro_csv", {})
+    sqlite_data = data.get("sqlite", {})
+    binario_data = data.get("registro_binario", {})
+    cola_subida_data = data.get("cola_subida", {})
 
     global_config = GlobalConfig(
         intervalo_lectura_seg=global_data["intervalo_lectura_seg"],
@@ -51,12 +81,25 @@ def _parsear_configuracion(data: dict) -> SystemConfig:
         discrepancia_humedad_pct=global_data["discrepancia_humedad_pct"],
         delay_post_bomba_seg=global_data["delay_post_bomba_seg"],
         archivo_csv=global_data["archivo_csv"],
+        hilos_adquisicion=global_data.get("hilos_adquisicion", 4),
+        modo_lectura_adc=global_data.get("modo_lectura_adc", "canal"),
+        periodo_dht_seg=global_data.get("periodo_dht_seg", 2.0),
+        max_edad_dht_seg=global_data.get("max_edad_dht_seg", 60.0),
+        muestras_min_adc=global_data.get("muestras_min_adc", 3),
+        muestras_max_adc=global_data.get("muestras_max_adc", 10),
+        varianza_max_adc=global_data.get("varianza_max_adc", 2.0),
+        agregacion_adc=global_data.get("agregacion_adc", "mediana"),
+        politica_ciclos=global_data.get("politica_ciclos", "saltar"),
+        alinear_ciclos=global_data.get("alinear_ciclos", True),
+        tolerancia_ciclos_seg=global_data.get("tolerancia_ciclos_seg", 1.0),
     )
 
     bomba = BombaConfig(
         gpio=bomba_data["gpio"],
         activa_bajo=bomba_data["activa_bajo"],
         enabled=bomba_data["enabled"],
+        caudal_lpm=bomba_data.get("caudal_lpm", 0.0),
+        max_valvulas_abiertas=bomba_data.get("max_valvulas_abiertas", 4),
     )
 
     fields_data = thingspeak_data["fields"]
@@ -156,8 +199,120 @@ def _parsear_configuracion(data: dict) -> SystemConfig:
             luz=luz,
             valvula=valvula,
             ventilador=ventilador,
+            caudal_valvula_lpm=maceta_data["actuadores"]["valvula"].get("caudal_lpm", 0.0),
         )
 
+    simulacion = SimulacionConfig(
+        enabled=simulacion_data.get("enabled", False),
+        semilla=simulacion_data.get("semilla", 1),
+        archivo_csv=simulacion_data.get("archivo_csv", "registro_simulado.csv"),
+        archivo_estado=simulacion_data.get("archivo_estado", "estado_simulado.json"),
+        archivo_sqlite=simulacion_data.get("archivo_sqlite", "telemetria_simulada.db"),
+        archivo_binario=simulacion_data.get("archivo_binario", "telemetria_simulada.bin"),
+        parada_emergencia_seg=simulacion_data.get("parada_emergencia_seg", 0.0),
+        latencia_seg=dict(simulacion_data.get("latencia_seg", {})),
+        jitter_seg=dict(simulacion_data.get("jitter_seg", {})),
+        tasa_fallo=dict(simulacion_data.get("tasa_fallo", {})),
+    )
+
+    muestreo = MuestreoConfig(
+        enabled=muestreo_data.get("enabled", False),
+        periodo_humedad_seg=muestreo_data.get("periodo_humedad_seg", 60.0),
+        periodo_lux_seg=muestreo_data.get("periodo_lux_seg", 10.0),
+        capacidad_buffer=muestreo_data.get("capacidad_buffer", 720),
+        max_edad_humedad_seg=muestreo_data.get("max_edad_humedad_seg", 1800.0),
+        max_edad_lux_seg=muestreo_data.get("max_edad_lux_seg", 120.0),
+    )
+
+    disyuntores = DisyuntorConfig(
+        fallos_para_abrir=disyuntores_data.get("fallos_para_abrir", 3),
+        espera_inicial_seg=disyuntores_data.get("espera_inicial_seg", 30.0),
+        espera_max_seg=disyuntores_data.get("espera_max_seg", 3600.0),
+    )
+
+    tareas = TareasConfig(
+        enabled=tareas_data.get("enabled", False),
+    )
+
+    # Las tareas sin seccion propia toman el periodo y la prioridad por defecto
+    nombres_tareas = list(TAREAS_POR_DEFECTO)
+    nombres_tareas += [k for k, v in tareas_data.items() if isinstance(v, dict) and k not in TAREAS_POR_DEFECTO]
+
+    for nombre_tarea in nombres_tareas:
+        periodo_seg, prioridad = TAREAS_POR_DEFECTO.get(nombre_tarea, (0.0, 0))
+        tarea_data = tareas_data.get(nombre_tarea, {})
+
+        tareas.tareas[nombre_tarea] = TareaConfig(
+            periodo_seg=tarea_data.get("periodo_seg", periodo_seg),
+            prioridad=tarea_data.get("prioridad", prioridad),
+            enabled=tarea_data.get("enabled", True),
+        )
+
+    parada_emergencia = ParadaEmergenciaConfig(
+        enabled=parada_data.get("enabled", False),
+        gpio=parada_data.get("gpio", 21),
+        activa_bajo=parada_data.get("activa_bajo", True),
+        rebote_ms=parada_data.get("rebote_ms", 200),
+    )
+
+    pipeline = PipelineConfig(
+        enabled=pipeline_data.get("enabled", False),
+        capacidad_persistencia=pipeline_data.get("capacidad_persistencia", 100),
+        capacidad_subida=pipeline_data.get("capacidad_subida", 5),
+        timeout_vaciado_seg=pipeline_data.get("timeout_vaciado_seg", 10.0),
+        timeout_bloqueo_seg=pipeline_data.get("timeout_bloqueo_seg", 5.0),
+    )
+
+    fragmentacion = FragmentacionConfig(
+        enabled=fragmentacion_data.get("enabled", False),
+        procesos=fragmentacion_data.get("procesos", 0),
+        timeout_seg=fragmentacion_data.get("timeout_seg", 30.0),
+        timeout_parada_seg=fragmentacion_data.get("timeout_parada_seg", 5.0),
+        espera_reinicio_seg=fragmentacion_data.get("espera_reinicio_seg", 30.0),
+        espera_reinicio_max_seg=fragmentacion_data.get("espera_reinicio_max_seg", 600.0),
+    )
+
+    presupuesto = PresupuestoConfig(
+        enabled=presupuesto_data.get("enabled", False),
+        ciclo_seg=presupuesto_data.get("ciclo_seg", 0.0),
+        margen=presupuesto_data.get("margen", 1.5),
+        max_registros_diferidos=presupuesto_data.get("max_registros_diferidos", 10),
+    )
+
+    estado_persistente = EstadoPersistenteConfig(
+        enabled=estado_data.get("enabled", False),
+        archivo=estado_data.get("archivo", "estado_controlador.json"),
+    )
+
+    registro_csv = RegistroCSVConfig(
+        enabled=registro_csv_data.get("enabled", False),
+        filas_buffer=registro_csv_data.get("filas_buffer", 50),
+        vaciado_seg=registro_csv_data.get("vaciado_seg", 60.0),
+        fsync_seg=registro_csv_data.get("fsync_seg", 300.0),
+        rotacion_diaria=registro_csv_data.get("rotacion_diaria", False),
+    )
+
+    sqlite = SQLiteConfig(
+        enabled=sqlite_data.get("enabled", False),
+        archivo=sqlite_data.get("archivo", "telemetria.db"),
+        resumenes=sqlite_data.get("resumenes", True),
+    )
+
+    registro_binario = RegistroBinarioConfig(
+        enabled=binario_data.get("enabled", False),
+        archivo=binario_data.get("archivo", "telemetria.bin"),
+    )
+
+    cola_subida = ColaSubidaConfig(
+        enabled=cola_subida_data.get("enabled", False),
+        archivo=cola_subida_data.get("archivo", "cola_subida.jsonl"),
+        max_entradas=cola_subida_data.get("max_entradas", 10000),
+        espaciado_seg=cola_subida_data.get("espaciado_seg", 15.0),
+        espera_max_seg=cola_subida_data.get("espera_max_seg", 600.0),
+        timeout_seg=cola_subida_data.get("timeout_seg", 5.0),
+        compactar_bytes=cola_subida_data.get("compactar_bytes", 65536),
+    )
+
     return SystemConfig(
         global_config=global_config,
         bomba=bomba,
@@ -165,6 +320,19 @@ def _parsear_configuracion(data: dict) -> SystemConfig:
         i2c=i2c,
         adcs=adcs,
         macetas=macetas,
+        simulacion=simulacion,
+        muestreo=muestreo,
+        disyuntores=disyuntores,
+        tareas=tareas,
+        parada_emergencia=parada_emergencia,
+        pipeline=pipeline,
+        fragmentacion=fragmentacion,
+        presupuesto=presupuesto,
+        estado_persistente=estado_persistente,
+        registro_csv=registro_csv,
+        sqlite=sqlite,
+        registro_binario=registro_binario,
+        cola_subida=cola_subida,
     )
 
 
@@ -173,6 +341,15 @@ def _validar_configuracion(config: SystemConfig) -> None:
     _validar_adcs(config)
     _validar_macetas(config)
     _validar_gpios(config)
+    _validar_simulacion(config)
+    _validar_muestreo(config)
+    _validar_disyuntores(config)
+    _validar_tareas(config)
+    _validar_pipeline(config)
+    _validar_fragmentacion(config)
+    _validar_presupuesto(config)
+    _validar_registro_csv(config)
+    _validar_cola_subida(config)
 
 
 def _validar_global(config: SystemConfig) -> None:
@@ -190,6 +367,39 @@ def _validar_global(config: SystemConfig) -> None:
     if g.delay_post_bomba_seg < 0:
         raise ValueError("delay_post_bomba_seg no puede ser negativo")
 
+    if config.bomba.caudal_lpm < 0:
+        raise ValueError("bomba.caudal_lpm no puede ser negativo")
+
+    if config.bomba.max_valvulas_abiertas < 1:
+        raise ValueError("bomba.max_valvulas_abiertas debe ser al menos 1")
+
+    if g.hilos_adquisicion < 1:
+        raise ValueError("hilos_adquisicion debe ser al menos 1")
+
+    if g.modo_lectura_adc not in ("canal", "rafaga"):
+        raise ValueError(f"modo_lectura_adc invalido: {g.modo_lectura_adc}")
+
+    if g.periodo_dht_seg <= 0:
+        raise ValueError("periodo_dht_seg debe ser mayor que 0")
+
+    if g.max_edad_dht_seg <= 0:
+        raise ValueError("max_edad_dht_seg debe ser mayor que 0")
+
+    if not (1 <= g.muestras_min_adc <= g.muestras_max_adc):
+        raise ValueError("Se necesita 1 <= muestras_min_adc <= muestras_max_adc")
+
+    if g.varianza_max_adc < 0:
+        raise ValueError("varianza_max_adc no puede ser negativa")
+
+    if g.agregacion_adc not in AGREGACIONES_ADC:
+        raise ValueError(f"agregacion_adc invalida: {g.agregacion_adc}")
+
+    if g.politica_ciclos not in POLITICAS_CICLOS:
+        raise ValueError(f"politica_ciclos invalida: {g.politica_ciclos}")
+
+    if g.tolerancia_ciclos_seg < 0:
+        raise ValueError("tolerancia_ciclos_seg no puede ser negativa")
+
 
 def _validar_adcs(config: SystemConfig) -> None:
     direcciones = set()
@@ -283,3 +493,147 @@ def _validar_gpios(config: SystemConfig) -> None:
                 raise ValueError(f"GPIO repetido: {gpio} usado por {gpios_usados[gpio]} y {origen}")
 
             gpios_usados[gpio] = origen
+
+    parada = config.parada_emergencia
+    if parada.enabled:
+        if parada.gpio in gpios_usados:
+            raise ValueError(
+                f"GPIO repetido: {parada.gpio} usado por {gpios_usados[parada.gpio]} y parada_emergencia"
+            )
+
+        if parada.rebote_ms < 0:
+            raise ValueError("parada_emergencia.rebote_ms no puede ser negativo")
+
+
+def _validar_simulacion(config: SystemConfig) -> None:
+    s = config.simulacion
+
+    for nombre, latencia in {**s.latencia_seg, **s.jitter_seg}.items():
+        if latencia < 0:
+            raise ValueError(f"simulacion: latencia de {nombre} no puede ser negativa")
+
+    for nombre, tasa in s.tasa_fallo.items():
+        if not (0 <= tasa <= 1):
+            raise ValueError(f"simulacion: tasa_fallo de {nombre} debe estar entre 0 y 1")
+
+    if s.parada_emergencia_seg < 0:
+        raise ValueError("simulacion.parada_emergencia_seg no puede ser negativo")
+
+
+def _validar_muestreo(config: SystemConfig) -> None:
+    m = config.muestreo
+
+    if m.periodo_humedad_seg <= 0 or m.periodo_lux_seg <= 0:
+        raise ValueError("muestreo: los periodos deben ser mayores que 0")
+
+    if m.capacidad_buffer < 1:
+        raise ValueError("muestreo.capacidad_buffer debe ser al menos 1")
+
+    # La edad maxima tiene que dejar pasar al menos un periodo de lectura,
+    # el del muestreo continuo o el de la tarea que lee ese sensor
+    periodos = []
+    if m.enabled:
+        periodos.append(("muestreo", m.periodo_humedad_seg, m.periodo_lux_seg))
+    if config.tareas.enabled:
+        tareas = config.tareas.tareas
+        periodos.append(("tareas", tareas["humedad_suelo"].periodo_seg, tareas["lux"].periodo_seg))
+    for origen, periodo_humedad, periodo_lux in periodos:
+        if m.max_edad_humedad_seg <= periodo_humedad:
+            raise ValueError(f"muestreo.max_edad_humedad_seg debe ser mayor que el periodo de humedad ({origen})")
+        if m.max_edad_lux_seg <= periodo_lux:
+            raise ValueError(f"muestreo.max_edad_lux_seg debe ser mayor que el periodo de lux ({origen})")
+
+
+def _validar_disyuntores(config: SystemConfig) -> None:
+    d = config.disyuntores
+
+    if d.fallos_para_abrir < 1:
+        raise ValueError("disyuntores.fallos_para_abrir debe ser al menos 1")
+
+    if not (0 < d.espera_inicial_seg <= d.espera_max_seg):
+        raise ValueError("disyuntores: se necesita 0 < espera_inicial_seg <= espera_max_seg")
+
+
+def _validar_tareas(config: SystemConfig) -> None:
+    for nombre_tarea, tarea in config.tareas.tareas.items():
+        if nombre_tarea not in TAREAS_POR_DEFECTO:
+            raise ValueError(
+                f"tareas.{nombre_tarea} no existe. Opciones: {', '.join(TAREAS_POR_DEFECTO)}"
+            )
+
+        if tarea.periodo_seg <= 0:
+            raise ValueError(f"tareas.{nombre_tarea}.periodo_seg debe ser mayor que 0")
+
+        if tarea.prioridad < 0:
+            raise ValueError(f"tareas.{nombre_tarea}.prioridad no puede ser negativa")
+
+    if config.tareas.enabled and not config.tareas.tareas["control_luz"].enabled:
+        raise ValueError("tareas.control_luz no se puede deshabilitar con el planificador de tareas activo")
+
+
+def _validar_pipeline(config: SystemConfig) -> None:
+    p = config.pipeline
+
+    if p.capacidad_persistencia < 1 or p.capacidad_subida < 1:
+        raise ValueError("pipeline: las capacidades de las colas deben ser al menos 1")
+
+    if p.timeout_vaciado_seg < 0 or p.timeout_bloqueo_seg < 0:
+        raise ValueError("pipeline: timeout_vaciado_seg y timeout_bloqueo_seg no pueden ser negativos")
+
+
+def _validar_fragmentacion(config: SystemConfig) -> None:
+    f = config.fragmentacion
+
+    if f.procesos < 0:
+        raise ValueError("fragmentacion.procesos no puede ser negativo (0 = uno por nucleo)")
+
+    if f.timeout_seg <= 0 or f.timeout_parada_seg <= 0:
+        raise ValueError("fragmentacion: timeout_seg y timeout_parada_seg deben ser mayores que 0")
+
+    if not (0 <= f.espera_reinicio_seg <= f.espera_reinicio_max_seg):
+        raise ValueError("fragmentacion: se necesita 0 <= espera_reinicio_seg <= espera_reinicio_max_seg")
+
+    if f.enabled and config.tareas.enabled:
+        raise ValueError("fragmentacion y tareas no se pueden usar juntos: deshabilitar uno de los dos")
+
+    if f.enabled and config.muestreo.enabled:
+        raise ValueError("fragmentacion y muestreo no se pueden usar juntos: cada proceso lee por ciclo")
+
+
+def _validar_presupuesto(config: SystemConfig) -> None:
+    p = config.presupuesto
+
+    if p.ciclo_seg < 0:
+        raise ValueError("presupuesto.ciclo_seg no puede ser negativo (0 = todo el intervalo)")
+
+    if p.margen < 1:
+        raise ValueError("presupuesto.margen debe ser al menos 1")
+
+    if p.max_registros_diferidos < 0:
+        raise ValueError("presupuesto.max_registros_diferidos no puede ser negativo")
+
+
+def _validar_cola_subida(config: SystemConfig) -> None:
+    c = config.cola_subida
+
+    if c.max_entradas < 1:
+        raise ValueError("cola_subida.max_entradas debe ser al menos 1")
+
+    if not 0 < c.espaciado_seg <= c.espera_max_seg:
+        raise ValueError("cola_subida: se necesita 0 < espaciado_seg <= espera_max_seg")
+
+    if c.timeout_seg <= 0:
+        raise ValueError("cola_subida.timeout_seg debe ser mayor que 0")
+
+    if c.compactar_bytes < 0:
+        raise ValueError("cola_subida.compactar_bytes no puede ser negativo")
+
+
+def _validar_registro_csv(config: SystemConfig) -> None:
+    r = config.registro_csv
+
+    if r.filas_buffer < 1:
+        raise ValueError("registro_csv.filas_buffer debe ser al menos 1")
+
+    if r.vaciado_seg < 0 or r.fsync_seg < 0:
+        raise ValueError("registro_csv: vaciado_seg y fsync_seg no pueden ser negativos")
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from config_loader import cargar_configuracion
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def config_simulada(tmp_path):
+    # config.toml del repo con el backend simulado y los archivos en tmp_path
+    config = cargar_configuracion(os.path.join(DIRECTORIO, "config.toml"))
+    config.simulacion.enabled = True
+    config.simulacion.archivo_csv = str(tmp_path / "registro.csv")
+    config.simulacion.archivo_estado = str(tmp_path / "estado.json")
+    config.simulacion.archivo_sqlite = str(tmp_path / "telemetria.db")
+    config.simulacion.archivo_binario = str(tmp_path / "telemetria.bin")
+    return config
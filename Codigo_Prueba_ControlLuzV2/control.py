@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, Tuple, List, Dict
 
-from models import MacetaConfig, MacetaEstado, GlobalConfig
+from models import MacetaConfig, MacetaEstado, GlobalConfig, EstadoDisyuntor
 
 
 def esta_en_horario_activo(hora_actual: int, hora_inicio: int, hora_fin: int) -> bool:
@@ -69,6 +69,35 @@ def lectura_dht_valida(
 
     return True
 
+
+def alertas_disyuntores(estados: List[EstadoDisyuntor]) -> List[str]:
+    alertas = []
+
+    for estado in estados:
+        if estado.segundos_para_reintento is None:
+            alertas.append(f"{estado.dispositivo} fuera de servicio, probando reconexion")
+        else:
+            alertas.append(
+                f"{estado.dispositivo} fuera de servicio tras {estado.fallos_consecutivos} fallos, "
+                f"reintento en {estado.segundos_para_reintento:.0f} s"
+            )
+
+    return alertas
+
+
+def incremento_dli(
+    maceta: MacetaConfig,
+    lux_ambiente: Optional[float],
+    luz_esta_encendida: bool,
+    dt_segundos: float
+) -> float:
+    # PPFD del ambiente (por lux) mas el del foco si esta prendido, integrado en dt
+    ppfd_foco = maceta.lux_foco * maceta.factor_luminaria
+    ppfd_ambiente = (lux_ambiente * maceta.factor_luminaria_ambiente) if lux_ambiente is not None else 0.0
+    ppfd_total = ppfd_ambiente + (ppfd_foco if luz_esta_encendida else 0.0)
+    return 0.0036 * ppfd_total * dt_segundos / 3600.0
+
+
 def calcular_y_controlar_dli(
     maceta: MacetaConfig, 
     lux_ambiente: Optional[float],
@@ -87,18 +116,10 @@ def calcular_y_controlar_dli(
     hora_inicio = maceta.hora_inicio_dia
     hora_fin = maceta.hora_fin_dia
     dli_objetivo = maceta.dli_objetivo
-    lux_foco = maceta.lux_foco
-    F_L = maceta.factor_luminaria
-    F_L_ambiente = maceta.factor_luminaria_ambiente
-    # Cálculo dinámico de PPFD y suma
-    ppfd_foco = lux_foco * F_L
-    ppfd_ambiente = (lux_ambiente * F_L_ambiente) if lux_ambiente is not None else 0.0
-    ppfd_total = ppfd_ambiente + (ppfd_foco if luz_esta_encendida else 0.0)
+    ppfd_foco = maceta.lux_foco * maceta.factor_luminaria
 
     # Integramos
-    horas_transcurridas = dt_segundos / 3600.0
-    incremento_dli = 0.0036 * ppfd_total * horas_transcurridas
-    nuevo_dli = dli_acumulado + incremento_dli
+    nuevo_dli = dli_acumulado + incremento_dli(maceta, lux_ambiente, luz_esta_encendida, dt_segundos)
 
     # --- EVALUACIÓN DEL FOTOPERIODO ---
     hora_actual_decimal = ahora.hour + (ahora.minute / 60.0)
@@ -197,14 +218,23 @@ def procesar_maceta(
 
     nuevo_estado.humedad_suelo_raw_1 = raw1
     nuevo_estado.humedad_suelo_raw_2 = raw2
+    nuevo_estado.muestras_humedad_1 = lecturas.get("muestras_humedad_1")
+    nuevo_estado.muestras_humedad_2 = lecturas.get("muestras_humedad_2")
+    nuevo_estado.varianza_humedad_1 = lecturas.get("varianza_humedad_1")
+    nuevo_estado.varianza_humedad_2 = lecturas.get("varianza_humedad_2")
     nuevo_estado.humedad_suelo_1_pct = hum1
     nuevo_estado.humedad_suelo_2_pct = hum2
     nuevo_estado.humedad_suelo_promedio_pct = promedio
     nuevo_estado.lux = lux
 
     # Procesar DHT
-    
-    if lectura_dht_valida(temperatura_c, humedad_ambiente_pct):
+    edad_dht_seg = lecturas.get("edad_dht_seg")
+
+    if edad_dht_seg is not None and edad_dht_seg > global_config.max_edad_dht_seg:
+        nuevo_estado.temperatura_c = None
+        nuevo_estado.humedad_ambiente_pct = None
+        alertas_humedad.append(f"Lectura de DHT obsoleta ({edad_dht_seg:.0f} s), se descarta")
+    elif lectura_dht_valida(temperatura_c, humedad_ambiente_pct):
         nuevo_estado.temperatura_c = temperatura_c
         nuevo_estado.humedad_ambiente_pct = humedad_ambiente_pct
     else:
@@ -240,6 +270,7 @@ def procesar_maceta(
     nuevo_estado.luz_encendida = luz_encendida
     nuevo_estado.ventilador_encendido = ventilador_encendido
     nuevo_estado.riego_pendiente = riego_pendiente
-    nuevo_estado.alertas = alertas_humedad + alertas_luz + alertas_vent + alertas_riego
+    alertas_dispositivos = alertas_disyuntores(lecturas.get("disyuntores") or [])
+    nuevo_estado.alertas = alertas_dispositivos + alertas_humedad + alertas_luz + alertas_vent + alertas_riego
 
     return nuevo_estado, nuevo_dli
@@ -0,0 +1,141 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from models import DisyuntorConfig, EstadoDisyuntor
+from reloj import RelojSistema
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class Disyuntor:
+    # Despues de fallos_para_abrir fallos seguidos el dispositivo se saltea sin
+    # tocar el bus. Pasada la espera se deja pasar una sola prueba: si anda se
+    # cierra, si no se vuelve a abrir con el doble de espera (hasta espera_max).
+    def __init__(self, config: DisyuntorConfig, reloj=None):
+        self.config = config
+        self.reloj = reloj or RelojSistema()
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.espera_seg = config.espera_inicial_seg
+        self.proximo_intento = 0.0
+
+    def permitir(self) -> bool:
+        if self.estado == CERRADO:
+            return True
+
+        if self.estado == ABIERTO and self.reloj.monotonic() >= self.proximo_intento:
+            self.estado = SEMIABIERTO
+            return True
+
+        # En SEMIABIERTO ya hay una prueba en curso
+        return False
+
+    def registrar_exito(self) -> None:
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.espera_seg = self.config.espera_inicial_seg
+
+    def registrar_fallo(self) -> None:
+        self.fallos_consecutivos += 1
+
+        if self.estado == SEMIABIERTO:
+            self.espera_seg = min(self.espera_seg * 2, self.config.espera_max_seg)
+            self.abrir()
+        elif self.estado == CERRADO and self.fallos_consecutivos >= self.config.fallos_para_abrir:
+            self.abrir()
+
+    def abrir(self) -> None:
+        self.estado = ABIERTO
+        self.proximo_intento = self.reloj.monotonic() + self.espera_seg
+
+    def segundos_para_reintento(self) -> Optional[float]:
+        if self.estado != ABIERTO:
+            return None
+        return max(0.0, self.proximo_intento - self.reloj.monotonic())
+
+
+class RegistroDisyuntores:
+    # Un disyuntor por dispositivo I2C ("adc.adc1", "bh1750.maceta1", ...)
+    def __init__(self, config: DisyuntorConfig, reloj=None):
+        self.config = config
+        self.reloj = reloj or RelojSistema()
+        self.disyuntores: Dict[str, Disyuntor] = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, clave: str, disponible: bool = True) -> None:
+        disyuntor = Disyuntor(self.config, self.reloj)
+        if not disponible:
+            # Fallo en el arranque: se abre de entrada y se reintenta con backoff
+            disyuntor.fallos_consecutivos = 1
+            disyuntor.abrir()
+        self.disyuntores[clave] = disyuntor
+
+    def disponible(self, clave: str, reinicializar: Optional[Callable[[], None]] = None) -> bool:
+        # Devuelve False sin tocar el bus si el disyuntor esta abierto. En la
+        # prueba de un disyuntor abierto se vuelve a inicializar el dispositivo.
+        disyuntor = self.disyuntores.get(clave)
+        if disyuntor is None:
+            return False
+
+        with self._lock:
+            if not disyuntor.permitir():
+                return False
+            probando = disyuntor.estado == SEMIABIERTO
+
+        if probando and reinicializar is not None:
+            try:
+                reinicializar()
+            except Exception:
+                self.fallo(clave)
+                return False
+
+        return True
+
+    def exito(self, clave: str) -> None:
+        with self._lock:
+            disyuntor = self.disyuntores.get(clave)
+            if disyuntor is not None:
+                if disyuntor.estado != CERRADO:
+                    print(f"\n{clave}: dispositivo recuperado")
+                disyuntor.registrar_exito()
+
+    def fallo(self, clave: str) -> None:
+        with self._lock:
+            disyuntor = self.disyuntores.get(clave)
+            if disyuntor is not None:
+                disyuntor.registrar_fallo()
+
+    def estados(self, claves: Iterable[str]) -> List[EstadoDisyuntor]:
+        # Solo los que no estan cerrados, para las alertas de la maceta
+        resultado = []
+
+        with self._lock:
+            for clave in claves:
+                disyuntor = self.disyuntores.get(clave)
+                if disyuntor is None or disyuntor.estado == CERRADO:
+                    continue
+
+                resultado.append(EstadoDisyuntor(
+                    dispositivo=clave,
+                    estado=disyuntor.estado,
+                    fallos_consecutivos=disyuntor.fallos_consecutivos,
+                    segundos_para_reintento=disyuntor.segundos_para_reintento()
+                ))
+
+        return resultado
+
+
+def claves_dispositivos_maceta(maceta) -> List[str]:
+    claves = []
+
+    for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+        clave = f"adc.{sensor.adc}"
+        if sensor.enabled and clave not in claves:
+            claves.append(clave)
+
+    if maceta.bh1750.enabled:
+        claves.append(f"bh1750.{maceta.nombre}")
+
+    return claves
@@ -0,0 +1,219 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Union
+
+from control import incremento_dli
+from models import SystemState
+from riego import MaquinaRiego
+
+VERSION_ESTADO = 1
+
+
+def ruta_estado(config) -> str:
+    if config.simulacion.enabled:
+        return config.simulacion.archivo_estado
+    return config.estado_persistente.archivo
+
+
+def escribir_atomico(ruta: str, contenido: Union[str, bytes]) -> None:
+    # Se escribe un temporal, se baja a la SD (fsync) y se renombra encima del
+    # anterior: si se corta la luz queda el archivo viejo o el nuevo entero,
+    # nunca uno a medias. El fsync del directorio hace durable el rename.
+    temporal = f"{ruta}.tmp"
+    binario = isinstance(contenido, bytes)
+    with open(temporal, "wb" if binario else "w", encoding=None if binario else "utf-8") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+    directorio = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    try:
+        os.fsync(directorio)
+    finally:
+        os.close(directorio)
+
+
+def leer_estado(ruta: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Estado guardado ilegible ({ruta}), se arranca de cero: {e}")
+        return None
+
+    if datos.get("version") != VERSION_ESTADO:
+        print(f"Estado guardado con version {datos.get('version')}, se arranca de cero")
+        return None
+    return datos
+
+
+class EstadoControlador:
+    # Checkpoint del controlador en cada ciclo: DLI de cada maceta con el dia
+    # al que corresponde, ultimo estado de luces y ventiladores, y el riego sin
+    # terminar. Al arrancar se recupera para que un reinicio a mitad del dia no
+    # vuelva el DLI a cero (y el foco no sobreilumine el resto del dia).
+    def __init__(self, config, reloj):
+        self.config = config
+        self.reloj = reloj
+        self.enabled = config.estado_persistente.enabled
+        self.ruta = ruta_estado(config)
+        self.guardados = 0
+        self.fallos = 0
+        self.tiempo_max_seg = 0.0
+        self.restaurado_ms: Optional[float] = None
+        self.parada_seg: Optional[float] = None
+        self.extrapolado_seg = 0.0
+        # Instante hasta el que esta integrado el DLI (el inicio del ultimo control)
+        self.dli_hasta: Optional[float] = None
+
+    def intervalo_control_seg(self) -> float:
+        if self.config.tareas.enabled:
+            return self.config.tareas.tareas["control_luz"].periodo_seg
+        return self.config.global_config.intervalo_lectura_seg
+
+    def guardar(
+        self,
+        estado_sistema: SystemState,
+        dli_acumulado_macetas: Dict[str, float],
+        maquina_riego: Optional[MaquinaRiego],
+        salidas_apagadas: bool = False,
+        dli_hasta: Optional[datetime] = None
+    ) -> None:
+        # dli_hasta: el ahora del control que acaba de integrar el DLI.
+        # salidas_apagadas: apagado limpio, el hardware ya quedo todo apagado
+        if not self.enabled:
+            return
+
+        inicio = time.perf_counter()
+        guardado = self.reloj.time()
+        if dli_hasta is not None:
+            self.dli_hasta = dli_hasta.timestamp()
+        hasta = self.dli_hasta if self.dli_hasta is not None else guardado
+        dia = datetime.fromtimestamp(hasta)
+        dli = {nombre: dli_acumulado_macetas.get(nombre, 0.0) for nombre in estado_sistema.macetas}
+
+        if salidas_apagadas:
+            # Desde el ultimo control hasta recien las salidas siguieron como
+            # estaban: ese tramo se integra aca (sin pasar de la medianoche,
+            # el DLI guardado es de un solo dia)
+            fin = min(guardado, datetime.combine(dia.date() + timedelta(days=1), datetime.min.time()).timestamp())
+            for nombre, estado in estado_sistema.macetas.items():
+                maceta = self.config.macetas.get(nombre)
+                if maceta is not None and maceta.luz.enabled:
+                    dli[nombre] += incremento_dli(maceta, estado.lux, estado.luz_encendida, max(0.0, fin - hasta))
+            hasta = max(hasta, fin)
+
+        datos = {
+            "version": VERSION_ESTADO,
+            "guardado": guardado,
+            "dli_hasta": hasta,
+            "dia": dia.strftime("%Y-%m-%d"),
+            "macetas": {
+                nombre: {
+                    "dli": dli[nombre],
+                    "lux": estado.lux,
+                    "luz": estado.luz_encendida and not salidas_apagadas,
+                    "ventilador": estado.ventilador_encendido and not salidas_apagadas,
+                }
+                for nombre, estado in estado_sistema.macetas.items()
+            },
+            "riego": maquina_riego.pendientes() if maquina_riego is not None else {},
+        }
+
+        # Un fallo de la SD no tiene que frenar el control
+        try:
+            escribir_atomico(self.ruta, json.dumps(datos))
+            self.guardados += 1
+        except OSError as e:
+            self.fallos += 1
+            print(f"\nNo se pudo guardar el estado en {self.ruta}: {e}")
+
+        self.tiempo_max_seg = max(self.tiempo_max_seg, time.perf_counter() - inicio)
+
+    def restaurar(
+        self,
+        estado_sistema: SystemState,
+        dli_acumulado_macetas: Dict[str, float],
+        maquina_riego: Optional[MaquinaRiego],
+        hw=None
+    ) -> bool:
+        # Devuelve True si habia un estado del mismo dia para retomar. Sin hw
+        # (fragmentacion: las luces son de otros procesos) no se tocan salidas.
+        if not self.enabled:
+            return False
+
+        inicio = time.perf_counter()
+        datos = leer_estado(self.ruta)
+        ahora = self.reloj.now()
+        if datos is None or datos.get("dia") != ahora.strftime("%Y-%m-%d"):
+            return False
+
+        # El DLI guardado vale hasta dli_hasta (el ultimo control, o el apagado
+        # si fue limpio). Desde ahi las salidas quedaron como en el checkpoint
+        # (un apagado limpio guarda todo apagado) y se integra con la ultima luz
+        # ambiente medida, pero a lo sumo un intervalo de control: mas alla la
+        # luz ambiente ya no es la misma y el tramo no se cuenta.
+        medianoche = datetime.combine(ahora.date(), datetime.min.time()).timestamp()
+        actual = self.reloj.time()
+        self.parada_seg = max(0.0, actual - max(datos["guardado"], medianoche))
+        hasta = max(datos.get("dli_hasta", datos["guardado"]), medianoche)
+        self.extrapolado_seg = min(max(0.0, actual - hasta), self.intervalo_control_seg())
+
+        for nombre, guardada in datos["macetas"].items():
+            maceta = self.config.macetas.get(nombre)
+            if maceta is None or nombre not in estado_sistema.macetas:
+                continue
+
+            dli = guardada["dli"]
+            if maceta.luz.enabled:
+                dli += incremento_dli(maceta, guardada["lux"], guardada["luz"], self.extrapolado_seg)
+            dli_acumulado_macetas[nombre] = dli
+
+            estado = estado_sistema.macetas[nombre]
+            estado.dli_acumulado = dli
+            estado.lux = guardada["lux"]
+            estado.luz_encendida = guardada["luz"]
+            estado.ventilador_encendido = guardada["ventilador"]
+
+        # Las salidas vuelven enseguida a como estaban, sin esperar el primer ciclo
+        if hw is not None:
+            with hw.lote_salidas():
+                for nombre, estado in estado_sistema.macetas.items():
+                    maceta = self.config.macetas[nombre]
+                    hw.set_luz_maceta(maceta, estado.luz_encendida)
+                    hw.set_ventilador_maceta(maceta, estado.ventilador_encendido)
+
+        # Un riego cortado se retoma con lo que le faltaba, salvo que ya
+        # hubiera pasado un intervalo: ese ciclo decide de nuevo con el sensor
+        retomados = 0
+        if (
+            maquina_riego is not None
+            and datos["riego"]
+            and self.parada_seg < self.config.global_config.intervalo_lectura_seg
+        ):
+            maquina_riego.reanudar(datos["riego"], self.config.macetas)
+            retomados = len(maquina_riego.cola)
+
+        self.dli_hasta = actual
+        self.restaurado_ms = (time.perf_counter() - inicio) * 1000
+        print(
+            f"Estado restaurado en {self.restaurado_ms:.1f} ms "
+            f"(caido {timedelta(seconds=round(self.parada_seg))}, DLI extrapolado "
+            f"{timedelta(seconds=round(self.extrapolado_seg))}, riegos retomados: {retomados})"
+        )
+        return True
+
+    def resumen(self) -> str:
+        if not self.enabled:
+            return "Estado persistente: deshabilitado"
+
+        restaurado = "no" if self.restaurado_ms is None else f"en {self.restaurado_ms:.1f} ms"
+        return (
+            f"Estado persistente: {self.guardados} checkpoints ({self.fallos} fallos, "
+            f"max {self.tiempo_max_seg * 1000:.1f} ms) | restaurado: {restaurado}"
+        )
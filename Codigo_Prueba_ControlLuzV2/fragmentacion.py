@@ -0,0 +1,373 @@
+import copy
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import wait
+from typing import Dict, List, Set
+
+from models import MacetaEstado, SystemConfig
+from reloj import RelojSistema
+
+
+def agrupar_macetas(config: SystemConfig, procesos: int) -> List[List[str]]:
+    # Las macetas que comparten un ADC van al mismo proceso (el multiplexor del
+    # PCF8591 se usa de a un canal); los grupos se reparten entre los procesos
+    # poniendo el mas grande donde haya menos macetas
+    grupos: List[Set[str]] = []
+    adcs_grupo: List[Set[str]] = []
+
+    for nombre_maceta, maceta in config.macetas.items():
+        if not maceta.enabled:
+            continue
+
+        adcs = {
+            sensor.adc
+            for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2)
+            if sensor.enabled
+        }
+        grupo, adcs_unidos = {nombre_maceta}, set(adcs)
+
+        for i in reversed(range(len(grupos))):
+            if adcs_grupo[i] & adcs:
+                grupo |= grupos.pop(i)
+                adcs_unidos |= adcs_grupo.pop(i)
+
+        grupos.append(grupo)
+        adcs_grupo.append(adcs_unidos)
+
+    fragmentos: List[List[str]] = [[] for _ in range(max(1, min(procesos, len(grupos))))]
+    for grupo in sorted(grupos, key=len, reverse=True):
+        min(fragmentos, key=len).extend(sorted(grupo))
+
+    return [fragmento for fragmento in fragmentos if fragmento]
+
+
+def config_fragmento(config: SystemConfig, nombres_macetas: List[str]) -> SystemConfig:
+    # Cada proceso ve solo sus macetas y sus ADC, con sensores, luces y
+    # ventiladores. La bomba y las valvulas quedan en el coordinador; las
+    # valvulas siguen habilitadas aca porque con ellas se decide el riego.
+    fragmento = copy.deepcopy(config)
+    fragmento.macetas = {nombre: fragmento.macetas[nombre] for nombre in nombres_macetas}
+
+    adcs_usados = set()
+    for maceta in fragmento.macetas.values():
+        for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+            if sensor.enabled:
+                adcs_usados.add(sensor.adc)
+
+    fragmento.adcs = {nombre: adc for nombre, adc in fragmento.adcs.items() if nombre in adcs_usados}
+    fragmento.bomba.enabled = False
+    fragmento.parada_emergencia.enabled = False
+    fragmento.muestreo.enabled = False
+    fragmento.tareas.enabled = False
+    fragmento.pipeline.enabled = False
+    fragmento.fragmentacion.enabled = False
+    return fragmento
+
+
+def config_hw_fragmento(fragmento: SystemConfig) -> SystemConfig:
+    # El hardware del fragmento se arma sin valvulas: no configura ni toca
+    # esos GPIO, que son del coordinador
+    config_hw = copy.deepcopy(fragmento)
+    for maceta in config_hw.macetas.values():
+        maceta.valvula.enabled = False
+    return config_hw
+
+
+def config_coordinador(config: SystemConfig) -> SystemConfig:
+    # El coordinador solo maneja la bomba compartida y las valvulas
+    coordinador = copy.deepcopy(config)
+    coordinador.i2c.enabled = False
+
+    for maceta in coordinador.macetas.values():
+        maceta.sensor_humedad_1.enabled = False
+        maceta.sensor_humedad_2.enabled = False
+        maceta.bh1750.enabled = False
+        maceta.dht.enabled = False
+        maceta.luz.enabled = False
+        maceta.ventilador.enabled = False
+
+    return coordinador
+
+
+def config_salidas_fragmento(config: SystemConfig, nombres_macetas: List[str]) -> SystemConfig:
+    # Solo las luces y ventiladores de un fragmento, para que el coordinador
+    # los apague si tuvo que matar el proceso
+    salidas = config_fragmento(config, nombres_macetas)
+    salidas.i2c.enabled = False
+
+    for maceta in salidas.macetas.values():
+        maceta.sensor_humedad_1.enabled = False
+        maceta.sensor_humedad_2.enabled = False
+        maceta.bh1750.enabled = False
+        maceta.dht.enabled = False
+        maceta.valvula.enabled = False
+
+    return salidas
+
+
+def _trabajador(config: SystemConfig, conexion, parada, detener, inicio: datetime) -> None:
+    # Proceso de un fragmento: lee sus sensores y controla luces y ventiladores
+    # cuando el coordinador se lo pide. Las senales las maneja el coordinador.
+    # En la simulacion el reloj arranca con el del coordinador y se alinea con
+    # el ahora de cada pedido.
+    from adquisicion import MotorAdquisicion
+    from main import controlar_macetas, crear_estado_inicial, crear_hardware, crear_reloj, obtener_macetas_activas
+    from planificador_dht import PlanificadorDHT
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    reloj = crear_reloj(config, inicio)
+    # El riego se decide con la config del fragmento (con valvulas) y el
+    # hardware se maneja con la que no las tiene
+    config_hw = config_hw_fragmento(config)
+    hw = crear_hardware(config_hw, reloj)
+    hw.inicializar()
+    planificador_dht = PlanificadorDHT(hw, config_hw, reloj)
+    planificador_dht.iniciar()
+    motor = MotorAdquisicion(
+        hw,
+        config.global_config.hilos_adquisicion,
+        config.global_config.modo_lectura_adc,
+        planificador_dht
+    )
+    estado_sistema = crear_estado_inicial(config)
+    macetas = obtener_macetas_activas(config)
+
+    # La parada de emergencia corta tambien las salidas de este proceso
+    def vigilar_parada() -> None:
+        parada.wait()
+        hw.parada_emergencia()
+
+    # Si el coordinador lo da por colgado, apaga y congela sus salidas y
+    # termina aunque el hilo principal siga trabado
+    def vigilar_detener() -> None:
+        detener.wait()
+        hw.parada_emergencia()
+        hw.cleanup()
+        os._exit(0)
+
+    threading.Thread(target=vigilar_parada, name="vigilar_parada", daemon=True).start()
+    threading.Thread(target=vigilar_detener, name="vigilar_detener", daemon=True).start()
+
+    try:
+        while True:
+            mensaje = conexion.recv()
+            if mensaje[0] == "fin":
+                break
+
+            _, dt_segundos, ahora, dli_acumulado_macetas = mensaje
+            reloj.avanzar_hasta(ahora)
+            comienzo = time.perf_counter()
+            lecturas = motor.leer_macetas(macetas)
+            estados, _ = controlar_macetas(
+                config, hw, estado_sistema, lecturas, dli_acumulado_macetas, dt_segundos, ahora
+            )
+            conexion.send((estados, time.perf_counter() - comienzo))
+    except (EOFError, OSError):
+        pass
+    finally:
+        planificador_dht.detener()
+        motor.cerrar()
+        hw.apagar_todo()
+        hw.cleanup()
+        conexion.close()
+
+
+class CoordinadorFragmentos:
+    # Reparte las macetas en procesos (cada uno con su HardwareManager) y
+    # junta los MacetaEstado de todos en cada ciclo. Los procesos trabajan en
+    # paralelo, asi el ciclo dura lo que el fragmento mas lento y no escala
+    # con la cantidad de macetas ni queda atado al GIL.
+    def __init__(self, config: SystemConfig, reloj=None):
+        procesos = config.fragmentacion.procesos or os.cpu_count() or 1
+        self.config = config
+        self.reloj = reloj or RelojSistema()
+        self.fragmentos = agrupar_macetas(config, procesos)
+        self._contexto = multiprocessing.get_context("spawn")
+        self.parada = self._contexto.Event()
+        self.procesos = [None] * len(self.fragmentos)
+        self.conexiones = [None] * len(self.fragmentos)
+        self.detenciones = [None] * len(self.fragmentos)
+        self.ciclos = 0
+        self.tiempo_max_seg: Dict[int, float] = {}
+        # Fragmentos que dejaron de contestar, con el motivo
+        self.caidos: Dict[int, str] = {}
+        # Backoff de reinicio: espera actual y cuando toca el proximo intento
+        self.espera_reinicio: Dict[int, float] = {}
+        self.proximo_reinicio: Dict[int, float] = {}
+        # Hardware con el que el coordinador mantiene apagadas las salidas de
+        # un fragmento que hubo que matar, hasta reiniciarlo
+        self._salidas_caidos: Dict[int, object] = {}
+        self.matados = 0
+        self.reinicios = 0
+
+    def iniciar(self) -> None:
+        for i in range(len(self.fragmentos)):
+            self._lanzar(i)
+
+        print(f"Fragmentos: {' | '.join(', '.join(fragmento) for fragmento in self.fragmentos)}")
+
+    def _lanzar(self, i: int) -> None:
+        fragmento = self.fragmentos[i]
+        conexion, conexion_hijo = self._contexto.Pipe()
+        detener = self._contexto.Event()
+        proceso = self._contexto.Process(
+            target=_trabajador,
+            args=(config_fragmento(self.config, fragmento), conexion_hijo, self.parada, detener, self.reloj.now()),
+            name=f"fragmento_{'_'.join(fragmento)}",
+            daemon=True
+        )
+        proceso.start()
+        conexion_hijo.close()
+        self.procesos[i] = proceso
+        self.conexiones[i] = conexion
+        self.detenciones[i] = detener
+
+    def ciclo(
+        self,
+        dt_segundos: float,
+        ahora: datetime,
+        dli_acumulado_macetas: Dict[str, float]
+    ) -> Dict[str, MacetaEstado]:
+        self._reiniciar_caidos()
+
+        # Primero se manda el pedido a todos y despues se esperan las respuestas
+        pendientes = {}
+        for i, (fragmento, conexion) in enumerate(zip(self.fragmentos, self.conexiones)):
+            if i in self.caidos:
+                continue
+            dli = {nombre: dli_acumulado_macetas.get(nombre, 0.0) for nombre in fragmento}
+            try:
+                conexion.send(("ciclo", dt_segundos, ahora, dli))
+                pendientes[conexion] = i
+            except (BrokenPipeError, OSError):
+                self._marcar_caido(i, "no acepta pedidos")
+
+        # Se espera de a poco para notar un proceso muerto sin llegar al timeout
+        estados: Dict[str, MacetaEstado] = {}
+        limite = time.monotonic() + self.config.fragmentacion.timeout_seg
+        while pendientes:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                for i in pendientes.values():
+                    self._marcar_caido(i, f"sin respuesta en {self.config.fragmentacion.timeout_seg:g} s")
+                break
+
+            for conexion in wait(list(pendientes), timeout=min(0.5, restante)):
+                i = pendientes.pop(conexion)
+                try:
+                    estados_fragmento, duracion = conexion.recv()
+                except (EOFError, OSError):
+                    self._marcar_caido(i, "cerro la conexion")
+                    continue
+                estados.update(estados_fragmento)
+                self.tiempo_max_seg[i] = max(self.tiempo_max_seg.get(i, 0.0), duracion)
+                # Contesto: el proximo reinicio vuelve a la espera inicial
+                self.espera_reinicio.pop(i, None)
+
+            for conexion, i in list(pendientes.items()):
+                if not self.procesos[i].is_alive():
+                    del pendientes[conexion]
+                    self._marcar_caido(i, f"proceso terminado (codigo {self.procesos[i].exitcode})")
+
+        # Las macetas de un fragmento caido quedan sin lecturas: conservan el
+        # DLI y no piden riego
+        for i, motivo in self.caidos.items():
+            for nombre in self.fragmentos[i]:
+                estados[nombre] = MacetaEstado(
+                    dli_acumulado=dli_acumulado_macetas.get(nombre, 0.0),
+                    alertas=[f"Fragmento {', '.join(self.fragmentos[i])} {motivo}, sin lecturas"]
+                )
+
+        self.ciclos += 1
+        return estados
+
+    def _marcar_caido(self, i: int, motivo: str) -> None:
+        # Un proceso colgado no se espera: si contestara tarde desordenaria
+        # los ciclos. Se termina y se reinicia mas adelante.
+        f = self.config.fragmentacion
+        espera = self.espera_reinicio.get(i, f.espera_reinicio_seg)
+        print(
+            f"\nFragmento {', '.join(self.fragmentos[i])} {motivo}: se termina y sus macetas "
+            f"quedan sin lecturas (reinicio en {espera:.0f} s)"
+        )
+        self.caidos[i] = motivo
+        self._terminar(i, f.timeout_parada_seg)
+        self.conexiones[i].close()
+        self.proximo_reinicio[i] = self.reloj.monotonic() + espera
+        self.espera_reinicio[i] = min(max(espera * 2, f.espera_reinicio_seg), f.espera_reinicio_max_seg)
+
+    def _terminar(self, i: int, timeout_seg: float) -> None:
+        # Se le pide que apague sus salidas y termine. Los fragmentos ignoran
+        # SIGTERM; si no termina a tiempo va SIGKILL y el finally del proceso
+        # no corre, asi que sus luces y ventiladores los apaga el coordinador.
+        proceso = self.procesos[i]
+        self.detenciones[i].set()
+        proceso.join(timeout_seg)
+        if not proceso.is_alive():
+            return
+
+        proceso.kill()
+        proceso.join(1.0)
+        self.matados += 1
+        self._salidas_caidos[i] = self._apagar_salidas(i)
+
+    def _apagar_salidas(self, i: int):
+        from main import crear_hardware
+
+        hw = crear_hardware(config_salidas_fragmento(self.config, self.fragmentos[i]), self.reloj)
+        # Configurar los pines ya los deja en apagado; quedan tomados por el
+        # coordinador hasta que el fragmento vuelva
+        hw.inicializar()
+        hw.apagar_todo()
+        print(f"\nFragmento {', '.join(self.fragmentos[i])}: luces y ventiladores apagados por el coordinador")
+        return hw
+
+    def _reiniciar_caidos(self) -> None:
+        for i in list(self.caidos):
+            if self.reloj.monotonic() < self.proximo_reinicio[i]:
+                continue
+
+            hw = self._salidas_caidos.pop(i, None)
+            if hw is not None:
+                hw.cleanup()
+            self._lanzar(i)
+            del self.caidos[i]
+            self.reinicios += 1
+            print(f"\nFragmento {', '.join(self.fragmentos[i])}: reiniciado")
+
+    def detener(self, timeout_seg: float = 10.0) -> None:
+        for i, conexion in enumerate(self.conexiones):
+            if i in self.caidos:
+                continue
+            try:
+                conexion.send(("fin",))
+            except (BrokenPipeError, OSError):
+                pass
+
+        limite = time.monotonic() + timeout_seg
+        for i, proceso in enumerate(self.procesos):
+            proceso.join(max(0.0, limite - time.monotonic()))
+            if proceso.is_alive():
+                self._terminar(i, self.config.fragmentacion.timeout_parada_seg)
+
+        for hw in self._salidas_caidos.values():
+            hw.cleanup()
+        self._salidas_caidos.clear()
+
+    def resumen(self) -> str:
+        lineas = [
+            f"Fragmentos: {len(self.fragmentos)} procesos, {self.ciclos} ciclos | "
+            f"reinicios: {self.reinicios} | matados: {self.matados}"
+        ]
+        for i, fragmento in enumerate(self.fragmentos):
+            lineas.append(
+                f" - {', '.join(fragmento):<30} ciclo mas lento: {self.tiempo_max_seg.get(i, 0.0) * 1000:.1f} ms"
+                + (f" | caido: {self.caidos[i]}" if i in self.caidos else "")
+            )
+        return "\n".join(lineas)
@@ -1,4 +1,6 @@
-from typing import Optional, Dict, Any, Tuple
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from contextlib import contextmanager
+import threading
 import time
 
 import board
@@ -9,21 +11,38 @@ import adafruit_bh1750
 from adafruit_pcf8591.pcf8591 import PCF8591
 from adafruit_pcf8591.analog_in import AnalogIn
 
-from models import SystemConfig, MacetaConfig, ActuadorConfig
+from lectura_adc import leer_rafaga_pcf8591, muestrear_canal, parametros_muestreo, resumir_canales
+from disyuntor import RegistroDisyuntores, claves_dispositivos_maceta
+from models import SystemConfig, MacetaConfig, ActuadorConfig, MuestreoADC, EstadoDisyuntor
+from salidas_gpio import RegistroSalidas
 
 
 class HardwareManager:
-    def __init__(self, config: SystemConfig):
+    def __init__(self, config: SystemConfig, reloj=None):
         self.config = config
         self.i2c = None
         self.adcs: Dict[str, Any] = {}
         self.bh1750: Dict[str, Any] = {}
         self.dht: Dict[str, Any] = {}
+        # Un solo bus I2C compartido: cada transaccion se hace con el lock tomado
+        self.bus_lock = threading.Lock()
+        # El multiplexor del PCF8591 se usa de a un canal por vez
+        self.adc_locks: Dict[str, threading.Lock] = {}
+        self.canales_adc: Dict[Tuple[str, int], Any] = {}
+        # Ultimo canal convertido por cada ADC (None si no se conoce)
+        self.ultimo_canal_adc: Dict[str, Optional[int]] = {}
+        # Ultimo nivel mandado a cada GPIO de salida; solo se escribe si cambia
+        self.registro_salidas = RegistroSalidas(self._escribir_gpio)
+        # Los dispositivos I2C que fallan seguido se saltean hasta el reintento
+        self.disyuntores = RegistroDisyuntores(config.disyuntores, reloj)
+        # Entrada del pulsador de parada, si este proceso la configuro
+        self.gpio_parada: Optional[int] = None
 
     def inicializar(self) -> None:
         self._inicializar_gpio()
         self._inicializar_i2c()
         self._inicializar_adcs()
+        self._inicializar_canales_adc()
         self._inicializar_bh1750()
         self._inicializar_dht()
 
@@ -35,13 +54,14 @@ class HardwareManager:
             self._configurar_salida(
                 self.config.bomba.gpio,
                 self.config.bomba.activa_bajo,
-                encendido=False
+                encendido=False,
+                nombre="bomba"
             )
 
         for maceta in self.config.macetas.values():
-            self._configurar_actuador(maceta.luz)
-            self._configurar_actuador(maceta.valvula)
-            self._configurar_actuador(maceta.ventilador)
+            self._configurar_actuador(maceta.luz, f"{maceta.nombre}.luz")
+            self._configurar_actuador(maceta.valvula, f"{maceta.nombre}.valvula")
+            self._configurar_actuador(maceta.ventilador, f"{maceta.nombre}.ventilador")
 
     def _inicializar_i2c(self) -> None:
         if not self.config.i2c.enabled:
@@ -57,10 +77,50 @@ class HardwareManager:
             if not adc_cfg.enabled:
                 continue
 
+            self.adc_locks[nombre_adc] = threading.Lock()
+
             try:
-                self.adcs[nombre_adc] = PCF8591(self.i2c, address=adc_cfg.direccion)
+                self._inicializar_adc(nombre_adc)
+                disponible = True
             except Exception:
                 self.adcs[nombre_adc] = None
+                disponible = False
+
+            self.disyuntores.agregar(f"adc.{nombre_adc}", disponible)
+
+    def _inicializar_adc(self, nombre_adc: str) -> None:
+        # Tambien se usa para reconectar un ADC que volvio despues de fallar
+        with self.bus_lock:
+            self.adcs[nombre_adc] = PCF8591(self.i2c, address=self.config.adcs[nombre_adc].direccion)
+
+        self.ultimo_canal_adc[nombre_adc] = None
+        for clave in [clave for clave in self.canales_adc if clave[0] == nombre_adc]:
+            self.canales_adc[clave] = AnalogIn(self.adcs[nombre_adc], clave[1])
+
+    def _inicializar_canales_adc(self) -> None:
+        for maceta in self.config.macetas.values():
+            if not maceta.enabled:
+                continue
+
+            for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+                if not sensor.enabled:
+                    continue
+
+                adc = self.adcs.get(sensor.adc)
+                if adc is None:
+                    continue
+
+                clave = (sensor.adc, sensor.canal)
+                if clave not in self.canales_adc:
+                    self.canales_adc[clave] = AnalogIn(adc, sensor.canal)
+
+    def _obtener_canal_adc(self, adc_nombre: str, canal: int):
+        # Los canales que no estan en config.toml (por ejemplo los de test_adc)
+        # se crean la primera vez y quedan registrados
+        clave = (adc_nombre, canal)
+        if clave not in self.canales_adc:
+            self.canales_adc[clave] = AnalogIn(self.adcs[adc_nombre], canal)
+        return self.canales_adc[clave]
 
     def _inicializar_bh1750(self) -> None:
         if self.i2c is None:
@@ -71,12 +131,20 @@ class HardwareManager:
                 continue
 
             try:
-                self.bh1750[nombre_maceta] = adafruit_bh1750.BH1750(
-                    self.i2c,
-                    address=maceta.bh1750.direccion
-                )
+                self._inicializar_bh1750_maceta(nombre_maceta)
+                disponible = True
             except Exception:
                 self.bh1750[nombre_maceta] = None
+                disponible = False
+
+            self.disyuntores.agregar(f"bh1750.{nombre_maceta}", disponible)
+
+    def _inicializar_bh1750_maceta(self, nombre_maceta: str) -> None:
+        with self.bus_lock:
+            self.bh1750[nombre_maceta] = adafruit_bh1750.BH1750(
+                self.i2c,
+                address=self.config.macetas[nombre_maceta].bh1750.direccion
+            )
 
     def _inicializar_dht(self) -> None:
         for nombre_maceta, maceta in self.config.macetas.items():
@@ -92,19 +160,36 @@ class HardwareManager:
             except Exception:
                 self.dht[nombre_maceta] = None
 
-    def _configurar_actuador(self, actuador: ActuadorConfig) -> None:
+    def _configurar_actuador(self, actuador: ActuadorConfig, nombre: str) -> None:
         if not actuador.enabled:
             return
 
         self._configurar_salida(
             gpio=actuador.gpio,
             activa_bajo=actuador.activa_bajo,
-            encendido=False
+            encendido=False,
+            nombre=nombre
         )
 
-    def _configurar_salida(self, gpio: int, activa_bajo: bool, encendido: bool) -> None:
+    def _configurar_salida(self, gpio: int, activa_bajo: bool, encendido: bool, nombre: str = "") -> None:
         GPIO.setup(gpio, GPIO.OUT)
-        GPIO.output(gpio, self._valor_salida(activa_bajo, encendido))
+        self.registro_salidas.configurar(gpio, self._valor_salida(activa_bajo, encendido), nombre)
+
+    def _escribir_gpio(self, gpios: List[int], niveles: List[int]) -> None:
+        # RPi.GPIO acepta listas de canales y niveles en una sola llamada
+        if len(gpios) == 1:
+            GPIO.output(gpios[0], niveles[0])
+        else:
+            GPIO.output(gpios, niveles)
+
+    def _fijar_salida(self, actuador, encendido: bool) -> None:
+        self.registro_salidas.fijar(actuador.gpio, self._valor_salida(actuador.activa_bajo, encendido))
+
+    @contextmanager
+    def lote_salidas(self):
+        # Los set_* dentro del bloque se escriben juntos al salir
+        with self.registro_salidas.lote():
+            yield
 
     def _valor_salida(self, activa_bajo: bool, encendido: bool) -> int:
         if activa_bajo:
@@ -117,38 +202,100 @@ class HardwareManager:
             raise ValueError(f"No existe board.{nombre} para GPIO BCM {gpio_bcm}")
         return getattr(board, nombre)
 
-    def leer_humedad_raw(self, adc_nombre: str, canal: int, muestras: int = 5) -> Optional[int]:
-        adc = self.adcs.get(adc_nombre)
-        if adc is None:
+    def _adc_disponible(self, adc_nombre: str) -> bool:
+        return self.disyuntores.disponible(f"adc.{adc_nombre}", lambda: self._inicializar_adc(adc_nombre))
+
+    def leer_humedad(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[MuestreoADC]:
+        if not self._adc_disponible(adc_nombre):
             return None
 
         try:
-            canal_adc = AnalogIn(adc, canal)
+            with self.adc_locks[adc_nombre]:
+                canal_adc = self._obtener_canal_adc(adc_nombre, canal)
+
+                # Si el multiplexor ya quedo en este canal no hace falta
+                # la lectura de descarte ni la espera de estabilizacion
+                calentar = self.ultimo_canal_adc.get(adc_nombre) != canal
+                self.ultimo_canal_adc[adc_nombre] = None
+
+                muestreo = muestrear_canal(
+                    lambda: self._leer_valor_adc(canal_adc),
+                    *parametros_muestreo(self.config.global_config, muestras),
+                    self.config.global_config.agregacion_adc,
+                    calentar
+                )
 
-            _ = canal_adc.value
-            time.sleep(0.1)
+                self.ultimo_canal_adc[adc_nombre] = canal
+            self.disyuntores.exito(f"adc.{adc_nombre}")
+            return muestreo
+        except Exception:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
+            return None
 
-            valores = []
-            for _i in range(muestras):
-                valores.append(canal_adc.value)
-                time.sleep(0.05)
+    def leer_humedad_raw(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[int]:
+        muestreo = self.leer_humedad(adc_nombre, canal, muestras)
+        return None if muestreo is None else muestreo.raw
 
-            raw16 = sum(valores) / len(valores)
-            raw8 = int(raw16 / 256)
-            return raw8
+    def leer_adc_muestreo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[MuestreoADC]]:
+        if not self._adc_disponible(adc_nombre):
+            return None
+
+        direccion = self.config.adcs[adc_nombre].direccion
+        # La rafaga es una sola transaccion: siempre se pide el maximo de muestras
+        cantidad = muestras or self.config.global_config.muestras_max_adc
+
+        try:
+            with self.adc_locks[adc_nombre], self.bus_lock:
+                # Despues del barrido el multiplexor queda en un canal indeterminado
+                self.ultimo_canal_adc[adc_nombre] = None
+                muestras_por_canal = leer_rafaga_pcf8591(self.i2c, direccion, cantidad)
+            self.disyuntores.exito(f"adc.{adc_nombre}")
+            return resumir_canales(muestras_por_canal, self.config.global_config.agregacion_adc)
         except Exception:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
             return None
 
+    def leer_adc_completo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[int]]:
+        vector = self.leer_adc_muestreo(adc_nombre, muestras)
+        return None if vector is None else [muestreo.raw for muestreo in vector]
+
+    def leer_valor_canal(self, adc_nombre: str, canal: int) -> int:
+        # Una sola conversion (valor de 16 bits de AnalogIn), sin esperas; la usa
+        # AsyncHardwareManager para hacer las esperas de estabilizacion con asyncio
+        if not self._adc_disponible(adc_nombre):
+            raise ValueError(f"ADC no disponible: {adc_nombre}")
+
+        try:
+            valor = self._leer_valor_adc(self._obtener_canal_adc(adc_nombre, canal))
+        except Exception:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
+            raise
+
+        self.disyuntores.exito(f"adc.{adc_nombre}")
+        return valor
+
+    def _leer_valor_adc(self, canal_adc) -> int:
+        # Solo la transaccion ocupa el bus; las esperas de estabilizacion lo liberan
+        with self.bus_lock:
+            return canal_adc.value
+
     def leer_lux(self, nombre_maceta: str) -> Optional[float]:
-        sensor = self.bh1750.get(nombre_maceta)
-        if sensor is None:
+        clave = f"bh1750.{nombre_maceta}"
+        if not self.disyuntores.disponible(clave, lambda: self._inicializar_bh1750_maceta(nombre_maceta)):
             return None
 
         try:
-            return float(sensor.lux)
+            with self.bus_lock:
+                lux = float(self.bh1750[nombre_maceta].lux)
+            self.disyuntores.exito(clave)
+            return lux
         except Exception:
+            self.disyuntores.fallo(clave)
             return None
 
+    def estados_disyuntores(self, maceta: MacetaConfig) -> List[EstadoDisyuntor]:
+        return self.disyuntores.estados(claves_dispositivos_maceta(maceta))
+
     def leer_dht(self, nombre_maceta: str) -> Tuple[Optional[float], Optional[float]]:
         sensor = self.dht.get(nombre_maceta)
         if sensor is None:
@@ -169,47 +316,64 @@ class HardwareManager:
         if not self.config.bomba.enabled:
             return
 
-        GPIO.output(
-            self.config.bomba.gpio,
-            self._valor_salida(self.config.bomba.activa_bajo, encendida)
-        )
+        self._fijar_salida(self.config.bomba, encendida)
 
     def set_luz_maceta(self, maceta: MacetaConfig, encendida: bool) -> None:
         if not maceta.luz.enabled:
             return
 
-        GPIO.output(
-            maceta.luz.gpio,
-            self._valor_salida(maceta.luz.activa_bajo, encendida)
-        )
+        self._fijar_salida(maceta.luz, encendida)
 
     def set_valvula_maceta(self, maceta: MacetaConfig, abierta: bool) -> None:
         if not maceta.valvula.enabled:
             return
 
-        GPIO.output(
-            maceta.valvula.gpio,
-            self._valor_salida(maceta.valvula.activa_bajo, abierta)
-        )
+        self._fijar_salida(maceta.valvula, abierta)
 
     def set_ventilador_maceta(self, maceta: MacetaConfig, encendido: bool) -> None:
         if not maceta.ventilador.enabled:
             return
 
-        GPIO.output(
-            maceta.ventilador.gpio,
-            self._valor_salida(maceta.ventilador.activa_bajo, encendido)
-        )
+        self._fijar_salida(maceta.ventilador, encendido)
 
     def apagar_todo(self) -> None:
-        self.set_bomba(False)
+        with self.lote_salidas():
+            self.set_bomba(False)
+
+            for maceta in self.config.macetas.values():
+                self.set_luz_maceta(maceta, False)
+                self.set_valvula_maceta(maceta, False)
+                self.set_ventilador_maceta(maceta, False)
+
+    def configurar_parada_emergencia(self, callback: Callable[[float], None]) -> None:
+        # Interrupcion por flanco: RPi.GPIO llama al callback desde su propio
+        # hilo, sin esperar a que termine ningun sleep del ciclo
+        parada = self.config.parada_emergencia
+        self.gpio_parada = parada.gpio
+        GPIO.setup(
+            parada.gpio,
+            GPIO.IN,
+            pull_up_down=GPIO.PUD_UP if parada.activa_bajo else GPIO.PUD_DOWN
+        )
+        GPIO.add_event_detect(
+            parada.gpio,
+            GPIO.FALLING if parada.activa_bajo else GPIO.RISING,
+            callback=lambda canal: callback(time.perf_counter()),
+            bouncetime=parada.rebote_ms
+        )
 
-        for maceta in self.config.macetas.values():
-            self.set_luz_maceta(maceta, False)
-            self.set_valvula_maceta(maceta, False)
-            self.set_ventilador_maceta(maceta, False)
+    def parada_emergencia(self) -> None:
+        # Apaga todo en una sola escritura y congela las salidas hasta reiniciar
+        with self.registro_salidas.congelar():
+            self.apagar_todo()
 
     def cleanup(self) -> None:
+        if self.gpio_parada is not None:
+            try:
+                GPIO.remove_event_detect(self.gpio_parada)
+            except Exception:
+                pass
+
         for sensor in self.dht.values():
             if sensor is not None:
                 try:
@@ -217,4 +381,10 @@ class HardwareManager:
                 except Exception:
                     pass
 
-        GPIO.cleanup([5, 19, 26])
+        # Solo los pines que configuro este proceso: con fragmentacion los
+        # demas son del coordinador o de otros fragmentos
+        pines = list(self.registro_salidas.niveles)
+        if self.gpio_parada is not None:
+            pines.append(self.gpio_parada)
+        if pines:
+            GPIO.cleanup(pines)
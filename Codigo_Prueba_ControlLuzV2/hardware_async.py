@@ -0,0 +1,97 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from lectura_adc import muestrear_canal_async, parametros_muestreo
+from models import MacetaConfig, MuestreoADC
+from reloj import RelojSistema
+
+
+class AsyncHardwareManager:
+    # Envuelve un HardwareManager (o SimulatedHardwareManager). Las transacciones
+    # de bus y el DHT corren en hilos con asyncio.to_thread; las esperas de
+    # estabilizacion son reloj.dormir_async (asyncio.sleep con el reloj del
+    # sistema), asi el loop sigue atendiendo otras tareas.
+    def __init__(self, hw, reloj=None):
+        self.hw = hw
+        self.config = hw.config
+        self.reloj = reloj or RelojSistema()
+        self.adc_locks: Dict[str, asyncio.Lock] = {}
+
+    async def dormir(self, segundos: float) -> None:
+        await self.reloj.dormir_async(segundos)
+
+    async def inicializar(self) -> None:
+        await asyncio.to_thread(self.hw.inicializar)
+
+    def _lock_adc(self, adc_nombre: str) -> asyncio.Lock:
+        if adc_nombre not in self.adc_locks:
+            self.adc_locks[adc_nombre] = asyncio.Lock()
+        return self.adc_locks[adc_nombre]
+
+    async def leer_humedad(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[MuestreoADC]:
+        # Si el ADC no existe o su disyuntor esta abierto leer_valor_canal
+        # lanza la excepcion enseguida, sin tocar el bus
+        async with self._lock_adc(adc_nombre):
+            try:
+                calentar = self.hw.ultimo_canal_adc.get(adc_nombre) != canal
+                self.hw.ultimo_canal_adc[adc_nombre] = None
+
+                muestreo = await muestrear_canal_async(
+                    lambda: asyncio.to_thread(self.hw.leer_valor_canal, adc_nombre, canal),
+                    *parametros_muestreo(self.config.global_config, muestras),
+                    self.config.global_config.agregacion_adc,
+                    calentar,
+                    dormir=self.dormir
+                )
+
+                self.hw.ultimo_canal_adc[adc_nombre] = canal
+                return muestreo
+            except Exception:
+                return None
+
+    async def leer_humedad_raw(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[int]:
+        muestreo = await self.leer_humedad(adc_nombre, canal, muestras)
+        return None if muestreo is None else muestreo.raw
+
+    async def leer_adc_muestreo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[MuestreoADC]]:
+        async with self._lock_adc(adc_nombre):
+            return await asyncio.to_thread(self.hw.leer_adc_muestreo, adc_nombre, muestras)
+
+    async def leer_adc_completo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[int]]:
+        vector = await self.leer_adc_muestreo(adc_nombre, muestras)
+        return None if vector is None else [muestreo.raw for muestreo in vector]
+
+    async def leer_lux(self, nombre_maceta: str) -> Optional[float]:
+        return await asyncio.to_thread(self.hw.leer_lux, nombre_maceta)
+
+    async def leer_dht(self, nombre_maceta: str) -> Tuple[Optional[float], Optional[float]]:
+        return await asyncio.to_thread(self.hw.leer_dht, nombre_maceta)
+
+    def estados_disyuntores(self, maceta: MacetaConfig):
+        return self.hw.estados_disyuntores(maceta)
+
+    # Escribir un GPIO no bloquea, las salidas se llaman directo
+    @property
+    def registro_salidas(self):
+        return self.hw.registro_salidas
+
+    def lote_salidas(self):
+        return self.hw.lote_salidas()
+
+    def set_bomba(self, encendida: bool) -> None:
+        self.hw.set_bomba(encendida)
+
+    def set_luz_maceta(self, maceta: MacetaConfig, encendida: bool) -> None:
+        self.hw.set_luz_maceta(maceta, encendida)
+
+    def set_valvula_maceta(self, maceta: MacetaConfig, abierta: bool) -> None:
+        self.hw.set_valvula_maceta(maceta, abierta)
+
+    def set_ventilador_maceta(self, maceta: MacetaConfig, encendido: bool) -> None:
+        self.hw.set_ventilador_maceta(maceta, encendido)
+
+    def apagar_todo(self) -> None:
+        self.hw.apagar_todo()
+
+    def cleanup(self) -> None:
+        self.hw.cleanup()
@@ -0,0 +1,168 @@
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models import MuestreoADC
+
+CANALES_PCF8591 = 4
+
+# Bit 6: salida analogica habilitada, bit 2: auto-incremento de canal.
+# Con auto-incremento la hoja de datos pide la salida analogica habilitada para
+# que el oscilador interno no se apague entre conversiones.
+CONTROL_SALIDA_ANALOGICA = 0x40
+CONTROL_AUTOINCREMENTO = 0x04
+
+# Esperas de leer_humedad_raw al cambiar de canal y entre muestras
+ESPERA_ESTABILIZACION_SEG = 0.1
+ESPERA_ENTRE_MUESTRAS_SEG = 0.05
+
+AGREGACIONES_ADC = ("mediana", "media_recortada", "media")
+
+# Espera entre intentos de tomar el bus I2C y tiempo maximo para tomarlo
+ESPERA_BUS_SEG = 0.001
+TIMEOUT_BUS_SEG = 1.0
+
+
+def _tomar_bus(i2c) -> None:
+    # Los llamadores del HardwareManager ya tienen bus_lock, asi que el bus
+    # solo puede estar tomado por otro driver (o un benchmark). Se reintenta
+    # durmiendo, sin quemar CPU, y pasado el timeout la lectura falla.
+    limite = time.monotonic() + TIMEOUT_BUS_SEG
+    while not i2c.try_lock():
+        if time.monotonic() >= limite:
+            raise TimeoutError(f"Bus I2C ocupado por mas de {TIMEOUT_BUS_SEG} s")
+        time.sleep(ESPERA_BUS_SEG)
+
+
+def leer_canal_pcf8591(i2c, direccion: int, canal: int) -> int:
+    # Misma transaccion que hace adafruit_pcf8591: se elige el canal y se leen dos
+    # bytes, el primero es la conversion anterior y se descarta
+    buffer = bytearray(2)
+
+    _tomar_bus(i2c)
+    try:
+        i2c.writeto(direccion, bytes([CONTROL_SALIDA_ANALOGICA | (canal & 0x03)]))
+        i2c.readfrom_into(direccion, buffer)
+    finally:
+        i2c.unlock()
+
+    return buffer[1]
+
+
+def leer_rafaga_pcf8591(i2c, direccion: int, muestras: int) -> List[List[int]]:
+    # Una sola lectura con auto-incremento recorre los 4 canales en orden.
+    # El primer byte es la conversion anterior y el primer barrido completo se
+    # descarta igual que la lectura de descarte de leer_humedad_raw.
+    descartes = 1 + CANALES_PCF8591
+    buffer = bytearray(descartes + CANALES_PCF8591 * muestras)
+
+    _tomar_bus(i2c)
+    try:
+        i2c.writeto(direccion, bytes([CONTROL_SALIDA_ANALOGICA | CONTROL_AUTOINCREMENTO]))
+        i2c.readfrom_into(direccion, buffer)
+    finally:
+        i2c.unlock()
+
+    datos = buffer[descartes:]
+    return [list(datos[canal::CANALES_PCF8591]) for canal in range(CANALES_PCF8591)]
+
+
+def agregar_muestras(valores: List[float], metodo: str = "mediana") -> float:
+    if metodo == "mediana":
+        return statistics.median(valores)
+
+    if metodo == "media_recortada":
+        # Se descarta el 20 % de cada extremo (nada si hay menos de 5 muestras)
+        ordenados = sorted(valores)
+        recorte = len(ordenados) // 5
+        if recorte:
+            ordenados = ordenados[recorte:-recorte]
+        return sum(ordenados) / len(ordenados)
+
+    return sum(valores) / len(valores)
+
+
+def varianza_muestras(valores: List[float]) -> float:
+    return statistics.variance(valores) if len(valores) > 1 else 0.0
+
+
+def resumir_muestras(valores: List[float], metodo: str = "mediana") -> MuestreoADC:
+    return MuestreoADC(
+        raw=int(agregar_muestras(valores, metodo)),
+        muestras=len(valores),
+        varianza=varianza_muestras(valores)
+    )
+
+
+def resumir_canales(muestras_por_canal: List[List[int]], metodo: str = "mediana") -> List[MuestreoADC]:
+    return [resumir_muestras(valores, metodo) for valores in muestras_por_canal]
+
+
+def lecturas_humedad(numero: int, muestreo: Optional[MuestreoADC]) -> Dict[str, Optional[float]]:
+    # Claves del dict de lecturas para el sensor de humedad 1 o 2
+    if muestreo is None:
+        return {f"humedad_raw_{numero}": None, f"muestras_humedad_{numero}": None, f"varianza_humedad_{numero}": None}
+
+    return {
+        f"humedad_raw_{numero}": muestreo.raw,
+        f"muestras_humedad_{numero}": muestreo.muestras,
+        f"varianza_humedad_{numero}": muestreo.varianza,
+    }
+
+
+def parametros_muestreo(global_config, muestras: Optional[int] = None) -> Tuple[int, int, float]:
+    # Minimo, maximo y varianza objetivo; con muestras explicitas se toma siempre esa cantidad
+    g = global_config
+    if muestras is not None:
+        return muestras, muestras, g.varianza_max_adc
+    return g.muestras_min_adc, g.muestras_max_adc, g.varianza_max_adc
+
+
+def _muestreo_completo(valores: List[float], muestras_min: int, varianza_max: float) -> bool:
+    return len(valores) >= muestras_min and varianza_muestras(valores) <= varianza_max
+
+
+def muestrear_canal(
+    leer: Callable[[], int],
+    muestras_min: int,
+    muestras_max: int,
+    varianza_max: float,
+    metodo: str = "mediana",
+    calentar: bool = True,
+    dormir: Callable[[float], None] = time.sleep
+) -> MuestreoADC:
+    # Muestreo adaptativo en cuentas de 8 bits: se corta apenas hay muestras_min
+    # con varianza bajo el umbral y solo se insiste hasta muestras_max si la
+    # senal viene ruidosa. No se espera despues de la ultima muestra.
+    if calentar:
+        leer()
+        dormir(ESPERA_ESTABILIZACION_SEG)
+
+    valores = [leer() / 256]
+    while len(valores) < muestras_max and not _muestreo_completo(valores, muestras_min, varianza_max):
+        dormir(ESPERA_ENTRE_MUESTRAS_SEG)
+        valores.append(leer() / 256)
+
+    return resumir_muestras(valores, metodo)
+
+
+async def muestrear_canal_async(
+    leer: Callable[[], Awaitable[int]],
+    muestras_min: int,
+    muestras_max: int,
+    varianza_max: float,
+    metodo: str = "mediana",
+    calentar: bool = True,
+    dormir: Callable[[float], Awaitable[None]] = asyncio.sleep
+) -> MuestreoADC:
+    if calentar:
+        await leer()
+        await dormir(ESPERA_ESTABILIZACION_SEG)
+
+    valores = [await leer() / 256]
+    while len(valores) < muestras_max and not _muestreo_completo(valores, muestras_min, varianza_max):
+        await dormir(ESPERA_ENTRE_MUESTRAS_SEG)
+        valores.append(await leer() / 256)
+
+    return resumir_muestras(valores, metodo)
@@ -1,19 +1,34 @@
-import csv
-import os
-import time
+import sys
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
 
 import requests
 
+from adquisicion import MotorAdquisicion
+from cola_subida import DESCARTAR, ENVIADO, REINTENTAR, ColaSubida
 from config_loader import cargar_configuracion
 from control import procesar_maceta
-from hardware import HardwareManager
-from models import MacetaEstado, SystemState
-
-
-def valor_csv(valor):
-    return "" if valor is None else valor
+from estado_persistente import EstadoControlador
+from fragmentacion import CoordinadorFragmentos, config_coordinador
+from lectura_adc import lecturas_humedad
+from models import InfoCiclo, MacetaConfig, MacetaEstado, MuestreoADC, SystemState
+from muestreo_continuo import MuestreadorContinuo
+from parada_emergencia import ParadaEmergencia
+from pipeline import PipelineSalidas
+from planificador_ciclos import PlanificadorCiclos
+from planificador_dht import PlanificadorDHT
+from planificador_tareas import PlanificadorTareas
+from presupuesto import REGISTRO, SUBIDA, PresupuestoCiclo
+from reloj import RelojSistema, RelojVirtual
+from riego import MaquinaRiego
+from senales import ControlSenales
+from telemetria import RegistroTelemetria
+
+# Los drivers de la Raspberry solo se importan si se usa el hardware real
+if TYPE_CHECKING:
+    from hardware import HardwareManager
 
 
 def crear_estado_inicial(config) -> SystemState:
@@ -26,33 +41,60 @@ def crear_estado_inicial(config) -> SystemState:
     return estado
 
 
-def leer_maceta(hw: HardwareManager, maceta) -> Dict[str, Optional[float]]:
-    raw1 = None
-    raw2 = None
+def leer_humedad(hw: "HardwareManager", sensor, lecturas_adc) -> Optional[MuestreoADC]:
+    if lecturas_adc is not None and sensor.adc in lecturas_adc:
+        vector = lecturas_adc[sensor.adc]
+        return None if vector is None else vector[sensor.canal]
+
+    return hw.leer_humedad(sensor.adc, sensor.canal)
+
+
+def leer_maceta(
+    hw: "HardwareManager",
+    maceta,
+    motor: Optional[MotorAdquisicion] = None,
+    lecturas_adc: Optional[Dict[str, Optional[List[MuestreoADC]]]] = None,
+    planificador_dht: Optional[PlanificadorDHT] = None
+) -> Dict[str, Optional[float]]:
+    if motor is not None:
+        return motor.leer_maceta(maceta)
+
+    muestreo1 = None
+    muestreo2 = None
     lux_ambiente = None
     temperatura_c = None
     humedad_ambiente_pct = None
+    edad_dht_seg = None
 
     if maceta.sensor_humedad_1.enabled:
-        raw1 = hw.leer_humedad_raw(maceta.sensor_humedad_1.adc, maceta.sensor_humedad_1.canal)
+        muestreo1 = leer_humedad(hw, maceta.sensor_humedad_1, lecturas_adc)
 
     if maceta.sensor_humedad_2.enabled:
-        raw2 = hw.leer_humedad_raw(maceta.sensor_humedad_2.adc, maceta.sensor_humedad_2.canal)
+        muestreo2 = leer_humedad(hw, maceta.sensor_humedad_2, lecturas_adc)
 
     if maceta.bh1750.enabled:
         lux_ambiente= hw.leer_lux(maceta.nombre)
 
     if maceta.dht.enabled:
-        temperatura_c, humedad_ambiente_pct = hw.leer_dht(maceta.nombre)
+        if planificador_dht is not None:
+            temperatura_c, humedad_ambiente_pct, edad_dht_seg = planificador_dht.leer(maceta.nombre)
+        else:
+            temperatura_c, humedad_ambiente_pct = hw.leer_dht(maceta.nombre)
 
     return {
-        "humedad_raw_1": raw1,
-        "humedad_raw_2": raw2,
+        **lecturas_humedad(1, muestreo1),
+        **lecturas_humedad(2, muestreo2),
         "lux": lux_ambiente,    # Se usara para la logica
         "temperatura_c": temperatura_c,
         "humedad_ambiente_pct": humedad_ambiente_pct,
+        "edad_dht_seg": edad_dht_seg,
+        "disyuntores": hw.estados_disyuntores(maceta),
     }
 
+def formatear_varianza(varianza: Optional[float]) -> str:
+    return "-" if varianza is None else f"{varianza:.2f}"
+
+
 def imprimir_estado_maceta(nombre_maceta: str, estado: MacetaEstado) -> None:
     print(f"\n--- {nombre_maceta} ---")
     print(
@@ -60,6 +102,10 @@ def imprimir_estado_maceta(nombre_maceta: str, estado: MacetaEstado) -> None:
         f"(prom={estado.humedad_suelo_promedio_pct})"
     )
     print(f"Raw: {estado.humedad_suelo_raw_1} / {estado.humedad_suelo_raw_2}")
+    print(
+        f"Muestras: {estado.muestras_humedad_1} / {estado.muestras_humedad_2} "
+        f"(var={formatear_varianza(estado.varianza_humedad_1)} / {formatear_varianza(estado.varianza_humedad_2)})"
+    )
     
     # <-- Actualizamos esta linea:
     print(
@@ -80,61 +126,8 @@ def imprimir_estado_maceta(nombre_maceta: str, estado: MacetaEstado) -> None:
         f"DLI Acumulado: {getattr(estado, 'dli_acumulado', 0.0):.2f} mol/m2/d"
         )
 
-def guardar_csv(config, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
-    archivo = config.global_config.archivo_csv
-    existe = os.path.isfile(archivo)
-
-    with open(archivo, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-
-        if not existe:
-            writer.writerow([
-                "fecha",
-                "hora",
-                "maceta",
-                "humedad_raw_1",
-                "humedad_raw_2",
-                "humedad_pct_1",
-                "humedad_pct_2",
-                "humedad_pct_promedio",
-                "lux",          # (ambiente)
-                "dli_acumulado",  # <-- NUEVA Variable
-                "temperatura_c",
-                "humedad_ambiente_pct",
-                "luz_encendida",
-                "ventilador_encendido",
-                "riego_pendiente",
-                "alertas",
-            ])
-
-        for nombre_maceta, estado in estados.items():
-            writer.writerow([
-                ahora.strftime("%Y-%m-%d"),
-                ahora.strftime("%H:%M:%S"),
-                nombre_maceta,
-                valor_csv(estado.humedad_suelo_raw_1),
-                valor_csv(estado.humedad_suelo_raw_2),
-                valor_csv(estado.humedad_suelo_1_pct),
-                valor_csv(estado.humedad_suelo_2_pct),
-                valor_csv(estado.humedad_suelo_promedio_pct),
-                valor_csv(estado.lux),
-                valor_csv(estado.temperatura_c),
-                valor_csv(estado.humedad_ambiente_pct),
-                int(estado.luz_encendida),
-                int(estado.ventilador_encendido),
-                int(estado.riego_pendiente),
-                " | ".join(estado.alertas),
-            ])
-
-
-def subir_thingspeak(config, estados: Dict[str, MacetaEstado]) -> None:
-    if not config.thingspeak.enabled:
-        return
-
-    payload = {
-        "api_key": config.thingspeak.api_key,
-    }
-
+def payload_thingspeak(config, estados: Dict[str, MacetaEstado]) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {}
     field_map = config.thingspeak.fields
 
     if "maceta1" in estados:
@@ -159,115 +152,564 @@ def subir_thingspeak(config, estados: Dict[str, MacetaEstado]) -> None:
         if e.humedad_ambiente_pct is not None:
             payload[field_map.humedad_ambiente_maceta2] = round(e.humedad_ambiente_pct, 2)
 
-    if len(payload) == 1:
-        return
+    return payload
 
+
+def enviar_thingspeak(config, payload: Dict[str, Any], timeout_seg: float = 5.0) -> str:
+    # La api_key no se guarda en la cola: se agrega al enviar
     try:
         respuesta = requests.post(
             config.thingspeak.url,
-            data=payload,
-            timeout=5
+            data={"api_key": config.thingspeak.api_key, **payload},
+            timeout=timeout_seg
         )
-        if respuesta.status_code == 200:
-            print(f"\nThingSpeak OK: {respuesta.text}")
-        else:
-            print(f"\nThingSpeak error HTTP: {respuesta.status_code}")
     except Exception as e:
         print(f"\nThingSpeak fallo: {e}")
+        return REINTENTAR
+
+    if respuesta.status_code != 200:
+        print(f"\nThingSpeak error HTTP: {respuesta.status_code}")
+        # 4xx (api_key o campos invalidos) no se arregla reintentando; 429 si
+        if 400 <= respuesta.status_code < 500 and respuesta.status_code not in (408, 429):
+            return DESCARTAR
+        return REINTENTAR
+    # ThingSpeak contesta 0 si no acepto la entrada (por ejemplo, antes de 15 s)
+    if respuesta.text.strip() == "0":
+        print("\nThingSpeak rechazo la entrada")
+        return REINTENTAR
+
+    print(f"\nThingSpeak OK: {respuesta.text}")
+    return ENVIADO
+
+
+def subir_thingspeak(
+    config,
+    estados: Dict[str, MacetaEstado],
+    timeout_seg: float = 5.0,
+    cola_subida: Optional[ColaSubida] = None,
+    ahora: Optional[datetime] = None
+) -> None:
+    # En simulacion no se suben datos inventados al canal real
+    if not config.thingspeak.enabled or config.simulacion.enabled:
+        return
 
+    payload = payload_thingspeak(config, estados)
+    if not payload:
+        return
 
-def ejecutar_riego_secuencial(config, hw: HardwareManager, macetas_a_regar) -> None:
-    for maceta in macetas_a_regar:
-        print(f"\nRegando {maceta.nombre}")
+    if cola_subida is None:
+        enviar_thingspeak(config, payload, timeout_seg)
+        return
 
-        hw.set_valvula_maceta(maceta, True)
-        time.sleep(0.5)
+    # Con la hora de la medicion, lo que se reenvia despues queda en su lugar
+    # en el canal
+    payload["created_at"] = (ahora or datetime.now()).astimezone().isoformat(timespec="seconds")
+    # Mientras haya pendientes se encola detras, para no desordenar el canal.
+    # Lo que ThingSpeak rechaza para siempre no se encola.
+    if cola_subida.pendientes or enviar_thingspeak(config, payload, timeout_seg) == REINTENTAR:
+        cola_subida.encolar(payload)
+
+
+def crear_cola_subida(config) -> Optional[ColaSubida]:
+    if not config.cola_subida.enabled or not config.thingspeak.enabled or config.simulacion.enabled:
+        return None
+    return ColaSubida(
+        config.cola_subida.archivo,
+        config.cola_subida,
+        lambda payload, timeout_seg: enviar_thingspeak(config, payload, timeout_seg)
+    )
 
-        hw.set_bomba(True)
-        time.sleep(maceta.tiempo_riego_seg)
 
-        hw.set_bomba(False)
-        time.sleep(config.global_config.delay_post_bomba_seg)
+def obtener_macetas_activas(config) -> Dict[str, MacetaConfig]:
+    return {
+        nombre_maceta: maceta
+        for nombre_maceta, maceta in config.macetas.items()
+        if maceta.enabled
+    }
 
-        hw.set_valvula_maceta(maceta, False)
 
+def controlar_macetas(
+    config,
+    hw: "HardwareManager",
+    estado_sistema: SystemState,
+    lecturas_ciclo: Dict[str, Dict[str, Optional[float]]],
+    dli_acumulado_macetas: Dict[str, float],
+    dt_segundos: float,
+    ahora: datetime
+) -> Tuple[Dict[str, MacetaEstado], List[MacetaConfig]]:
+    estados_ciclo: Dict[str, MacetaEstado] = {}
+    macetas_a_regar = []
+
+    for nombre_maceta, lecturas in lecturas_ciclo.items():
+        maceta = config.macetas[nombre_maceta]
+        estado_anterior = estado_sistema.macetas[nombre_maceta]
+
+        nuevo_estado, nuevo_dli = procesar_maceta(
+            maceta=maceta,
+            estado=estado_anterior,
+            lecturas=lecturas,
+            global_config=config.global_config,
+            dli_acumulado_actual= dli_acumulado_macetas[nombre_maceta], # <-- NUEVO PARÁMETRO
+            dt_segundos= dt_segundos,
+            ahora=ahora
+        )
+        dli_acumulado_macetas[nombre_maceta]=nuevo_dli
+        nuevo_estado.dli_acumulado = nuevo_dli
 
-def main():
-    config = cargar_configuracion("config.toml")
-    estado_sistema = crear_estado_inicial(config)
-    hw = HardwareManager(config)
-    dli_acumulado_macetas = {
-    "maceta1": 0.0,
-    "maceta2": 0.0
-    }
-    ultimo_tiempo_lectura = time.time()
-    dia_actual = datetime.now().day
+        estados_ciclo[nombre_maceta] = nuevo_estado
+        estado_sistema.macetas[nombre_maceta] = nuevo_estado
 
-    print("Iniciando sistema")
-    hw.inicializar()
+        if nuevo_estado.riego_pendiente:
+            macetas_a_regar.append(maceta)
 
-    try:
-        while True:
-            ahora = datetime.now()
-            print(f"\n===== Ciclo {ahora.strftime('%Y-%m-%d %H:%M:%S')} =====")
-
-            estados_ciclo: Dict[str, MacetaEstado] = {}
-            macetas_a_regar = []
-            tiempo_actual= time.time()
-            dt_segundos= tiempo_actual - ultimo_tiempo_lectura
-            ultimo_tiempo_lectura = tiempo_actual
-
-            if ahora.day != dia_actual:
-                for key in dli_acumulado_macetas:
-                    dli_acumulado_macetas[key] = 0.0
-                dia_actual = ahora.day
-
-            for nombre_maceta, maceta in config.macetas.items():
-                if not maceta.enabled:
-                    continue
-
-                estado_anterior = estado_sistema.macetas[nombre_maceta]
-                lecturas = leer_maceta(hw, maceta)
-
-                nuevo_estado, nuevo_dli = procesar_maceta(
-                    maceta=maceta,
-                    estado=estado_anterior,
-                    lecturas=lecturas,
-                    global_config=config.global_config,
-                    dli_acumulado_actual= dli_acumulado_macetas[nombre_maceta], # <-- NUEVO PARÁMETRO
-                    dt_segundos= dt_segundos,
-                    ahora=ahora
-                )
-                dli_acumulado_macetas[nombre_maceta]=nuevo_dli
-                nuevo_estado.dli_acumulado = nuevo_dli
+        imprimir_estado_maceta(nombre_maceta, nuevo_estado)
+
+    # Las luces y ventiladores que cambiaron se escriben en un solo GPIO.output;
+    # los que quedan igual no tocan el hardware
+    with hw.lote_salidas():
+        for nombre_maceta, estado in estados_ciclo.items():
+            maceta = config.macetas[nombre_maceta]
+            hw.set_luz_maceta(maceta, estado.luz_encendida)
+            hw.set_ventilador_maceta(maceta, estado.ventilador_encendido)
+
+    return estados_ciclo, macetas_a_regar
 
-                hw.set_luz_maceta(maceta, nuevo_estado.luz_encendida)
-                hw.set_ventilador_maceta(maceta, nuevo_estado.ventilador_encendido)
 
-                estados_ciclo[nombre_maceta] = nuevo_estado
-                estado_sistema.macetas[nombre_maceta] = nuevo_estado
+def crear_reloj(config, inicio: Optional[datetime] = None):
+    if config.simulacion.enabled:
+        return RelojVirtual(inicio)
+    return RelojSistema()
 
-                if nuevo_estado.riego_pendiente:
-                    macetas_a_regar.append(maceta)
 
-                imprimir_estado_maceta(nombre_maceta, nuevo_estado)
+def crear_hardware(config, reloj):
+    if config.simulacion.enabled:
+        from simulacion import SimulatedHardwareManager
+        return SimulatedHardwareManager(config, reloj)
 
-            if macetas_a_regar:
-                ejecutar_riego_secuencial(config, hw, macetas_a_regar)
+    from hardware import HardwareManager
+    return HardwareManager(config)
 
-            guardar_csv(config, estados_ciclo, ahora)
-            subir_thingspeak(config, estados_ciclo)
 
-            time.sleep(config.global_config.intervalo_lectura_seg)
+def crear_muestreador(config, hw, planificador_dht, reloj) -> Optional[MuestreadorContinuo]:
+    # El planificador de tareas usa los buffers del muestreador, sin su hilo
+    if not config.muestreo.enabled and not config.tareas.enabled:
+        return None
+    return MuestreadorContinuo(hw, config, planificador_dht, reloj)
+
+
+def crear_pipeline(
+    config,
+    registro: RegistroTelemetria,
+    cola_subida: Optional[ColaSubida],
+    detener: Optional[threading.Event] = None
+) -> Optional[PipelineSalidas]:
+    if not config.pipeline.enabled:
+        return None
+    return PipelineSalidas(
+        config.pipeline,
+        registro.guardar,
+        lambda estados, ahora: subir_thingspeak(config, estados, cola_subida=cola_subida, ahora=ahora),
+        detener
+    )
+
+
+def persistir_y_subir(
+    config,
+    pipeline: Optional[PipelineSalidas],
+    registro: RegistroTelemetria,
+    estados: Dict[str, MacetaEstado],
+    ahora: datetime,
+    persistir: bool = True,
+    subir: bool = True,
+    timeout_subida_seg: float = 5.0,
+    cola_subida: Optional[ColaSubida] = None
+) -> None:
+    # Con pipeline la E/S queda encolada y el control no la espera
+    if persistir:
+        if pipeline is not None:
+            pipeline.persistir(estados, ahora)
+        else:
+            registro.guardar(estados, ahora)
+
+    if subir:
+        if pipeline is not None:
+            pipeline.subir(estados, ahora)
+        else:
+            subir_thingspeak(config, estados, timeout_subida_seg, cola_subida, ahora)
+
+
+def registrar_y_subir_con_presupuesto(
+    config,
+    pipeline: Optional[PipelineSalidas],
+    registro: RegistroTelemetria,
+    presupuesto: PresupuestoCiclo,
+    diferidos: Deque[Tuple[Dict[str, MacetaEstado], datetime]],
+    estados: Dict[str, MacetaEstado],
+    ahora: datetime,
+    cola_subida: Optional[ColaSubida] = None
+) -> None:
+    # El registro se difiere si no entra en el ciclo: las filas quedan en
+    # diferidos y se escriben todas juntas en el primer ciclo con tiempo
+    if len(diferidos) == diferidos.maxlen:
+        presupuesto.descartar("registro")
+    diferidos.append((estados, ahora))
+
+    bloquearia = pipeline is not None and pipeline.persistencia_llena()
+    if presupuesto.permitir("registro", REGISTRO, bloquearia):
+        with presupuesto.etapa("registro"):
+            while diferidos:
+                estados_diferidos, ahora_diferido = diferidos.popleft()
+                persistir_y_subir(config, pipeline, registro, estados_diferidos, ahora_diferido, subir=False)
+
+    # La subida vieja no vale nada: si no entra se descarta, y nunca espera
+    # a ThingSpeak mas de lo que queda del ciclo
+    timeout_subida_seg = 5.0
+    if config.presupuesto.enabled:
+        timeout_subida_seg = max(0.1, min(timeout_subida_seg, presupuesto.restante()))
+
+    if presupuesto.permitir("subida", SUBIDA):
+        with presupuesto.etapa("subida"):
+            persistir_y_subir(
+                config, pipeline, registro, estados, ahora, persistir=False,
+                timeout_subida_seg=timeout_subida_seg,
+                cola_subida=cola_subida
+            )
+    else:
+        presupuesto.descartar("subida")
+
+
+def crear_planificador_tareas(
+    config,
+    hw: "HardwareManager",
+    reloj,
+    estado_sistema: SystemState,
+    dli_acumulado_macetas: Dict[str, float],
+    muestreador: MuestreadorContinuo,
+    planificador_dht: PlanificadorDHT,
+    maquina_riego: MaquinaRiego,
+    detener: threading.Event,
+    pipeline: Optional[PipelineSalidas],
+    estado_controlador: EstadoControlador,
+    registro: RegistroTelemetria,
+    cola_subida: Optional[ColaSubida]
+) -> PlanificadorTareas:
+    planificador = PlanificadorTareas(
+        reloj, config.global_config.alinear_ciclos, detener, config.global_config.tolerancia_ciclos_seg
+    )
+    tareas = config.tareas.tareas
+    dia_actual = reloj.now().day
+
+    def control_luz(info: InfoCiclo) -> None:
+        # El DLI se integra con la media de lux desde el control anterior
+        nonlocal dia_actual
+        ahora = reloj.now()
+        print(
+            f"\n===== Control {ahora.strftime('%Y-%m-%d %H:%M:%S')} "
+            f"(retraso {info.retraso_seg * 1000:.0f} ms) ====="
+        )
+        if pipeline is not None:
+            print(f"Colas: {pipeline.describir_colas()}")
+
+        if ahora.day != dia_actual:
+            for key in dli_acumulado_macetas:
+                dli_acumulado_macetas[key] = 0.0
+            dia_actual = ahora.day
+
+        lecturas = muestreador.lecturas_macetas(obtener_macetas_activas(config), info.dt_segundos)
+        # El riego lo decide cada control pero lo ejecuta la tarea "riego"
+        controlar_macetas(config, hw, estado_sistema, lecturas, dli_acumulado_macetas, info.dt_segundos, ahora)
+        estado_controlador.guardar(estado_sistema, dli_acumulado_macetas, maquina_riego, dli_hasta=ahora)
+
+    def riego(info: InfoCiclo) -> None:
+        for nombre_maceta, estado in estado_sistema.macetas.items():
+            if estado.riego_pendiente:
+                maquina_riego.solicitar(config.macetas[nombre_maceta])
+
+    planificador.agregar("control_luz", tareas["control_luz"], control_luz)
+    planificador.agregar("lux", tareas["lux"], lambda info: muestreador.muestrear_lux())
+    planificador.agregar("riego", tareas["riego"], riego)
+    planificador.agregar("humedad_suelo", tareas["humedad_suelo"], lambda info: muestreador.muestrear_humedad())
+    if planificador_dht.periodos:
+        planificador.agregar("dht", tareas["dht"], lambda info: planificador_dht.sondear())
+    planificador.agregar(
+        "persistencia",
+        tareas["persistencia"],
+        lambda info: persistir_y_subir(config, pipeline, registro, estado_sistema.macetas, reloj.now(), subir=False)
+    )
+    planificador.agregar(
+        "subida",
+        tareas["subida"],
+        lambda info: persistir_y_subir(
+            config, pipeline, registro, estado_sistema.macetas, reloj.now(), persistir=False,
+            cola_subida=cola_subida
+        )
+    )
+    planificador.agregar_temporizador(maquina_riego.avanzar)
+
+    return planificador
+
+
+def terminar_riego_en_curso(maquina_riego: MaquinaRiego, reloj, detener: threading.Event) -> None:
+    # Una recarga (SIGHUP) no corta el riego en curso: se termina con la
+    # configuracion vieja antes de soltar el hardware. Una senal de salida o
+    # la parada de emergencia cortan la espera.
+    if maquina_riego.activa:
+        print("\nSe termina el riego en curso antes de recargar")
+
+    while not detener.is_set():
+        espera = maquina_riego.avanzar()
+        if espera is None:
+            return
+        reloj.esperar(detener, espera)
+
+
+def ejecutar(
+    config,
+    senales: ControlSenales,
+    dli_acumulado_macetas: Dict[str, float],
+    ciclos: Optional[int] = None
+) -> bool:
+    # Corre hasta una senal, la parada de emergencia o los ciclos pedidos.
+    # Devuelve True si hay que recargar la configuracion (SIGHUP).
+    estado_sistema = crear_estado_inicial(config)
+    for nombre_maceta in estado_sistema.macetas:
+        dli_acumulado_macetas.setdefault(nombre_maceta, 0.0)
+    reloj = crear_reloj(config)
+    # Con fragmentacion este proceso solo maneja la bomba y las valvulas; los
+    # sensores, luces y ventiladores quedan en los procesos de cada fragmento
+    coordinador = None
+    config_hw = config
+    if config.fragmentacion.enabled:
+        coordinador = CoordinadorFragmentos(config, reloj)
+        config_hw = config_coordinador(config)
+    hw = crear_hardware(config_hw, reloj)
+    planificador_dht = PlanificadorDHT(hw, config_hw, reloj)
+    motor = MotorAdquisicion(
+        hw,
+        config.global_config.hilos_adquisicion,
+        config.global_config.modo_lectura_adc,
+        planificador_dht
+    )
+    muestreador = crear_muestreador(config, hw, planificador_dht, reloj)
+    # Las senales y la parada de emergencia despiertan cualquier espera
+    parada = ParadaEmergencia(hw, config.parada_emergencia)
+    parada.al_activar(senales.evento.set)
+    parada.al_activar(senales.evento_salida.set)
+    if coordinador is not None:
+        parada.al_activar(coordinador.parada.set)
+    planificador_ciclos = PlanificadorCiclos(
+        config.global_config.intervalo_lectura_seg,
+        reloj,
+        config.global_config.politica_ciclos,
+        config.global_config.alinear_ciclos,
+        detener=senales.evento,
+        tolerancia_seg=config.global_config.tolerancia_ciclos_seg
+    )
+    maquina_riego = MaquinaRiego(config_hw, hw, reloj)
+    registro = RegistroTelemetria(config)
+    cola_subida = crear_cola_subida(config)
+    pipeline = crear_pipeline(config, registro, cola_subida, senales.evento)
+    presupuesto = PresupuestoCiclo(config.presupuesto, config.global_config.intervalo_lectura_seg)
+    estado_controlador = EstadoControlador(config, reloj)
+    registros_diferidos: Deque[Tuple[Dict[str, MacetaEstado], datetime]] = deque(
+        maxlen=config.presupuesto.max_registros_diferidos + 1
+    )
+    dia_actual = reloj.now().day
+
+    print("Iniciando sistema" + (" (simulado)" if config.simulacion.enabled else ""))
+    hw.inicializar()
+    # La parada se engancha antes de arrancar cualquier salida
+    parada.iniciar()
+    if coordinador is not None:
+        coordinador.iniciar()
+    if pipeline is not None:
+        pipeline.iniciar()
+    if cola_subida is not None:
+        cola_subida.iniciar()
+    # Reinicio en el mismo dia: se retoma el DLI, las salidas y el riego cortado
+    estado_controlador.restaurar(
+        estado_sistema, dli_acumulado_macetas, maquina_riego, hw if coordinador is None else None
+    )
+
+    planificador_tareas = None
+    if config.tareas.enabled:
+        planificador_tareas = crear_planificador_tareas(
+            config, hw, reloj, estado_sistema, dli_acumulado_macetas, muestreador,
+            planificador_dht, maquina_riego, senales.evento, pipeline, estado_controlador, registro,
+            cola_subida
+        )
+        # Una pasada de todos los sensores para que el primer control tenga datos
+        muestreador.muestrear_humedad()
+        muestreador.muestrear_lux()
+        if planificador_dht.periodos:
+            planificador_dht.sondear()
+    elif coordinador is None:
+        planificador_dht.iniciar()
+        if muestreador is not None:
+            muestreador.iniciar()
+
+    try:
+        if planificador_tareas is not None:
+            tarea_control = planificador_tareas.tarea("control_luz")
+            planificador_tareas.ejecutar(
+                lambda: ciclos is None or tarea_control.planificador.ciclos < ciclos
+            )
+        else:
+            while ciclos is None or planificador_ciclos.ciclos < ciclos:
+                # Espera hasta el plazo absoluto del ciclo; dt_segundos es el paso
+                # programado entre ciclos, no lo que tardo el anterior. Durante
+                # la espera el riego en curso sigue avanzando.
+                info_ciclo = planificador_ciclos.esperar(maquina_riego.avanzar)
+                if senales.evento.is_set():
+                    break
+                presupuesto.iniciar_ciclo()
+                ahora = reloj.now()
+                print(
+                    f"\n===== Ciclo {ahora.strftime('%Y-%m-%d %H:%M:%S')} "
+                    f"(retraso {info_ciclo.retraso_seg * 1000:.0f} ms) ====="
+                )
+                if pipeline is not None:
+                    print(f"Colas: {pipeline.describir_colas()}")
+
+                dt_segundos = info_ciclo.dt_segundos
+
+                if ahora.day != dia_actual:
+                    for key in dli_acumulado_macetas:
+                        dli_acumulado_macetas[key] = 0.0
+                    dia_actual = ahora.day
+
+                if coordinador is not None:
+                    # Cada fragmento lee y controla sus macetas en paralelo;
+                    # aca se juntan los estados y se decide el riego
+                    with presupuesto.etapa("sensores"):
+                        estados_ciclo = coordinador.ciclo(dt_segundos, ahora, dli_acumulado_macetas)
+                    estado_sistema.macetas.update(estados_ciclo)
+                    macetas_a_regar = []
+                    for nombre_maceta, estado in estados_ciclo.items():
+                        dli_acumulado_macetas[nombre_maceta] = estado.dli_acumulado
+                        if estado.riego_pendiente:
+                            macetas_a_regar.append(config.macetas[nombre_maceta])
+                else:
+                    # Con muestreo continuo el ciclo no espera a ningun sensor
+                    with presupuesto.etapa("sensores"):
+                        if muestreador is not None:
+                            lecturas_ciclo = muestreador.lecturas_macetas(obtener_macetas_activas(config), dt_segundos)
+                        else:
+                            lecturas_ciclo = motor.leer_macetas(obtener_macetas_activas(config))
+
+                    with presupuesto.etapa("actuacion"):
+                        estados_ciclo, macetas_a_regar = controlar_macetas(
+                            config,
+                            hw,
+                            estado_sistema,
+                            lecturas_ciclo,
+                            dli_acumulado_macetas,
+                            dt_segundos,
+                            ahora
+                        )
+
+                with presupuesto.etapa("riego"):
+                    for maceta in macetas_a_regar:
+                        maquina_riego.solicitar(maceta)
+                    maquina_riego.avanzar()
+
+                # El checkpoint es parte del control: no se recorta
+                with presupuesto.etapa("estado"):
+                    estado_controlador.guardar(
+                        estado_sistema, dli_acumulado_macetas, maquina_riego, dli_hasta=ahora
+                    )
+
+                registrar_y_subir_con_presupuesto(
+                    config, pipeline, registro, presupuesto, registros_diferidos, estados_ciclo, ahora,
+                    cola_subida
+                )
+
+                presupuesto.terminar_ciclo()
+                if config.presupuesto.enabled:
+                    print(presupuesto.describir_ciclo())
+                planificador_ciclos.terminar_ciclo()
 
     except KeyboardInterrupt:
         print("\nSalida por teclado")
 
     finally:
+        if senales.recargar and not senales.salir and not parada.activada:
+            terminar_riego_en_curso(maquina_riego, reloj, senales.evento_salida)
+        if muestreador is not None:
+            muestreador.detener()
+        planificador_dht.detener()
+        motor.cerrar()
+        # Ultimo checkpoint con las salidas apagadas; despues de una parada de
+        # emergencia el riego cortado no se retoma
+        estado_controlador.guardar(
+            estado_sistema,
+            dli_acumulado_macetas,
+            None if parada.activada else maquina_riego,
+            salidas_apagadas=True
+        )
+        maquina_riego.cancelar()
         hw.apagar_todo()
         hw.cleanup()
+        if coordinador is not None:
+            coordinador.detener()
+        # Los registros diferidos no se pierden al apagar
+        while registros_diferidos:
+            persistir_y_subir(config, pipeline, registro, *registros_diferidos.popleft(), subir=False)
+        # Lo encolado se termina de escribir despues de dejar el hardware
+        # seguro, con un tiempo maximo para no pasarse del stop de systemd
+        if pipeline is not None:
+            pipeline.detener()
+        # Lo que no se llego a reenviar queda en el archivo para el proximo arranque
+        if cola_subida is not None:
+            cola_subida.detener(config.cola_subida.timeout_seg)
+        registro.cerrar()
         print("Sistema detenido y GPIO liberados")
+        print(f"Riegos completos: {maquina_riego.riegos}")
+        print(parada.resumen())
+        if planificador_tareas is not None:
+            print(planificador_tareas.resumen())
+        else:
+            print(planificador_ciclos.resumen())
+            if config.presupuesto.enabled:
+                print(presupuesto.resumen())
+        print(estado_controlador.resumen())
+        print(hw.registro_salidas.resumen())
+        if coordinador is not None:
+            print(coordinador.resumen())
+        if pipeline is not None:
+            print(pipeline.resumen())
+        if cola_subida is not None:
+            print(cola_subida.resumen())
+        for linea in registro.resumen():
+            print(linea)
+
+        if config.simulacion.enabled:
+            hw.imprimir_resumen()
+
+    return senales.recargar and not senales.salir and not parada.activada
+
+
+def main(ruta_config: str = "config.toml", simulado: bool = False, ciclos: Optional[int] = None):
+    config = cargar_configuracion(ruta_config)
+    config.simulacion.enabled = config.simulacion.enabled or simulado
+    senales = ControlSenales()
+    senales.instalar()
+    # El DLI del dia se conserva entre recargas
+    dli_acumulado_macetas: Dict[str, float] = {}
+
+    try:
+        while ejecutar(config, senales, dli_acumulado_macetas, ciclos):
+            senales.reiniciar()
+            print("\nSIGHUP: recargando configuracion")
+            try:
+                nueva_config = cargar_configuracion(ruta_config)
+                nueva_config.simulacion.enabled = nueva_config.simulacion.enabled or simulado
+                config = nueva_config
+            except Exception as e:
+                print(f"Configuracion invalida, se sigue con la anterior: {e}")
+    finally:
+        senales.restaurar()
 
 
 if __name__ == "__main__":
-    main()
+    main(simulado="--simulado" in sys.argv)
@@ -0,0 +1,363 @@
+import asyncio
+import sys
+from typing import Dict, Optional, Set
+
+from config_loader import cargar_configuracion
+from estado_persistente import EstadoControlador
+from hardware_async import AsyncHardwareManager
+from main import (
+    controlar_macetas,
+    crear_cola_subida,
+    crear_estado_inicial,
+    crear_hardware,
+    crear_muestreador,
+    crear_pipeline,
+    crear_reloj,
+    obtener_macetas_activas,
+    persistir_y_subir,
+    subir_thingspeak,
+)
+from lectura_adc import lecturas_humedad
+from models import MacetaConfig, MuestreoADC
+from parada_emergencia import ParadaEmergencia
+from planificador_ciclos import PlanificadorCiclos
+from planificador_dht import PlanificadorDHT
+from riego import MaquinaRiego
+from senales import ControlSenales
+from telemetria import RegistroTelemetria
+
+# Maximo que se espera al apagar lo que quedo corriendo en hilos
+TIMEOUT_EN_VUELO_SEG = 10.0
+
+
+async def leer_maceta_async(
+    ahw: AsyncHardwareManager,
+    maceta: MacetaConfig,
+    vectores_adc: Dict[str, asyncio.Task],
+    planificador_dht: Optional[PlanificadorDHT] = None
+) -> Dict[str, Optional[float]]:
+    async def humedad(sensor) -> Optional[MuestreoADC]:
+        if not sensor.enabled:
+            return None
+
+        if sensor.adc in vectores_adc:
+            vector = await vectores_adc[sensor.adc]
+            return None if vector is None else vector[sensor.canal]
+
+        return await ahw.leer_humedad(sensor.adc, sensor.canal)
+
+    async def lux() -> Optional[float]:
+        if not maceta.bh1750.enabled:
+            return None
+        return await ahw.leer_lux(maceta.nombre)
+
+    async def dht():
+        if not maceta.dht.enabled:
+            return None, None, None
+
+        if planificador_dht is not None:
+            return planificador_dht.leer(maceta.nombre)
+
+        temperatura_c, humedad_ambiente_pct = await ahw.leer_dht(maceta.nombre)
+        return temperatura_c, humedad_ambiente_pct, None
+
+    muestreo1, muestreo2, lux_ambiente, (temperatura_c, humedad_ambiente_pct, edad_dht_seg) = await asyncio.gather(
+        humedad(maceta.sensor_humedad_1),
+        humedad(maceta.sensor_humedad_2),
+        lux(),
+        dht()
+    )
+
+    return {
+        **lecturas_humedad(1, muestreo1),
+        **lecturas_humedad(2, muestreo2),
+        "lux": lux_ambiente,
+        "temperatura_c": temperatura_c,
+        "humedad_ambiente_pct": humedad_ambiente_pct,
+        "edad_dht_seg": edad_dht_seg,
+        "disyuntores": ahw.estados_disyuntores(maceta),
+    }
+
+
+async def leer_macetas_async(
+    ahw: AsyncHardwareManager,
+    macetas: Dict[str, MacetaConfig],
+    planificador_dht: Optional[PlanificadorDHT] = None
+) -> Dict[str, Dict[str, Optional[float]]]:
+    vectores_adc = {}
+
+    if ahw.config.global_config.modo_lectura_adc == "rafaga":
+        for maceta in macetas.values():
+            for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+                if sensor.enabled and sensor.adc not in vectores_adc:
+                    vectores_adc[sensor.adc] = asyncio.create_task(
+                        ahw.leer_adc_muestreo(sensor.adc)
+                    )
+
+    nombres = list(macetas)
+    resultados = await asyncio.gather(*(
+        leer_maceta_async(ahw, macetas[nombre_maceta], vectores_adc, planificador_dht)
+        for nombre_maceta in nombres
+    ))
+
+    return dict(zip(nombres, resultados))
+
+
+async def hasta_parada(aw, parada: asyncio.Event, en_vuelo: Optional[Set[asyncio.Future]] = None):
+    # Espera aw pero deja de esperarlo si llega la parada de emergencia. Lo
+    # que corre en un hilo (to_thread) no se corta al cancelarlo: con en_vuelo
+    # se deja terminar y se anota para esperarlo antes de soltar el hardware.
+    tarea = asyncio.ensure_future(aw)
+    espera_parada = asyncio.ensure_future(parada.wait())
+    await asyncio.wait({tarea, espera_parada}, return_when=asyncio.FIRST_COMPLETED)
+    espera_parada.cancel()
+
+    if not tarea.done():
+        if en_vuelo is None:
+            tarea.cancel()
+        else:
+            en_vuelo.add(tarea)
+            tarea.add_done_callback(en_vuelo.discard)
+        return None
+    return tarea.result()
+
+
+def validar_modo_async(config) -> None:
+    # El loop asyncio no tiene planificador de tareas, fragmentos ni
+    # presupuesto de ciclo: mejor fallar que correr sin lo que se configuro
+    no_soportadas = [
+        nombre for nombre, seccion in (
+            ("tareas", config.tareas),
+            ("fragmentacion", config.fragmentacion),
+            ("presupuesto", config.presupuesto),
+        )
+        if seccion.enabled
+    ]
+    if no_soportadas:
+        raise ValueError(
+            f"main_async no soporta [{'], ['.join(no_soportadas)}]: "
+            "deshabilitarlas o usar main.py"
+        )
+
+
+async def terminar_riego_en_curso_async(maquina_riego: MaquinaRiego, reloj, salida: asyncio.Event) -> None:
+    # Igual que main.terminar_riego_en_curso
+    if maquina_riego.activa:
+        print("\nSe termina el riego en curso antes de recargar")
+
+    while not salida.is_set():
+        espera = maquina_riego.avanzar()
+        if espera is None:
+            return
+        await hasta_parada(reloj.dormir_async(espera), salida)
+
+
+async def ejecutar_async(
+    config,
+    senales: ControlSenales,
+    dli_acumulado_macetas: Dict[str, float],
+    ciclos: Optional[int] = None
+) -> bool:
+    # Igual que main.ejecutar: True si hay que recargar la configuracion
+    validar_modo_async(config)
+    estado_sistema = crear_estado_inicial(config)
+    for nombre_maceta in estado_sistema.macetas:
+        dli_acumulado_macetas.setdefault(nombre_maceta, 0.0)
+    reloj = crear_reloj(config)
+    ahw = AsyncHardwareManager(crear_hardware(config, reloj), reloj)
+    planificador_dht = PlanificadorDHT(ahw.hw, config, reloj)
+    muestreador = crear_muestreador(config, ahw.hw, planificador_dht, reloj)
+
+    planificador_ciclos = PlanificadorCiclos(
+        config.global_config.intervalo_lectura_seg,
+        reloj,
+        config.global_config.politica_ciclos,
+        config.global_config.alinear_ciclos,
+        tolerancia_seg=config.global_config.tolerancia_ciclos_seg
+    )
+    dia_actual = reloj.now().day
+    subidas: Set[asyncio.Task] = set()
+    en_vuelo: Set[asyncio.Future] = set()
+    # Misma maquina de riego que main.ejecutar: no duerme, la avanza la
+    # espera entre ciclos, asi se riega en paralelo y con el modelo de caudal
+    maquina_riego = MaquinaRiego(config, ahw.hw, reloj)
+    estado_controlador = EstadoControlador(config, reloj)
+    registro = RegistroTelemetria(config)
+    cola_subida = crear_cola_subida(config)
+    pipeline = crear_pipeline(config, registro, cola_subida, senales.evento)
+
+    # El corte de salidas lo hace el callback del GPIO; aca solo se despierta
+    # el loop, igual que con las senales
+    parada = ParadaEmergencia(ahw.hw, config.parada_emergencia)
+    parada_async = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    parada.al_activar(lambda: loop.call_soon_threadsafe(parada_async.set))
+    senales.al_recibir(lambda: loop.call_soon_threadsafe(parada_async.set))
+    if senales.evento.is_set():
+        parada_async.set()
+    # Solo salida o parada de emergencia: una recarga espera al riego en curso
+    salida_async = asyncio.Event()
+    parada.al_activar(lambda: loop.call_soon_threadsafe(salida_async.set))
+    senales.al_recibir(lambda: senales.salir and loop.call_soon_threadsafe(salida_async.set))
+    if senales.salir:
+        salida_async.set()
+
+    print("Iniciando sistema (asyncio)")
+    await ahw.inicializar()
+    parada.iniciar()
+    if pipeline is not None:
+        pipeline.iniciar()
+    if cola_subida is not None:
+        cola_subida.iniciar()
+    estado_controlador.restaurar(estado_sistema, dli_acumulado_macetas, maquina_riego, ahw.hw)
+    planificador_dht.iniciar()
+    if muestreador is not None:
+        await asyncio.to_thread(muestreador.iniciar)
+
+    try:
+        while ciclos is None or planificador_ciclos.ciclos < ciclos:
+            # Espera hasta el plazo absoluto del ciclo; dt_segundos es el paso
+            # programado entre ciclos, no lo que tardo el anterior. Durante
+            # la espera el riego en curso sigue avanzando.
+            info_ciclo = await hasta_parada(planificador_ciclos.esperar_async(maquina_riego.avanzar), parada_async)
+            if info_ciclo is None:
+                break
+            ahora = reloj.now()
+            print(
+                f"\n===== Ciclo {ahora.strftime('%Y-%m-%d %H:%M:%S')} "
+                f"(retraso {info_ciclo.retraso_seg * 1000:.0f} ms) ====="
+            )
+
+            dt_segundos = info_ciclo.dt_segundos
+
+            if ahora.day != dia_actual:
+                for key in dli_acumulado_macetas:
+                    dli_acumulado_macetas[key] = 0.0
+                dia_actual = ahora.day
+
+            if muestreador is not None:
+                lecturas_ciclo = muestreador.lecturas_macetas(obtener_macetas_activas(config), dt_segundos)
+            else:
+                lecturas_ciclo = await leer_macetas_async(
+                    ahw,
+                    obtener_macetas_activas(config),
+                    planificador_dht
+                )
+
+            estados_ciclo, macetas_a_regar = controlar_macetas(
+                config,
+                ahw,
+                estado_sistema,
+                lecturas_ciclo,
+                dli_acumulado_macetas,
+                dt_segundos,
+                ahora
+            )
+
+            for maceta in macetas_a_regar:
+                maquina_riego.solicitar(maceta)
+            maquina_riego.avanzar()
+
+            await asyncio.to_thread(
+                estado_controlador.guardar, estado_sistema, dli_acumulado_macetas, maquina_riego, dli_hasta=ahora
+            )
+
+            if pipeline is not None:
+                # Con pipeline la E/S la hacen sus hilos; solo se encola
+                await hasta_parada(
+                    asyncio.to_thread(persistir_y_subir, config, pipeline, registro, estados_ciclo, ahora),
+                    parada_async,
+                    en_vuelo
+                )
+            else:
+                # La subida queda corriendo en segundo plano; si la red esta
+                # lenta no demora el riego ni el proximo ciclo
+                subida = asyncio.create_task(
+                    asyncio.to_thread(subir_thingspeak, config, estados_ciclo, 5.0, cola_subida, ahora)
+                )
+                subidas.add(subida)
+                subida.add_done_callback(subidas.discard)
+                await hasta_parada(asyncio.to_thread(registro.guardar, estados_ciclo, ahora), parada_async, en_vuelo)
+            if parada_async.is_set():
+                break
+
+            planificador_ciclos.terminar_ciclo()
+
+        if senales.recargar and not senales.salir and not parada.activada:
+            await terminar_riego_en_curso_async(maquina_riego, reloj, salida_async)
+
+        if subidas:
+            await asyncio.wait(subidas, timeout=config.pipeline.timeout_vaciado_seg)
+
+    except KeyboardInterrupt:
+        print("\nSalida por teclado")
+
+    finally:
+        # Lo que la parada dejo corriendo en hilos termina antes de apagar y
+        # liberar el hardware y de cerrar el registro
+        if en_vuelo:
+            _, pendientes = await asyncio.wait(set(en_vuelo), timeout=TIMEOUT_EN_VUELO_SEG)
+            if pendientes:
+                print(f"\nAtencion: {len(pendientes)} llamadas siguen corriendo al apagar")
+        if muestreador is not None:
+            muestreador.detener()
+        planificador_dht.detener()
+        # Despues de una parada de emergencia el riego cortado no se retoma
+        estado_controlador.guardar(
+            estado_sistema,
+            dli_acumulado_macetas,
+            None if parada.activada else maquina_riego,
+            salidas_apagadas=True
+        )
+        maquina_riego.cancelar()
+        ahw.apagar_todo()
+        ahw.cleanup()
+        if pipeline is not None:
+            pipeline.detener()
+        if cola_subida is not None:
+            cola_subida.detener(config.cola_subida.timeout_seg)
+        registro.cerrar()
+        print("Sistema detenido y GPIO liberados")
+        print(f"Riegos completos: {maquina_riego.riegos}")
+        print(parada.resumen())
+        print(planificador_ciclos.resumen())
+        print(estado_controlador.resumen())
+        if pipeline is not None:
+            print(pipeline.resumen())
+        if cola_subida is not None:
+            print(cola_subida.resumen())
+        for linea in registro.resumen():
+            print(linea)
+        print(ahw.registro_salidas.resumen())
+
+        if config.simulacion.enabled:
+            ahw.hw.imprimir_resumen()
+
+    return senales.recargar and not senales.salir and not parada.activada
+
+
+async def main(ruta_config: str = "config.toml", simulado: bool = False, ciclos: Optional[int] = None):
+    config = cargar_configuracion(ruta_config)
+    config.simulacion.enabled = config.simulacion.enabled or simulado
+    loop = asyncio.get_running_loop()
+    senales = ControlSenales()
+    senales.instalar_async(loop)
+    dli_acumulado_macetas: Dict[str, float] = {}
+
+    try:
+        while await ejecutar_async(config, senales, dli_acumulado_macetas, ciclos):
+            senales.reiniciar()
+            print("\nSIGHUP: recargando configuracion")
+            try:
+                nueva_config = cargar_configuracion(ruta_config)
+                nueva_config.simulacion.enabled = nueva_config.simulacion.enabled or simulado
+                validar_modo_async(nueva_config)
+                config = nueva_config
+            except Exception as e:
+                print(f"Configuracion invalida, se sigue con la anterior: {e}")
+    finally:
+        senales.restaurar(loop)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(simulado="--simulado" in sys.argv))
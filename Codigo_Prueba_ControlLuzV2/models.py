@@ -10,6 +10,17 @@ class GlobalConfig:
     discrepancia_humedad_pct: float
     delay_post_bomba_seg: float
     archivo_csv: str
+    hilos_adquisicion: int = 4
+    modo_lectura_adc: str = "canal"
+    periodo_dht_seg: float = 2.0
+    max_edad_dht_seg: float = 60.0
+    muestras_min_adc: int = 3
+    muestras_max_adc: int = 10
+    varianza_max_adc: float = 2.0
+    agregacion_adc: str = "mediana"
+    politica_ciclos: str = "saltar"
+    alinear_ciclos: bool = True
+    tolerancia_ciclos_seg: float = 1.0
 
 
 @dataclass
@@ -17,6 +28,8 @@ class BombaConfig:
     gpio: int
     activa_bajo: bool
     enabled: bool
+    caudal_lpm: float = 0.0             # 0: sin modelo de caudal, se riega de a una maceta
+    max_valvulas_abiertas: int = 4
 
 
 @dataclass
@@ -102,6 +115,127 @@ class MacetaConfig:
     factor_luminaria: float
     factor_luminaria_ambiente: float 
     # ----------------------------
+    caudal_valvula_lpm: float = 0.0     # caudal de la valvula con la bomba sola para ella
+
+
+@dataclass
+class SimulacionConfig:
+    enabled: bool = False
+    semilla: int = 1
+    archivo_csv: str = "registro_simulado.csv"
+    archivo_estado: str = "estado_simulado.json"
+    archivo_sqlite: str = "telemetria_simulada.db"
+    archivo_binario: str = "telemetria_simulada.bin"
+    parada_emergencia_seg: float = 0.0      # > 0: simula el pulsador a ese tiempo
+    # Por metodo del HardwareManager (leer_lux, leer_dht, ...)
+    latencia_seg: Dict[str, float] = field(default_factory=dict)
+    jitter_seg: Dict[str, float] = field(default_factory=dict)
+    tasa_fallo: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class MuestreoConfig:
+    enabled: bool = False
+    periodo_humedad_seg: float = 60.0
+    periodo_lux_seg: float = 10.0
+    capacidad_buffer: int = 720
+    # Muestras mas viejas son de un sensor caido y no se usan
+    max_edad_humedad_seg: float = 1800.0
+    max_edad_lux_seg: float = 120.0
+
+
+@dataclass
+class DisyuntorConfig:
+    fallos_para_abrir: int = 3
+    espera_inicial_seg: float = 30.0
+    espera_max_seg: float = 3600.0
+
+
+@dataclass
+class ParadaEmergenciaConfig:
+    enabled: bool = False
+    gpio: int = 21
+    activa_bajo: bool = True    # pulsador a GND con pull-up interno
+    rebote_ms: int = 200
+
+
+@dataclass
+class PipelineConfig:
+    enabled: bool = False
+    capacidad_persistencia: int = 100
+    capacidad_subida: int = 5
+    timeout_vaciado_seg: float = 10.0   # maximo para vaciar las colas al apagar
+    timeout_bloqueo_seg: float = 5.0    # maximo que espera el control con la persistencia llena
+
+
+@dataclass
+class RegistroCSVConfig:
+    enabled: bool = False
+    filas_buffer: int = 50          # se baja al archivo al juntar estas filas
+    vaciado_seg: float = 60.0       # o al pasar este tiempo desde el ultimo vaciado
+    fsync_seg: float = 300.0        # cada cuanto se fuerza la escritura en la SD
+    rotacion_diaria: bool = False
+
+
+@dataclass
+class SQLiteConfig:
+    enabled: bool = False
+    archivo: str = "telemetria.db"
+    resumenes: bool = True      # minuto/hora/dia y totales diarios al escribir
+
+
+@dataclass
+class RegistroBinarioConfig:
+    enabled: bool = False
+    archivo: str = "telemetria.bin"
+
+
+@dataclass
+class ColaSubidaConfig:
+    enabled: bool = False
+    archivo: str = "cola_subida.jsonl"
+    max_entradas: int = 10000
+    espaciado_seg: float = 15.0     # limite de ThingSpeak entre actualizaciones
+    espera_max_seg: float = 600.0
+    timeout_seg: float = 5.0
+    compactar_bytes: int = 65536
+
+
+@dataclass
+class EstadoPersistenteConfig:
+    enabled: bool = False
+    archivo: str = "estado_controlador.json"
+
+
+@dataclass
+class PresupuestoConfig:
+    enabled: bool = False
+    ciclo_seg: float = 0.0              # 0 = todo el intervalo de lectura
+    margen: float = 1.5                 # factor sobre el tiempo estimado de cada etapa
+    max_registros_diferidos: int = 10
+
+
+@dataclass
+class FragmentacionConfig:
+    enabled: bool = False
+    procesos: int = 0       # 0 = un proceso por nucleo
+    timeout_seg: float = 30.0   # espera maxima de la respuesta de cada fragmento
+    timeout_parada_seg: float = 5.0     # para apagar sus salidas antes de matarlo
+    espera_reinicio_seg: float = 30.0   # reinicio de un fragmento caido, con backoff
+    espera_reinicio_max_seg: float = 600.0
+
+
+@dataclass
+class TareaConfig:
+    periodo_seg: float
+    prioridad: int          # 0 es la mas urgente
+    enabled: bool = True
+
+
+@dataclass
+class TareasConfig:
+    enabled: bool = False
+    tareas: Dict[str, TareaConfig] = field(default_factory=dict)
 
 
 @dataclass
@@ -112,6 +246,19 @@ class SystemConfig:
     i2c: I2CConfig
     adcs: Dict[str, ADCConfig]
     macetas: Dict[str, MacetaConfig]
+    simulacion: SimulacionConfig = field(default_factory=SimulacionConfig)
+    muestreo: MuestreoConfig = field(default_factory=MuestreoConfig)
+    disyuntores: DisyuntorConfig = field(default_factory=DisyuntorConfig)
+    tareas: TareasConfig = field(default_factory=TareasConfig)
+    parada_emergencia: ParadaEmergenciaConfig = field(default_factory=ParadaEmergenciaConfig)
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    fragmentacion: FragmentacionConfig = field(default_factory=FragmentacionConfig)
+    presupuesto: PresupuestoConfig = field(default_factory=PresupuestoConfig)
+    estado_persistente: EstadoPersistenteConfig = field(default_factory=EstadoPersistenteConfig)
+    registro_csv: RegistroCSVConfig = field(default_factory=RegistroCSVConfig)
+    sqlite: SQLiteConfig = field(default_factory=SQLiteConfig)
+    registro_binario: RegistroBinarioConfig = field(default_factory=RegistroBinarioConfig)
+    cola_subida: ColaSubidaConfig = field(default_factory=ColaSubidaConfig)
 
 
 @dataclass
@@ -122,6 +269,10 @@ class MacetaEstado:
     humedad_suelo_promedio_pct: Optional[float] = None
     humedad_suelo_raw_1: Optional[int] = None
     humedad_suelo_raw_2: Optional[int] = None
+    muestras_humedad_1: Optional[int] = None
+    muestras_humedad_2: Optional[int] = None
+    varianza_humedad_1: Optional[float] = None
+    varianza_humedad_2: Optional[float] = None
     lux: Optional[float] = None          
     temperatura_c: Optional[float] = None
     humedad_ambiente_pct: Optional[float] = None
@@ -131,6 +282,47 @@ class MacetaEstado:
     alertas: List[str] = field(default_factory=list)
 
 
+@dataclass
+class LecturaDHT:
+    temperatura_c: Optional[float] = None
+    humedad_ambiente_pct: Optional[float] = None
+    timestamp: Optional[float] = None   # time.monotonic() de la ultima lectura valida
+    fallos_consecutivos: int = 0
+
+
 @dataclass
 class SystemState:
     macetas: Dict[str, MacetaEstado] = field(default_factory=dict)
+
+
+@dataclass
+class MuestreoADC:
+    raw: int            # valor agregado en cuentas de 8 bits
+    muestras: int
+    varianza: float     # varianza de las muestras en cuentas^2
+
+
+@dataclass
+class ResumenSensor:
+    ultimo: float
+    media: float
+    minimo: float
+    maximo: float
+    cantidad: int       # muestras dentro de la ventana
+    edad_seg: float     # antiguedad de la ultima muestra
+
+
+@dataclass
+class EstadoDisyuntor:
+    dispositivo: str
+    estado: str
+    fallos_consecutivos: int
+    segundos_para_reintento: Optional[float]
+
+
+@dataclass
+class InfoCiclo:
+    numero: int
+    programado: float       # plazo en el reloj monotonico
+    retraso_seg: float      # cuanto despues del plazo arranco (jitter)
+    dt_segundos: float      # tiempo programado desde el ciclo anterior
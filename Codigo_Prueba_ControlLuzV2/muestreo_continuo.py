@@ -0,0 +1,242 @@
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from lectura_adc import lecturas_humedad
+from models import MacetaConfig, MuestreoADC, ResumenSensor, SystemConfig
+from planificador_dht import PlanificadorDHT
+from reloj import RelojSistema
+
+
+class BufferCircular:
+    # Capacidad fija sobre array('d'): no crece ni crea objetos por muestra
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self.tiempos = array("d", [0.0]) * capacidad
+        self.valores = array("d", [0.0]) * capacidad
+        self.cantidad = 0
+        self.siguiente = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, tiempo: float, valor: float) -> None:
+        with self._lock:
+            self.tiempos[self.siguiente] = tiempo
+            self.valores[self.siguiente] = valor
+            self.siguiente = (self.siguiente + 1) % self.capacidad
+            self.cantidad = min(self.cantidad + 1, self.capacidad)
+
+    def ultimo(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            if self.cantidad == 0:
+                return None
+            indice = (self.siguiente - 1) % self.capacidad
+            return self.tiempos[indice], self.valores[indice]
+
+    def desde(self, tiempo_minimo: float) -> List[float]:
+        # Valores con timestamp >= tiempo_minimo, del mas viejo al mas nuevo
+        with self._lock:
+            valores = []
+            for i in range(self.cantidad):
+                indice = (self.siguiente - self.cantidad + i) % self.capacidad
+                if self.tiempos[indice] >= tiempo_minimo:
+                    valores.append(self.valores[indice])
+            return valores
+
+
+class MuestreadorContinuo:
+    # Lee humedad de suelo y lux en un hilo aparte, cada fuente a su propio
+    # periodo, y guarda las muestras en buffers circulares. El ciclo de control
+    # solo toma un resumen de lo que ya esta en memoria.
+    def __init__(
+        self,
+        hw,
+        config: SystemConfig,
+        planificador_dht: Optional[PlanificadorDHT] = None,
+        reloj=None
+    ):
+        self.hw = hw
+        self.config = config
+        self.planificador_dht = planificador_dht
+        self.reloj = reloj or RelojSistema()
+        self.buffers: Dict[Tuple[str, str], BufferCircular] = {}
+        self.ultimo_muestreo: Dict[Tuple[str, str], MuestreoADC] = {}
+        # fuente -> (periodo, proxima lectura); una fuente es un ADC completo en
+        # modo rafaga, un sensor de humedad en modo canal o un BH1750
+        self.fuentes: Dict[Tuple[Any, ...], List[float]] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+        muestreo = config.muestreo
+        rafaga = config.global_config.modo_lectura_adc == "rafaga"
+
+        for nombre_maceta, maceta in config.macetas.items():
+            if not maceta.enabled:
+                continue
+
+            for numero, sensor in ((1, maceta.sensor_humedad_1), (2, maceta.sensor_humedad_2)):
+                if not sensor.enabled:
+                    continue
+
+                self.buffers[(nombre_maceta, f"humedad_{numero}")] = BufferCircular(muestreo.capacidad_buffer)
+                fuente = ("adc", sensor.adc) if rafaga else ("humedad", nombre_maceta, numero)
+                self.fuentes[fuente] = [muestreo.periodo_humedad_seg, 0.0]
+
+            if maceta.bh1750.enabled:
+                self.buffers[(nombre_maceta, "lux")] = BufferCircular(muestreo.capacidad_buffer)
+                self.fuentes[("lux", nombre_maceta)] = [muestreo.periodo_lux_seg, 0.0]
+
+    def iniciar(self) -> None:
+        if not self.fuentes or self._hilo is not None:
+            return
+
+        # Una pasada sincronica para que el primer ciclo ya tenga datos
+        self.sondear()
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="muestreo_continuo", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def sondear(self) -> float:
+        # Lee las fuentes que ya tocan y devuelve cuanto falta para la proxima
+        for fuente, programacion in self.fuentes.items():
+            periodo, proxima = programacion
+            if self.reloj.monotonic() < proxima:
+                continue
+
+            self._leer_fuente(fuente)
+            programacion[1] = self.reloj.monotonic() + periodo
+
+        proxima = min(programacion[1] for programacion in self.fuentes.values())
+        return max(0.0, proxima - self.reloj.monotonic())
+
+    def muestrear_lux(self) -> None:
+        # Para el planificador de tareas: lee ya todas las fuentes de ese tipo
+        self._muestrear(("lux",))
+
+    def muestrear_humedad(self) -> None:
+        self._muestrear(("adc", "humedad"))
+
+    def _muestrear(self, tipos: Tuple[str, ...]) -> None:
+        for fuente in self.fuentes:
+            if fuente[0] in tipos:
+                self._leer_fuente(fuente)
+
+    def _leer_fuente(self, fuente: Tuple[Any, ...]) -> None:
+        tipo = fuente[0]
+
+        if tipo == "lux":
+            lux = self.hw.leer_lux(fuente[1])
+            if lux is not None:
+                self.buffers[(fuente[1], "lux")].agregar(self.reloj.monotonic(), lux)
+            return
+
+        if tipo == "humedad":
+            nombre_maceta, numero = fuente[1], fuente[2]
+            maceta = self.config.macetas[nombre_maceta]
+            sensor = maceta.sensor_humedad_1 if numero == 1 else maceta.sensor_humedad_2
+            self._guardar_humedad(nombre_maceta, numero, self.hw.leer_humedad(sensor.adc, sensor.canal))
+            return
+
+        # Rafaga: un solo barrido alimenta todos los sensores conectados a ese ADC
+        vector = self.hw.leer_adc_muestreo(fuente[1])
+        if vector is None:
+            return
+
+        for nombre_maceta, maceta in self.config.macetas.items():
+            for numero, sensor in ((1, maceta.sensor_humedad_1), (2, maceta.sensor_humedad_2)):
+                if (nombre_maceta, f"humedad_{numero}") in self.buffers and sensor.adc == fuente[1]:
+                    self._guardar_humedad(nombre_maceta, numero, vector[sensor.canal])
+
+    def _guardar_humedad(self, nombre_maceta: str, numero: int, muestreo: Optional[MuestreoADC]) -> None:
+        if muestreo is None:
+            return
+
+        clave = (nombre_maceta, f"humedad_{numero}")
+        self.buffers[clave].agregar(self.reloj.monotonic(), muestreo.raw)
+        with self._lock:
+            self.ultimo_muestreo[clave] = muestreo
+
+    def max_edad_seg(self, magnitud: str) -> float:
+        if magnitud == "lux":
+            return self.config.muestreo.max_edad_lux_seg
+        return self.config.muestreo.max_edad_humedad_seg
+
+    def _vigente(self, clave: Tuple[str, str]) -> bool:
+        # Un sensor caido deja de tener muestras: pasada la edad maxima su
+        # ultimo valor ya no se usa (el control ve None y da la alerta)
+        buffer = self.buffers.get(clave)
+        ultimo = None if buffer is None else buffer.ultimo()
+        return ultimo is not None and self.reloj.monotonic() - ultimo[0] <= self.max_edad_seg(clave[1])
+
+    def resumen(self, nombre_maceta: str, magnitud: str, ventana_seg: float) -> Optional[ResumenSensor]:
+        # Ultimo valor y media/min/max de las muestras de los ultimos ventana_seg;
+        # None si no hay muestras en la ventana o la ultima es demasiado vieja
+        buffer = self.buffers.get((nombre_maceta, magnitud))
+        if buffer is None or not self._vigente((nombre_maceta, magnitud)):
+            return None
+
+        ultimo = buffer.ultimo()
+        ahora = self.reloj.monotonic()
+        valores = buffer.desde(ahora - ventana_seg)
+        if not valores:
+            return None
+
+        return ResumenSensor(
+            ultimo=ultimo[1],
+            media=sum(valores) / len(valores),
+            minimo=min(valores),
+            maximo=max(valores),
+            cantidad=len(valores),
+            edad_seg=ahora - ultimo[0]
+        )
+
+    def lecturas_maceta(
+        self,
+        nombre_maceta: str,
+        maceta: MacetaConfig,
+        ventana_seg: float
+    ) -> Dict[str, Optional[float]]:
+        claves = [(nombre_maceta, f"humedad_{numero}") for numero in (1, 2)]
+        with self._lock:
+            muestreos = [self.ultimo_muestreo.get(clave) if self._vigente(clave) else None for clave in claves]
+
+        # Para el DLI se usa la media de lux de todo el intervalo, no una sola
+        # muestra. En el primer ciclo (ventana 0) vale cualquier muestra vigente.
+        lux = self.resumen(nombre_maceta, "lux", ventana_seg or self.max_edad_seg("lux"))
+
+        temperatura_c, humedad_ambiente_pct, edad_dht_seg = None, None, None
+        if maceta.dht.enabled and self.planificador_dht is not None:
+            temperatura_c, humedad_ambiente_pct, edad_dht_seg = self.planificador_dht.leer(nombre_maceta)
+
+        return {
+            **lecturas_humedad(1, muestreos[0]),
+            **lecturas_humedad(2, muestreos[1]),
+            "lux": None if lux is None else lux.media,
+            "temperatura_c": temperatura_c,
+            "humedad_ambiente_pct": humedad_ambiente_pct,
+            "edad_dht_seg": edad_dht_seg,
+            "disyuntores": self.hw.estados_disyuntores(maceta),
+        }
+
+    def lecturas_macetas(
+        self,
+        macetas: Dict[str, MacetaConfig],
+        ventana_seg: float
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            nombre_maceta: self.lecturas_maceta(nombre_maceta, maceta, ventana_seg)
+            for nombre_maceta, maceta in macetas.items()
+        }
+
+    def _ejecutar(self) -> None:
+        with self.reloj.participar():
+            while not self._detener.is_set():
+                espera = self.sondear()
+                self.reloj.esperar(self._detener, espera)
@@ -0,0 +1,57 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from models import ParadaEmergenciaConfig
+
+# Tiempo maximo aceptable entre el flanco y las salidas cortadas
+LATENCIA_MAX_MS = 100.0
+
+
+class ParadaEmergencia:
+    # Entrada de parada por flanco. El callback corre en el hilo de eventos del
+    # GPIO: corta las salidas ahi mismo (sin esperar al ciclo) y levanta el
+    # evento que despierta las esperas de los planificadores.
+    def __init__(self, hw, config: ParadaEmergenciaConfig):
+        self.hw = hw
+        self.config = config
+        self.evento = threading.Event()
+        self.latencia_ms: Optional[float] = None
+        self.avisos: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def activada(self) -> bool:
+        return self.evento.is_set()
+
+    def iniciar(self) -> None:
+        if self.config.enabled:
+            self.hw.configurar_parada_emergencia(self._flanco)
+
+    def al_activar(self, aviso: Callable[[], None]) -> None:
+        # aviso corre en el hilo del GPIO despues de cortar las salidas
+        self.avisos.append(aviso)
+
+    def _flanco(self, instante: float) -> None:
+        # instante: time.perf_counter() del flanco
+        with self._lock:
+            if self.evento.is_set():
+                return
+
+            try:
+                self.hw.parada_emergencia()
+            finally:
+                self.latencia_ms = (time.perf_counter() - instante) * 1000
+                self.evento.set()
+
+        for aviso in self.avisos:
+            aviso()
+
+        print(f"\nPARADA DE EMERGENCIA: salidas cortadas en {self.latencia_ms:.1f} ms")
+        if self.latencia_ms > LATENCIA_MAX_MS:
+            print(f"Atencion: la parada supero los {LATENCIA_MAX_MS:.0f} ms")
+
+    def resumen(self) -> str:
+        if self.latencia_ms is None:
+            return "Parada de emergencia: no activada"
+        return f"Parada de emergencia: salidas cortadas en {self.latencia_ms:.1f} ms desde el flanco"
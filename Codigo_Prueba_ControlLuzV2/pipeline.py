@@ -0,0 +1,211 @@
+import copy
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+from models import MacetaEstado, PipelineConfig
+
+BLOQUEAR = "bloquear"
+DESCARTAR_VIEJO = "descartar_viejo"
+
+# Cada cuanto mira el evento de detener un productor bloqueado
+ESPERA_DETENER_SEG = 0.1
+
+
+class ColaAcotada:
+    # Cola de capacidad fija entre etapas. Si esta llena:
+    #   "bloquear":        el productor espera (no se pierde ningun registro)
+    #                      hasta timeout_seg o hasta que se levante detener;
+    #                      despues se tira el mas viejo igual que en la otra
+    #   "descartar_viejo": se tira el elemento mas viejo (solo importa el ultimo)
+    def __init__(
+        self,
+        capacidad: int,
+        politica: str,
+        timeout_seg: Optional[float] = None,
+        detener: Optional[threading.Event] = None
+    ):
+        self.capacidad = capacidad
+        self.politica = politica
+        self.timeout_seg = timeout_seg
+        self.detener = detener
+        self.elementos: Deque[Any] = deque()
+        self.profundidad_max = 0
+        self.descartados = 0
+        self.bloqueos = 0
+        self.cerrada = False
+        self._condicion = threading.Condition()
+
+    def poner(self, elemento: Any) -> None:
+        with self._condicion:
+            if len(self.elementos) >= self.capacidad:
+                if self.politica == BLOQUEAR:
+                    self.bloqueos += 1
+                    self._esperar_lugar()
+
+                if len(self.elementos) >= self.capacidad:
+                    self.elementos.popleft()
+                    self.descartados += 1
+
+            self.elementos.append(elemento)
+            self.profundidad_max = max(self.profundidad_max, len(self.elementos))
+            self._condicion.notify_all()
+
+    def _esperar_lugar(self) -> None:
+        # Se llama con la condicion tomada. La espera es por tramos para ver
+        # el evento de detener, que no avisa a la condicion.
+        limite = None if self.timeout_seg is None else time.monotonic() + self.timeout_seg
+        while len(self.elementos) >= self.capacidad and not self.cerrada:
+            if self.detener is not None and self.detener.is_set():
+                return
+
+            espera = ESPERA_DETENER_SEG if self.detener is not None else None
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return
+                espera = restante if espera is None else min(espera, restante)
+
+            self._condicion.wait(espera)
+
+    def sacar(self) -> Optional[Any]:
+        # Espera un elemento; None si la cola se cerro y ya esta vacia
+        with self._condicion:
+            while not self.elementos and not self.cerrada:
+                self._condicion.wait()
+
+            if not self.elementos:
+                return None
+
+            elemento = self.elementos.popleft()
+            self._condicion.notify_all()
+            return elemento
+
+    def cerrar(self) -> None:
+        with self._condicion:
+            self.cerrada = True
+            self._condicion.notify_all()
+
+    @property
+    def profundidad(self) -> int:
+        with self._condicion:
+            return len(self.elementos)
+
+
+class Etapa:
+    # Un hilo que consume una cola y procesa cada elemento; los errores se
+    # cuentan y no frenan la etapa
+    def __init__(self, nombre: str, cola: ColaAcotada, procesar: Callable[[Any], None]):
+        self.nombre = nombre
+        self.cola = cola
+        self.procesar = procesar
+        self.procesados = 0
+        self.errores = 0
+        self.tiempo_total_seg = 0.0
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"etapa_{nombre}", daemon=True)
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    def detener(self, timeout_seg: Optional[float] = None) -> bool:
+        # Procesa lo que quedo en la cola y termina; False si no llego a tiempo
+        self.cola.cerrar()
+        self._hilo.join(timeout_seg)
+
+        if self._hilo.is_alive():
+            print(f"\nEtapa {self.nombre}: quedaron {self.cola.profundidad} elementos sin procesar")
+            return False
+        return True
+
+    def _ejecutar(self) -> None:
+        while True:
+            elemento = self.cola.sacar()
+            if elemento is None:
+                return
+
+            inicio = time.perf_counter()
+            try:
+                self.procesar(elemento)
+            except Exception as e:
+                self.errores += 1
+                print(f"\nEtapa {self.nombre} fallo: {e}")
+
+            self.procesados += 1
+            self.tiempo_total_seg += time.perf_counter() - inicio
+
+    def describir(self) -> str:
+        cola = self.cola
+        medio = self.tiempo_total_seg / self.procesados if self.procesados else 0.0
+        return (
+            f" - {self.nombre:<13} cola {cola.profundidad}/{cola.capacidad} "
+            f"(max {cola.profundidad_max}, {cola.politica}) | procesados: {self.procesados} | "
+            f"descartados: {cola.descartados} | bloqueos: {cola.bloqueos} | "
+            f"errores: {self.errores} | {medio * 1000:.1f} ms/elemento"
+        )
+
+
+class PipelineSalidas:
+    # Etapas de E/S detras del control: el ciclo deja una copia de los estados
+    # y sigue; la escritura en la SD y la subida a ThingSpeak corren en sus
+    # propios hilos. La persistencia bloquea si se llena (no se pierden filas)
+    # pero no mas de timeout_bloqueo_seg ni despues de pedir detener: el
+    # control no puede quedar trabado por la SD. La subida descarta lo mas
+    # viejo (solo vale el dato mas nuevo).
+    def __init__(
+        self,
+        config: PipelineConfig,
+        persistir: Callable[[Dict[str, MacetaEstado], datetime], None],
+        subir: Callable[[Dict[str, MacetaEstado], datetime], None],
+        detener: Optional[threading.Event] = None
+    ):
+        self.timeout_vaciado_seg = config.timeout_vaciado_seg
+        self.persistencia = Etapa(
+            "persistencia",
+            ColaAcotada(config.capacidad_persistencia, BLOQUEAR, config.timeout_bloqueo_seg, detener),
+            lambda elemento: persistir(*elemento)
+        )
+        self.subida = Etapa(
+            "subida",
+            ColaAcotada(config.capacidad_subida, DESCARTAR_VIEJO),
+            lambda elemento: subir(*elemento)
+        )
+
+    def iniciar(self) -> None:
+        self.persistencia.iniciar()
+        self.subida.iniciar()
+
+    def persistir(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        self.persistencia.cola.poner((copy.deepcopy(estados), ahora))
+
+    def subir(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        self.subida.cola.poner((copy.deepcopy(estados), ahora))
+
+    def persistencia_llena(self) -> bool:
+        # Un registro mas haria esperar al control
+        cola = self.persistencia.cola
+        return cola.profundidad >= cola.capacidad
+
+    def profundidades(self) -> Dict[str, int]:
+        return {
+            "persistencia": self.persistencia.cola.profundidad,
+            "subida": self.subida.cola.profundidad,
+        }
+
+    def describir_colas(self) -> str:
+        return ", ".join(
+            f"{etapa.nombre} {etapa.cola.profundidad}/{etapa.cola.capacidad}"
+            for etapa in (self.persistencia, self.subida)
+        )
+
+    def detener(self) -> None:
+        # Las dos colas se vacian a la vez, con un tiempo maximo entre ambas
+        limite = time.monotonic() + self.timeout_vaciado_seg
+        self.persistencia.cola.cerrar()
+        self.subida.cola.cerrar()
+        for etapa in (self.persistencia, self.subida):
+            etapa.detener(max(0.0, limite - time.monotonic()))
+
+    def resumen(self) -> str:
+        return "\n".join(["Pipeline:", self.persistencia.describir(), self.subida.describir()])
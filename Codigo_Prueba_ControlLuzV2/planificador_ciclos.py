@@ -0,0 +1,164 @@
+import threading
+from typing import Callable, Optional
+
+from models import InfoCiclo
+from reloj import RelojSistema
+
+POLITICAS_CICLOS = ("saltar", "recuperar")
+
+
+class PlanificadorCiclos:
+    # Los ciclos arrancan en plazos absolutos (inicio + n * intervalo sobre el
+    # reloj monotonico), asi el tiempo de lectura, riego y subida no se acumula.
+    # Si un ciclo se pasa del plazo siguiente:
+    #   "saltar":    se pierde ese plazo y se sigue en el proximo de la grilla
+    #   "recuperar": los ciclos atrasados se corren seguidos hasta alcanzar la grilla
+    # Un atraso de hasta tolerancia_seg no pierde el plazo: el ciclo corre tarde.
+    def __init__(
+        self,
+        intervalo_seg: float,
+        reloj=None,
+        politica: str = "saltar",
+        alinear: bool = True,
+        nombre: str = "Ciclo",
+        detener: Optional[threading.Event] = None,
+        tolerancia_seg: float = 1.0
+    ):
+        self.intervalo_seg = intervalo_seg
+        self.tolerancia_seg = tolerancia_seg
+        self.nombre = nombre
+        # Si se levanta (parada de emergencia) la espera termina enseguida
+        self.detener = detener
+        self.reloj = reloj or RelojSistema()
+        self.politica = politica
+        self.alinear = alinear
+        self.proximo: Optional[float] = None
+        self._base = 0.0
+        self.anterior: Optional[float] = None
+        self.inicio_ciclo: Optional[float] = None
+        self.ciclos = 0
+        self.sobrepasados = 0
+        self.saltados = 0
+        self.retraso_max_seg = 0.0
+        self.retraso_total_seg = 0.0
+
+    def iniciar(self) -> None:
+        # El primer ciclo corre enseguida; el segundo cae en un multiplo del
+        # intervalo desde la medianoche (con 3600 s, en punto)
+        ahora = self.reloj.monotonic()
+        self.proximo = ahora
+        self._base = ahora + self._fase() if self.alinear else ahora + self.intervalo_seg
+
+    def _fase(self) -> float:
+        hora = self.reloj.now()
+        segundos_dia = hora.hour * 3600 + hora.minute * 60 + hora.second + hora.microsecond / 1e6
+        return self.intervalo_seg - segundos_dia % self.intervalo_seg
+
+    def segundos_para_plazo(self) -> float:
+        if self.proximo is None:
+            self.iniciar()
+
+        ahora = self.reloj.monotonic()
+
+        # El ciclo anterior se paso del plazo (mas que la tolerancia): con
+        # "saltar" se descartan los plazos vencidos y se espera el proximo
+        if self.politica == "saltar" and self.ciclos > 0 and self.proximo < ahora - self.tolerancia_seg:
+            saltados = int((ahora - self.proximo) // self.intervalo_seg) + 1
+            self.proximo += saltados * self.intervalo_seg
+            self.saltados += saltados
+            print(f"\n{self.nombre}: se saltean {saltados} plazo(s) vencido(s)")
+
+        return self.proximo - ahora
+
+    def vencido(self) -> bool:
+        # Version sin espera, para el planificador de tareas: el plazo se
+        # atiende cuando ya paso. Con "saltar", si vencieron varios plazos
+        # se corre solo el ultimo.
+        if self.proximo is None:
+            self.iniciar()
+
+        ahora = self.reloj.monotonic()
+        if ahora < self.proximo:
+            return False
+
+        if self.politica == "saltar" and self.ciclos > 0:
+            saltados = int(max(0.0, ahora - self.proximo - self.tolerancia_seg) // self.intervalo_seg)
+            if saltados:
+                self.proximo += saltados * self.intervalo_seg
+                self.saltados += saltados
+                print(f"\n{self.nombre}: se saltean {saltados} plazo(s) vencido(s)")
+
+        return True
+
+    def esperar(self, avanzar: Optional[Callable[[], Optional[float]]] = None) -> Optional[InfoCiclo]:
+        # avanzar: temporizador que sigue corriendo durante la espera (riego);
+        # devuelve cuanto falta para su proximo evento o None si no tiene nada.
+        # Devuelve None si se detuvo: ese ciclo no corre ni se cuenta.
+        espera = self.segundos_para_plazo()
+        while espera > 0 and not self.detenido:
+            evento = avanzar() if avanzar is not None else None
+            self.dormir(espera if evento is None else min(espera, evento))
+            espera = self.proximo - self.reloj.monotonic()
+        if self.detenido:
+            return None
+        return self.arrancar_ciclo()
+
+    @property
+    def detenido(self) -> bool:
+        return self.detener is not None and self.detener.is_set()
+
+    def dormir(self, segundos: float) -> None:
+        self.reloj.esperar(self.detener, segundos)
+
+    async def esperar_async(self, avanzar: Optional[Callable[[], Optional[float]]] = None) -> InfoCiclo:
+        espera = self.segundos_para_plazo()
+        while espera > 0:
+            evento = avanzar() if avanzar is not None else None
+            await self.reloj.dormir_async(espera if evento is None else min(espera, evento))
+            espera = self.proximo - self.reloj.monotonic()
+        return self.arrancar_ciclo()
+
+    def arrancar_ciclo(self) -> InfoCiclo:
+        ahora = self.reloj.monotonic()
+        programado = self.proximo
+        retraso = max(0.0, ahora - programado)
+
+        self.ciclos += 1
+        self.retraso_max_seg = max(self.retraso_max_seg, retraso)
+        self.retraso_total_seg += retraso
+        self.inicio_ciclo = ahora
+
+        dt_segundos = 0.0 if self.anterior is None else programado - self.anterior
+        self.anterior = programado
+
+        # Proximo plazo de la grilla
+        self.proximo = self._base if self.ciclos == 1 else programado + self.intervalo_seg
+
+        return InfoCiclo(
+            numero=self.ciclos,
+            programado=programado,
+            retraso_seg=retraso,
+            dt_segundos=dt_segundos
+        )
+
+    def terminar_ciclo(self) -> Optional[float]:
+        # Devuelve la duracion del ciclo; cuenta un sobrepaso si ya paso el plazo siguiente
+        if self.inicio_ciclo is None:
+            return None
+
+        ahora = self.reloj.monotonic()
+        duracion = ahora - self.inicio_ciclo
+
+        if ahora > self.proximo:
+            self.sobrepasados += 1
+            print(f"\n{self.nombre} sobrepasado: duro {duracion:.1f} s (intervalo {self.intervalo_seg:.0f} s)")
+
+        return duracion
+
+    def resumen(self) -> str:
+        retraso_medio = self.retraso_total_seg / self.ciclos if self.ciclos else 0.0
+        return (
+            f"Ciclos: {self.ciclos} | sobrepasados: {self.sobrepasados} | "
+            f"saltados: {self.saltados} | retraso medio: {retraso_medio * 1000:.1f} ms | "
+            f"retraso max: {self.retraso_max_seg * 1000:.1f} ms"
+        )
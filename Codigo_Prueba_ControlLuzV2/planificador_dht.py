@@ -0,0 +1,104 @@
+import threading
+from dataclasses import replace
+from typing import Dict, Optional, Tuple
+
+from models import LecturaDHT, SystemConfig
+from reloj import RelojSistema
+
+# Tiempo minimo entre lecturas que admite cada sensor
+PERIODO_MINIMO_DHT = {
+    "DHT11": 1.0,
+    "DHT22": 2.0,
+}
+
+
+class PlanificadorDHT:
+    # Lee cada DHT en un hilo aparte respetando su periodo minimo y guarda la
+    # ultima lectura valida con su timestamp. Si una lectura falla (checksum,
+    # timeout) se reintenta en el proximo momento permitido por el sensor.
+    def __init__(self, hw, config: SystemConfig, reloj=None):
+        self.hw = hw
+        self.reloj = reloj or RelojSistema()
+        self.lecturas: Dict[str, LecturaDHT] = {}
+        self.periodos: Dict[str, float] = {}
+        self.minimos: Dict[str, float] = {}
+        self.proxima_lectura: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+        for nombre_maceta, maceta in config.macetas.items():
+            if not maceta.enabled or not maceta.dht.enabled:
+                continue
+
+            minimo = PERIODO_MINIMO_DHT.get(maceta.dht.tipo.upper(), 2.0)
+            self.minimos[nombre_maceta] = minimo
+            self.periodos[nombre_maceta] = max(minimo, config.global_config.periodo_dht_seg)
+            self.lecturas[nombre_maceta] = LecturaDHT()
+            self.proxima_lectura[nombre_maceta] = 0.0
+
+    def iniciar(self) -> None:
+        if not self.periodos or self._hilo is not None:
+            return
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="planificador_dht", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def ultima_lectura(self, nombre_maceta: str) -> LecturaDHT:
+        with self._lock:
+            return replace(self.lecturas.get(nombre_maceta, LecturaDHT()))
+
+    def edad(self, nombre_maceta: str) -> Optional[float]:
+        lectura = self.ultima_lectura(nombre_maceta)
+        if lectura.timestamp is None:
+            return None
+        return self.reloj.monotonic() - lectura.timestamp
+
+    def leer(self, nombre_maceta: str) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        # Temperatura, humedad y edad en segundos de la ultima lectura valida
+        lectura = self.ultima_lectura(nombre_maceta)
+        if lectura.timestamp is None:
+            return None, None, None
+        return lectura.temperatura_c, lectura.humedad_ambiente_pct, self.reloj.monotonic() - lectura.timestamp
+
+    def sondear(self) -> float:
+        # Lee los sensores que ya tocan y devuelve cuanto falta para el proximo
+        ahora = self.reloj.monotonic()
+
+        for nombre_maceta, proxima in self.proxima_lectura.items():
+            if ahora < proxima:
+                continue
+
+            temperatura_c, humedad_ambiente_pct = self.hw.leer_dht(nombre_maceta)
+            ahora = self.reloj.monotonic()
+
+            with self._lock:
+                lectura = self.lecturas[nombre_maceta]
+
+                if temperatura_c is None or humedad_ambiente_pct is None:
+                    lectura.fallos_consecutivos += 1
+                    espera = self.minimos[nombre_maceta]
+                else:
+                    lectura.temperatura_c = temperatura_c
+                    lectura.humedad_ambiente_pct = humedad_ambiente_pct
+                    lectura.timestamp = ahora
+                    lectura.fallos_consecutivos = 0
+                    espera = self.periodos[nombre_maceta]
+
+            self.proxima_lectura[nombre_maceta] = ahora + espera
+
+        return max(0.0, min(self.proxima_lectura.values()) - self.reloj.monotonic())
+
+    def _ejecutar(self) -> None:
+        with self.reloj.participar():
+            while not self._detener.is_set():
+                espera = self.sondear()
+                self.reloj.esperar(self._detener, espera)
@@ -0,0 +1,129 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import InfoCiclo, TareaConfig
+from planificador_ciclos import PlanificadorCiclos
+from reloj import RelojSistema
+
+# nombre -> (periodo_seg, prioridad) si config.toml no dice otra cosa
+TAREAS_POR_DEFECTO: Dict[str, Tuple[float, int]] = {
+    "control_luz": (60.0, 0),
+    "lux": (30.0, 1),
+    "riego": (3600.0, 2),
+    "humedad_suelo": (900.0, 3),
+    "dht": (30.0, 4),
+    "persistencia": (600.0, 5),
+    "subida": (3600.0, 6),
+}
+
+
+class Tarea:
+    def __init__(
+        self,
+        nombre: str,
+        config: TareaConfig,
+        funcion: Callable[[InfoCiclo], None],
+        reloj,
+        alinear: bool,
+        tolerancia_seg: float = 1.0
+    ):
+        self.nombre = nombre
+        self.prioridad = config.prioridad
+        self.funcion = funcion
+        # Cada tarea tiene su propia grilla de plazos absolutos; si se atrasa
+        # mas de un periodo se saltean los plazos vencidos
+        self.planificador = PlanificadorCiclos(
+            config.periodo_seg, reloj, "saltar", alinear, nombre, tolerancia_seg=tolerancia_seg
+        )
+        self.errores = 0
+        self.tiempo_total_seg = 0.0
+
+
+class PlanificadorTareas:
+    # Planificador multi-tasa en un solo hilo: cada tarea corre a su periodo y,
+    # cuando varias vencen juntas, primero las de menor numero de prioridad.
+    # Asi el lux se integra cada minuto mientras el suelo y la subida van lentos.
+    def __init__(
+        self,
+        reloj=None,
+        alinear: bool = True,
+        detener: Optional[threading.Event] = None,
+        tolerancia_seg: float = 1.0
+    ):
+        self.reloj = reloj or RelojSistema()
+        # Si se levanta (parada de emergencia) la espera termina enseguida
+        self.detener = detener
+        self.alinear = alinear
+        self.tolerancia_seg = tolerancia_seg
+        self.tareas: List[Tarea] = []
+        # Funciones que devuelven cuanto falta para su proximo evento (o None)
+        # y se llaman en cada pasada, por ejemplo la maquina de riego
+        self.temporizadores: List[Callable[[], Optional[float]]] = []
+
+    def agregar(self, nombre: str, config: TareaConfig, funcion: Callable[[InfoCiclo], None]) -> None:
+        if not config.enabled:
+            return
+
+        self.tareas.append(Tarea(nombre, config, funcion, self.reloj, self.alinear, self.tolerancia_seg))
+        self.tareas.sort(key=lambda tarea: tarea.prioridad)
+
+    def agregar_temporizador(self, avanzar: Callable[[], Optional[float]]) -> None:
+        self.temporizadores.append(avanzar)
+
+    def tarea(self, nombre: str) -> Optional[Tarea]:
+        for tarea in self.tareas:
+            if tarea.nombre == nombre:
+                return tarea
+        return None
+
+    def ejecutar_pendientes(self) -> float:
+        # Corre todas las tareas vencidas y devuelve cuanto falta para el proximo plazo
+        for tarea in self.tareas:
+            if self.detenido:
+                break
+
+            if not tarea.planificador.vencido():
+                continue
+
+            info = tarea.planificador.arrancar_ciclo()
+            try:
+                tarea.funcion(info)
+            except Exception as e:
+                tarea.errores += 1
+                print(f"\nTarea {tarea.nombre} fallo: {e}")
+
+            duracion = tarea.planificador.terminar_ciclo()
+            tarea.tiempo_total_seg += duracion or 0.0
+
+        proximo = min(tarea.planificador.proximo for tarea in self.tareas)
+        for avanzar in self.temporizadores:
+            evento = avanzar()
+            if evento is not None:
+                proximo = min(proximo, self.reloj.monotonic() + evento)
+
+        return max(0.0, proximo - self.reloj.monotonic())
+
+    def ejecutar(self, continuar: Callable[[], bool]) -> None:
+        while continuar() and not self.detenido:
+            espera = self.ejecutar_pendientes()
+            if espera > 0 and continuar():
+                self.dormir(espera)
+
+    @property
+    def detenido(self) -> bool:
+        return self.detener is not None and self.detener.is_set()
+
+    def dormir(self, segundos: float) -> None:
+        self.reloj.esperar(self.detener, segundos)
+
+    def resumen(self) -> str:
+        lineas = ["Tareas:"]
+        for tarea in self.tareas:
+            p = tarea.planificador
+            medio = tarea.tiempo_total_seg / p.ciclos if p.ciclos else 0.0
+            lineas.append(
+                f" - {tarea.nombre:<14} cada {p.intervalo_seg:>6.0f} s | "
+                f"ejecuciones: {p.ciclos} | saltadas: {p.saltados} | errores: {tarea.errores} | "
+                f"duracion media: {medio * 1000:.1f} ms | retraso max: {p.retraso_max_seg * 1000:.1f} ms"
+            )
+        return "\n".join(lineas)
@@ -0,0 +1,115 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from models import PresupuestoConfig
+
+# Criticidad de cada etapa del ciclo (menor = mas importante)
+ACTUACION = 0
+SENSORES = 1
+REGISTRO = 2
+SUBIDA = 3
+
+# Peso de la ultima medicion en la estimacion de cada etapa
+ALFA_ESTIMACION = 0.3
+
+
+class PresupuestoCiclo:
+    # Tiempo maximo de trabajo por ciclo. La actuacion y los sensores siempre
+    # corren; el registro y la subida solo si lo que se estima que tardan
+    # (con margen) entra en lo que queda. Si no entra, el registro se difiere
+    # al ciclo siguiente y la subida se descarta (solo importa el dato nuevo).
+    # Los tiempos son reales (perf_counter), no los del reloj simulado.
+    def __init__(self, config: PresupuestoConfig, intervalo_seg: float):
+        self.config = config
+        # Nunca mas que el intervalo: ahi ya empieza el ciclo siguiente
+        self.ciclo_seg = min(config.ciclo_seg or intervalo_seg, intervalo_seg)
+        self.estimado_seg: Dict[str, float] = {}
+        self.tiempo_max_seg: Dict[str, float] = defaultdict(float)
+        self.recortes: Dict[str, int] = defaultdict(int)
+        self.descartados: Dict[str, int] = defaultdict(int)
+        self.ciclos = 0
+        self.excedidos = 0
+        self.uso_ultimo = 0.0
+        self.uso_max = 0.0
+        self._uso_total = 0.0
+        self._inicio: Optional[float] = None
+        self.recortes_ciclo: Dict[str, int] = {}
+
+    def iniciar_ciclo(self) -> None:
+        self._inicio = time.perf_counter()
+        self.recortes_ciclo = {}
+
+    def transcurrido(self) -> float:
+        return 0.0 if self._inicio is None else time.perf_counter() - self._inicio
+
+    def restante(self) -> float:
+        return self.ciclo_seg - self.transcurrido()
+
+    @contextmanager
+    def etapa(self, nombre: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            anterior = self.estimado_seg.get(nombre)
+            self.estimado_seg[nombre] = (
+                duracion if anterior is None
+                else ALFA_ESTIMACION * duracion + (1 - ALFA_ESTIMACION) * anterior
+            )
+            self.tiempo_max_seg[nombre] = max(self.tiempo_max_seg[nombre], duracion)
+
+    def permitir(self, nombre: str, criticidad: int, bloquearia: bool = False) -> bool:
+        # bloquearia: la etapa sabe de antemano que tendria que esperar
+        # (por ejemplo una cola llena), asi que no entra en ningun presupuesto
+        if criticidad <= SENSORES or not self.config.enabled:
+            return True
+
+        estimado = self.estimado_seg.get(nombre, 0.0) * self.config.margen
+        if not bloquearia and estimado <= self.restante():
+            return True
+
+        # Una etapa recortada no se vuelve a medir: la estimacion se baja en
+        # cada recorte para volver a probarla y no quedar recortada para siempre
+        # por una sola demora
+        if nombre in self.estimado_seg:
+            self.estimado_seg[nombre] *= 1 - ALFA_ESTIMACION
+        self.recortes[nombre] += 1
+        self.recortes_ciclo[nombre] = self.recortes_ciclo.get(nombre, 0) + 1
+        return False
+
+    def descartar(self, nombre: str, cantidad: int = 1) -> None:
+        self.descartados[nombre] += cantidad
+
+    def terminar_ciclo(self) -> float:
+        # Devuelve la fraccion del presupuesto usada en el ciclo
+        uso = self.transcurrido() / self.ciclo_seg
+        self.ciclos += 1
+        self.uso_ultimo = uso
+        self.uso_max = max(self.uso_max, uso)
+        self._uso_total += uso
+        if uso > 1.0:
+            self.excedidos += 1
+        return uso
+
+    def describir_ciclo(self) -> str:
+        texto = f"Presupuesto: {self.uso_ultimo * 100:.0f}% de {self.ciclo_seg:g} s"
+        if self.recortes_ciclo:
+            texto += f" (recortado: {', '.join(self.recortes_ciclo)})"
+        return texto
+
+    def resumen(self) -> str:
+        medio = self._uso_total / self.ciclos if self.ciclos else 0.0
+        lineas = [
+            f"Presupuesto de ciclo: {self.ciclo_seg:g} s | uso medio: {medio * 100:.1f}% | "
+            f"uso max: {self.uso_max * 100:.1f}% | excedidos: {self.excedidos}"
+        ]
+        for nombre in self.estimado_seg:
+            lineas.append(
+                f" - {nombre:<11} estimado: {self.estimado_seg[nombre] * 1000:.1f} ms | "
+                f"max: {self.tiempo_max_seg[nombre] * 1000:.1f} ms | "
+                f"recortes: {self.recortes[nombre]} | descartados: {self.descartados[nombre]}"
+            )
+        return "\n".join(lineas)
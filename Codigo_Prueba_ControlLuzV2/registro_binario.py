@@ -0,0 +1,229 @@
+import json
+import math
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from models import MacetaEstado
+
+# numpy solo hace falta para leer con memmap (analisis); el controlador
+# escribe con struct y no lo necesita
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIA = b"CLUZTLM1"
+# Encabezado: magia, version, tamano de registro y relleno hasta 16 bytes
+ENCABEZADO = struct.Struct("<8sHH4x")
+VERSION_REGISTRO = 1
+
+# Registro de 40 bytes con los campos alineados:
+#   instante int64 (unix s) | lux, dli, temperatura, humedad ambiente float32 (NaN = sin dato)
+#   maceta, raw 1, raw 2, % 1, % 2, % promedio int16 (-1 = sin dato) | banderas uint8
+REGISTRO = struct.Struct("<q4f6hB3x")
+CAMPOS_FLOAT = ("lux", "dli_acumulado", "temperatura_c", "humedad_ambiente_pct")
+CAMPOS_INT = (
+    "humedad_raw_1",
+    "humedad_raw_2",
+    "humedad_pct_1",
+    "humedad_pct_2",
+    "humedad_pct_promedio",
+)
+ATRIBUTOS_INT = (
+    "humedad_suelo_raw_1",
+    "humedad_suelo_raw_2",
+    "humedad_suelo_1_pct",
+    "humedad_suelo_2_pct",
+    "humedad_suelo_promedio_pct",
+)
+
+LUZ_ENCENDIDA = 1
+VENTILADOR_ENCENDIDO = 2
+RIEGO_PENDIENTE = 4
+
+SIN_DATO_INT = -1
+
+
+def ruta_macetas(ruta: str) -> str:
+    return f"{ruta}.macetas"
+
+
+def ruta_alertas(ruta: str) -> str:
+    return f"{ruta}.alertas"
+
+
+def _float(valor: Optional[float]) -> float:
+    return math.nan if valor is None else float(valor)
+
+
+def _int(valor: Optional[float]) -> int:
+    # Redondeo, no truncado: 46.9 % se guarda como 47
+    return SIN_DATO_INT if valor is None else int(round(valor))
+
+
+class EscritorBinario:
+    # Log de telemetria solo para agregar, con registros de ancho fijo: no hay
+    # formateo de texto al escribir ni parseo al leer. Los nombres de las
+    # macetas (el indice es el campo maceta) y las alertas van en archivos
+    # aparte. Si un corte deja un registro a medias, se recorta al abrir.
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.registros = 0
+        self._lock = threading.Lock()
+        self._macetas: Dict[str, int] = {
+            nombre: i for i, nombre in enumerate(leer_macetas(ruta))
+        }
+
+        nuevo = not os.path.isfile(ruta) or os.path.getsize(ruta) < ENCABEZADO.size
+        if nuevo:
+            with open(ruta, "wb") as f:
+                f.write(ENCABEZADO.pack(MAGIA, VERSION_REGISTRO, REGISTRO.size))
+        else:
+            _validar_encabezado(ruta)
+            sobrante = (os.path.getsize(ruta) - ENCABEZADO.size) % REGISTRO.size
+            if sobrante:
+                os.truncate(ruta, os.path.getsize(ruta) - sobrante)
+
+        self._archivo = open(ruta, "ab")
+        self._alertas = open(ruta_alertas(ruta), "a", encoding="utf-8")
+
+    def _indice_maceta(self, nombre: str) -> int:
+        if nombre not in self._macetas:
+            self._macetas[nombre] = len(self._macetas)
+            with open(ruta_macetas(self.ruta), "a", encoding="utf-8") as f:
+                f.write(nombre + "\n")
+        return self._macetas[nombre]
+
+    def escribir(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        instante = int(ahora.timestamp())
+        bloque = bytearray()
+
+        with self._lock:
+            for nombre_maceta, estado in estados.items():
+                maceta = self._indice_maceta(nombre_maceta)
+                banderas = (
+                    (LUZ_ENCENDIDA if estado.luz_encendida else 0)
+                    | (VENTILADOR_ENCENDIDO if estado.ventilador_encendido else 0)
+                    | (RIEGO_PENDIENTE if estado.riego_pendiente else 0)
+                )
+                bloque += REGISTRO.pack(
+                    instante,
+                    _float(estado.lux),
+                    _float(estado.dli_acumulado),
+                    _float(estado.temperatura_c),
+                    _float(estado.humedad_ambiente_pct),
+                    maceta,
+                    *(_int(getattr(estado, atributo)) for atributo in ATRIBUTOS_INT),
+                    banderas
+                )
+
+                if estado.alertas:
+                    self._alertas.write(json.dumps(
+                        {"instante": instante, "maceta": nombre_maceta, "alertas": estado.alertas}
+                    ) + "\n")
+
+            # Todos los registros del ciclo en una sola escritura
+            self._archivo.write(bloque)
+            self._archivo.flush()
+            self._alertas.flush()
+            self.registros += len(estados)
+
+    def cerrar(self) -> None:
+        with self._lock:
+            for archivo in (self._archivo, self._alertas):
+                archivo.flush()
+                os.fsync(archivo.fileno())
+                archivo.close()
+
+    def resumen(self) -> str:
+        return f"Binario: {self.registros} registros de {REGISTRO.size} bytes | {self.ruta}"
+
+
+def _validar_encabezado(ruta: str) -> None:
+    with open(ruta, "rb") as f:
+        magia, version, tamano = ENCABEZADO.unpack(f.read(ENCABEZADO.size))
+
+    if magia != MAGIA or version != VERSION_REGISTRO or tamano != REGISTRO.size:
+        raise ValueError(f"{ruta} no es un registro binario v{VERSION_REGISTRO} de {REGISTRO.size} bytes")
+
+
+def leer_macetas(ruta: str) -> List[str]:
+    try:
+        with open(ruta_macetas(ruta), encoding="utf-8") as f:
+            return [linea.rstrip("\n") for linea in f if linea.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def leer_alertas(ruta: str) -> List[dict]:
+    try:
+        with open(ruta_alertas(ruta), encoding="utf-8") as f:
+            return [json.loads(linea) for linea in f if linea.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def tipo_numpy():
+    # Mismo layout que REGISTRO, para leer el archivo sin copiar ni parsear
+    if np is None:
+        raise RuntimeError("Para leer con memmap hace falta numpy (pip install numpy)")
+
+    return np.dtype(
+        [("instante", "<i8")]
+        + [(campo, "<f4") for campo in CAMPOS_FLOAT]
+        + [("maceta", "<i2")]
+        + [(campo, "<i2") for campo in CAMPOS_INT]
+        + [("banderas", "u1"), ("_relleno", "V3")]
+    )
+
+
+def abrir_memmap(ruta: str):
+    # Arreglo estructurado de numpy mapeado sobre el archivo: cargar un anio
+    # es solo mapear paginas. Columnas: datos["lux"], datos["instante"], etc.
+    tipo = tipo_numpy()
+    _validar_encabezado(ruta)
+    cantidad = (os.path.getsize(ruta) - ENCABEZADO.size) // REGISTRO.size
+    if cantidad == 0:
+        return np.zeros(0, dtype=tipo)
+    return np.memmap(ruta, dtype=tipo, mode="r", offset=ENCABEZADO.size, shape=(cantidad,))
+
+
+def rango_memmap(datos, desde: datetime, hasta: datetime):
+    # El log es solo para agregar, asi que "instante" esta ordenado
+    instantes = datos["instante"]
+    inicio = np.searchsorted(instantes, int(desde.timestamp()), side="left")
+    fin = np.searchsorted(instantes, int(hasta.timestamp()), side="right")
+    return datos[inicio:fin]
+
+
+def iterar_registros(ruta: str) -> Iterator[Dict[str, object]]:
+    # Lectura sin numpy, registro por registro (para herramientas chicas)
+    _validar_encabezado(ruta)
+    macetas = leer_macetas(ruta)
+
+    with open(ruta, "rb") as f:
+        f.seek(ENCABEZADO.size)
+        contenido = f.read()
+
+    completo = len(contenido) - len(contenido) % REGISTRO.size
+    for valores in REGISTRO.iter_unpack(contenido[:completo]):
+        instante, *flotantes = valores[:5]
+        maceta, *enteros = valores[5:11]
+        banderas = valores[11]
+        registro: Dict[str, object] = {
+            "instante": datetime.fromtimestamp(instante),
+            "maceta": macetas[maceta] if maceta < len(macetas) else str(maceta),
+        }
+        registro.update(
+            (campo, None if math.isnan(valor) else valor) for campo, valor in zip(CAMPOS_FLOAT, flotantes)
+        )
+        registro.update(
+            (campo, None if valor == SIN_DATO_INT else valor) for campo, valor in zip(CAMPOS_INT, enteros)
+        )
+        registro["luz_encendida"] = bool(banderas & LUZ_ENCENDIDA)
+        registro["ventilador_encendido"] = bool(banderas & VENTILADOR_ENCENDIDO)
+        registro["riego_pendiente"] = bool(banderas & RIEGO_PENDIENTE)
+        yield registro
@@ -0,0 +1,200 @@
+import csv
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, TextIO
+
+from models import MacetaEstado, RegistroCSVConfig
+
+COLUMNAS_CSV = [
+    "fecha",
+    "hora",
+    "maceta",
+    "humedad_raw_1",
+    "humedad_raw_2",
+    "humedad_pct_1",
+    "humedad_pct_2",
+    "humedad_pct_promedio",
+    "lux",          # (ambiente)
+    "dli_acumulado",
+    "temperatura_c",
+    "humedad_ambiente_pct",
+    "luz_encendida",
+    "ventilador_encendido",
+    "riego_pendiente",
+    "alertas",
+]
+
+
+def valor_csv(valor):
+    return "" if valor is None else valor
+
+
+def fila_csv(nombre_maceta: str, estado: MacetaEstado, ahora: datetime) -> List:
+    return [
+        ahora.strftime("%Y-%m-%d"),
+        ahora.strftime("%H:%M:%S"),
+        nombre_maceta,
+        valor_csv(estado.humedad_suelo_raw_1),
+        valor_csv(estado.humedad_suelo_raw_2),
+        valor_csv(estado.humedad_suelo_1_pct),
+        valor_csv(estado.humedad_suelo_2_pct),
+        valor_csv(estado.humedad_suelo_promedio_pct),
+        valor_csv(estado.lux),
+        round(estado.dli_acumulado, 4),
+        valor_csv(estado.temperatura_c),
+        valor_csv(estado.humedad_ambiente_pct),
+        int(estado.luz_encendida),
+        int(estado.ventilador_encendido),
+        int(estado.riego_pendiente),
+        " | ".join(estado.alertas),
+    ]
+
+
+def apartar_si_cambiaron_columnas(archivo: str) -> Optional[str]:
+    # Un CSV de una version con otras columnas no se sigue escribiendo: las
+    # filas viejas quedarian corridas para pandas. Se renombra (con la
+    # cantidad de columnas en el nombre) y se arranca uno nuevo.
+    if not os.path.isfile(archivo) or os.path.getsize(archivo) == 0:
+        return None
+
+    with open(archivo, newline="", encoding="utf-8") as f:
+        encabezado = next(csv.reader(f), [])
+    if encabezado == COLUMNAS_CSV:
+        return None
+
+    raiz, extension = os.path.splitext(archivo)
+    destino = f"{raiz}_{len(encabezado)}_columnas{extension}"
+    numero = 1
+    while os.path.exists(destino):
+        numero += 1
+        destino = f"{raiz}_{len(encabezado)}_columnas_{numero}{extension}"
+
+    os.rename(archivo, destino)
+    print(f"\n{archivo} tenia otras columnas: se paso a {destino} y se empieza uno nuevo")
+    return destino
+
+
+def agregar_filas_csv(archivo: str, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+    # Sin buffer: se abre y cierra el archivo en cada llamada
+    apartar_si_cambiaron_columnas(archivo)
+    existe = os.path.isfile(archivo)
+
+    with open(archivo, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+
+        if not existe:
+            writer.writerow(COLUMNAS_CSV)
+
+        for nombre_maceta, estado in estados.items():
+            writer.writerow(fila_csv(nombre_maceta, estado, ahora))
+
+
+def ruta_del_dia(ruta_base: str, dia: date) -> str:
+    # registro.csv -> registro_2026-10-18.csv
+    raiz, extension = os.path.splitext(ruta_base)
+    return f"{raiz}_{dia.isoformat()}{extension or '.csv'}"
+
+
+class EscritorCSV:
+    # Escritor de telemetria que vive todo el programa: el archivo queda
+    # abierto y las filas se juntan en memoria. Se bajan al archivo cuando hay
+    # filas_buffer filas o pasaron vaciado_seg, y se hace fsync cada fsync_seg
+    # (y al rotar o cerrar): es lo que se puede perder si se corta la luz. Con
+    # rotacion_diaria cada dia va a su propio archivo. Los plazos se cuentan
+    # con la hora de las filas, asi la simulacion se comporta igual.
+    def __init__(self, ruta_base: str, config: RegistroCSVConfig):
+        self.ruta_base = ruta_base
+        self.config = config
+        self.filas_pendientes: List[List] = []
+        self.ruta: Optional[str] = None
+        self.dia: Optional[date] = None
+        self.filas = 0
+        self.vaciados = 0
+        self.fsyncs = 0
+        self.rotaciones = 0
+        self._archivo: Optional[TextIO] = None
+        self._writer = None
+        self._ultimo_vaciado: Optional[float] = None
+        self._ultimo_fsync: Optional[float] = None
+        self._sin_fsync = False
+        self._lock = threading.Lock()
+
+    def escribir(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        with self._lock:
+            if self.config.rotacion_diaria and ahora.date() != self.dia and self._archivo is not None:
+                self._cerrar_archivo()
+                self.rotaciones += 1
+
+            if self._archivo is None:
+                self._abrir(ahora.date())
+
+            for nombre_maceta, estado in estados.items():
+                self.filas_pendientes.append(fila_csv(nombre_maceta, estado, ahora))
+
+            instante = ahora.timestamp()
+            if self._ultimo_vaciado is None:
+                self._ultimo_vaciado = self._ultimo_fsync = instante
+
+            if (
+                len(self.filas_pendientes) >= self.config.filas_buffer
+                or instante - self._ultimo_vaciado >= self.config.vaciado_seg
+            ):
+                self._vaciar()
+                self._ultimo_vaciado = instante
+
+            if self._sin_fsync and instante - self._ultimo_fsync >= self.config.fsync_seg:
+                self._fsync()
+                self._ultimo_fsync = instante
+
+    def vaciar(self) -> None:
+        with self._lock:
+            self._vaciar()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._cerrar_archivo()
+
+    def _abrir(self, dia: date) -> None:
+        self.dia = dia
+        self.ruta = ruta_del_dia(self.ruta_base, dia) if self.config.rotacion_diaria else self.ruta_base
+        apartar_si_cambiaron_columnas(self.ruta)
+        self._archivo = open(self.ruta, mode="a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._archivo)
+
+        # Archivo nuevo (o vacio): va el encabezado
+        if self._archivo.tell() == 0:
+            self._writer.writerow(COLUMNAS_CSV)
+            self._sin_fsync = True
+
+    def _vaciar(self) -> None:
+        if self.filas_pendientes and self._writer is not None:
+            self._writer.writerows(self.filas_pendientes)
+            self._archivo.flush()
+            self.filas += len(self.filas_pendientes)
+            self.vaciados += 1
+            self.filas_pendientes.clear()
+            self._sin_fsync = True
+
+    def _fsync(self) -> None:
+        os.fsync(self._archivo.fileno())
+        self.fsyncs += 1
+        self._sin_fsync = False
+
+    def _cerrar_archivo(self) -> None:
+        if self._archivo is None:
+            return
+
+        self._vaciar()
+        if self._sin_fsync:
+            self._fsync()
+        self._archivo.close()
+        self._archivo = None
+        self._writer = None
+
+    def resumen(self) -> str:
+        fsyncs_fila = self.fsyncs / self.filas if self.filas else 0.0
+        return (
+            f"CSV: {self.filas} filas en {self.vaciados} escrituras | {self.fsyncs} fsync "
+            f"({fsyncs_fila:.3f} por fila) | {self.rotaciones} rotaciones | archivo: {self.ruta}"
+        )
@@ -0,0 +1,385 @@
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models import MacetaEstado
+
+# Variables numericas de MacetaEstado que se guardan (las booleanas como 0/1)
+VARIABLES = {
+    "humedad_raw_1": "humedad_suelo_raw_1",
+    "humedad_raw_2": "humedad_suelo_raw_2",
+    "humedad_pct_1": "humedad_suelo_1_pct",
+    "humedad_pct_2": "humedad_suelo_2_pct",
+    "humedad_pct_promedio": "humedad_suelo_promedio_pct",
+    "lux": "lux",
+    "dli_acumulado": "dli_acumulado",
+    "temperatura_c": "temperatura_c",
+    "humedad_ambiente_pct": "humedad_ambiente_pct",
+    "luz_encendida": "luz_encendida",
+    "ventilador_encendido": "ventilador_encendido",
+    "riego_pendiente": "riego_pendiente",
+}
+
+# Tabla angosta: una fila por (maceta, variable, instante). La clave primaria
+# es el indice (WITHOUT ROWID guarda las filas ordenadas por ella), asi un
+# rango de una variable de una maceta lee solo esas paginas.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS macetas (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS variables (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS lecturas (
+    maceta INTEGER NOT NULL REFERENCES macetas(id),
+    variable INTEGER NOT NULL REFERENCES variables(id),
+    instante INTEGER NOT NULL,
+    valor REAL NOT NULL,
+    PRIMARY KEY (maceta, variable, instante)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alertas (
+    maceta INTEGER NOT NULL REFERENCES macetas(id),
+    instante INTEGER NOT NULL,
+    texto TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alertas_maceta_instante ON alertas (maceta, instante);
+CREATE TABLE IF NOT EXISTS resumenes (
+    resolucion INTEGER NOT NULL,
+    maceta INTEGER NOT NULL REFERENCES macetas(id),
+    variable INTEGER NOT NULL REFERENCES variables(id),
+    inicio INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL,
+    suma REAL NOT NULL,
+    minimo REAL NOT NULL,
+    maximo REAL NOT NULL,
+    PRIMARY KEY (resolucion, maceta, variable, inicio)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    maceta INTEGER NOT NULL REFERENCES macetas(id),
+    dia TEXT NOT NULL,
+    dli REAL NOT NULL DEFAULT 0,
+    horas_luz REAL NOT NULL DEFAULT 0,
+    riegos INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (maceta, dia)
+) WITHOUT ROWID;
+"""
+
+# Resoluciones de los resumenes, en segundos
+RESOLUCIONES = {"minuto": 60, "hora": 3600, "dia": 86400}
+
+ACTUALIZAR_RESUMEN = """
+INSERT INTO resumenes VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (resolucion, maceta, variable, inicio) DO UPDATE SET
+    cantidad = cantidad + 1,
+    suma = suma + excluded.suma,
+    minimo = min(minimo, excluded.minimo),
+    maximo = max(maximo, excluded.maximo)
+"""
+
+# Una lectura que pisa a otra del mismo instante no es una muestra mas: se
+# corrige la suma (minimo y maximo solo se pueden ampliar)
+CORREGIR_RESUMEN = """
+UPDATE resumenes SET
+    suma = suma + ?,
+    minimo = min(minimo, ?),
+    maximo = max(maximo, ?)
+WHERE resolucion = ? AND maceta = ? AND variable = ? AND inicio = ?
+"""
+
+ACTUALIZAR_DIA = """
+INSERT INTO resumen_diario (maceta, dia, dli, horas_luz, riegos) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (maceta, dia) DO UPDATE SET
+    dli = max(dli, excluded.dli),
+    horas_luz = horas_luz + excluded.horas_luz,
+    riegos = riegos + excluded.riegos
+"""
+
+
+def inicio_dia(instante: float) -> int:
+    # Medianoche local (los dias del DLI son locales, no UTC)
+    return int(datetime.combine(datetime.fromtimestamp(instante).date(), datetime.min.time()).timestamp())
+
+
+def inicio_bloque(instante: int, resolucion: int) -> int:
+    if resolucion == RESOLUCIONES["dia"]:
+        return inicio_dia(instante)
+    return instante - instante % resolucion
+
+
+def horas_por_dia(desde: float, hasta: float) -> Dict[str, float]:
+    # Reparte el tramo [desde, hasta) entre los dias que toca
+    horas: Dict[str, float] = {}
+    while desde < hasta:
+        dia = datetime.fromtimestamp(desde).date()
+        fin_dia = datetime.combine(dia + timedelta(days=1), datetime.min.time()).timestamp()
+        tramo_fin = min(hasta, fin_dia)
+        horas[dia.isoformat()] = horas.get(dia.isoformat(), 0.0) + (tramo_fin - desde) / 3600
+        desde = tramo_fin
+    return horas
+
+
+class AlmacenSQLite:
+    # Telemetria en SQLite con WAL: cada ciclo entra en una sola transaccion y
+    # las consultas (otra conexion) no esperan a la escritura. synchronous =
+    # NORMAL: con WAL un corte de luz puede perder las ultimas transacciones
+    # pero nunca corrompe la base.
+    #
+    # Con resumenes, en la misma transaccion se actualizan cantidad, suma,
+    # minimo y maximo de cada variable por minuto, hora y dia, y por dia el
+    # DLI, las horas de luz prendida y los riegos pedidos: los informes leen
+    # una fila por bloque en vez de todas las muestras. Una luz cuenta como
+    # prendida hasta la muestra siguiente, como mucho intervalo_seg (si el
+    # programa estuvo parado no se sabe).
+    def __init__(self, ruta: str, resumenes: bool = True, intervalo_seg: float = 3600.0):
+        self.ruta = ruta
+        self.resumenes = resumenes
+        self.intervalo_seg = intervalo_seg
+        self.filas = 0
+        self.transacciones = 0
+        self.tiempo_max_seg = 0.0
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+        self._ids_macetas: Dict[str, int] = {}
+        self._ids_variables: Dict[str, int] = {}
+        # Ultima muestra de cada maceta: (instante, luz, riego pendiente)
+        self._anterior: Dict[str, Tuple[int, bool, bool]] = {}
+
+        with self._conexion:
+            for nombre in VARIABLES:
+                self._ids_variables[nombre] = self._id("variables", nombre, self._ids_variables)
+
+    def _id(self, tabla: str, nombre: str, cache: Dict[str, int]) -> int:
+        if nombre not in cache:
+            self._conexion.execute(f"INSERT OR IGNORE INTO {tabla} (nombre) VALUES (?)", (nombre,))
+            cache[nombre] = self._conexion.execute(
+                f"SELECT id FROM {tabla} WHERE nombre = ?", (nombre,)
+            ).fetchone()[0]
+        return cache[nombre]
+
+    def guardar(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        instante = int(ahora.timestamp())
+        inicio = time.perf_counter()
+
+        with self._lock, self._conexion:
+            lecturas = []
+            alertas = []
+            for nombre_maceta, estado in estados.items():
+                id_maceta = self._id("macetas", nombre_maceta, self._ids_macetas)
+                for variable, atributo in VARIABLES.items():
+                    valor = getattr(estado, atributo)
+                    if valor is not None:
+                        lecturas.append((id_maceta, self._ids_variables[variable], instante, float(valor)))
+                alertas.extend((id_maceta, instante, alerta) for alerta in estado.alertas)
+
+            # Un ciclo repetido (mismo instante) pisa al anterior
+            previos = self._valores_previos(lecturas) if self.resumenes else {}
+            self._conexion.executemany("INSERT OR REPLACE INTO lecturas VALUES (?, ?, ?, ?)", lecturas)
+            self._conexion.executemany("INSERT INTO alertas VALUES (?, ?, ?)", alertas)
+
+            if self.resumenes:
+                self._actualizar_resumenes(estados, lecturas, previos, instante)
+
+        self.filas += len(lecturas)
+        self.transacciones += 1
+        self.tiempo_max_seg = max(self.tiempo_max_seg, time.perf_counter() - inicio)
+
+    def _valores_previos(self, lecturas: List[Tuple]) -> Dict[Tuple[int, int], float]:
+        # Lecturas ya guardadas con la misma clave, por (maceta, variable)
+        previos = {}
+        for maceta, variable, instante, _valor in lecturas:
+            fila = self._conexion.execute(
+                "SELECT valor FROM lecturas WHERE maceta = ? AND variable = ? AND instante = ?",
+                (maceta, variable, instante)
+            ).fetchone()
+            if fila is not None:
+                previos[(maceta, variable)] = fila[0]
+        return previos
+
+    def _actualizar_resumenes(
+        self,
+        estados: Dict[str, MacetaEstado],
+        lecturas: List[Tuple],
+        previos: Dict[Tuple[int, int], float],
+        instante: int
+    ) -> None:
+        nuevas, corregidas = [], []
+        for maceta, variable, _instante, valor in lecturas:
+            for resolucion in RESOLUCIONES.values():
+                bloque = inicio_bloque(instante, resolucion)
+                if (maceta, variable) in previos:
+                    diferencia = valor - previos[(maceta, variable)]
+                    corregidas.append((diferencia, valor, valor, resolucion, maceta, variable, bloque))
+                else:
+                    nuevas.append((resolucion, maceta, variable, bloque, valor, valor, valor))
+        self._conexion.executemany(ACTUALIZAR_RESUMEN, nuevas)
+        self._conexion.executemany(CORREGIR_RESUMEN, corregidas)
+
+        dias = []
+        repetidas = {maceta for maceta, _variable in previos}
+        for nombre_maceta, estado in estados.items():
+            id_maceta = self._ids_macetas[nombre_maceta]
+            dia = datetime.fromtimestamp(instante).date().isoformat()
+            if id_maceta in repetidas:
+                # Este instante ya se conto: solo puede subir el DLI
+                dias.append((id_maceta, dia, estado.dli_acumulado, 0.0, 0))
+                continue
+            anterior = self._anterior.get(nombre_maceta) or self._ultima_muestra(id_maceta, instante)
+
+            horas_luz: Dict[str, float] = {}
+            riego_anterior = False
+            if anterior is not None:
+                instante_anterior, luz_anterior, riego_anterior = anterior
+                if luz_anterior:
+                    fin = min(instante, instante_anterior + self.intervalo_seg)
+                    horas_luz = horas_por_dia(instante_anterior, fin)
+
+            for dia_luz, horas in horas_luz.items():
+                if dia_luz != dia:
+                    dias.append((id_maceta, dia_luz, 0.0, horas, 0))
+
+            # Cada flanco de riego_pendiente es un riego pedido
+            riego = int(estado.riego_pendiente and not riego_anterior)
+            dias.append((id_maceta, dia, estado.dli_acumulado, horas_luz.get(dia, 0.0), riego))
+            self._anterior[nombre_maceta] = (instante, estado.luz_encendida, estado.riego_pendiente)
+
+        self._conexion.executemany(ACTUALIZAR_DIA, dias)
+
+    def _ultima_muestra(self, id_maceta: int, antes_de: int) -> Optional[Tuple[int, bool, bool]]:
+        # Al reiniciar se sigue desde la ultima muestra guardada (la del ciclo
+        # actual ya esta en lecturas)
+        valores = {}
+        for variable in ("luz_encendida", "riego_pendiente"):
+            fila = self._conexion.execute(
+                "SELECT instante, valor FROM lecturas WHERE maceta = ? AND variable = ? AND instante < ? "
+                "ORDER BY instante DESC LIMIT 1",
+                (id_maceta, self._ids_variables[variable], antes_de)
+            ).fetchone()
+            if fila is None:
+                return None
+            valores[variable] = fila
+
+        instante = valores["luz_encendida"][0]
+        return instante, bool(valores["luz_encendida"][1]), bool(valores["riego_pendiente"][1])
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+    def resumen(self) -> str:
+        return (
+            f"SQLite: {self.filas} lecturas en {self.transacciones} transacciones "
+            f"(max {self.tiempo_max_seg * 1000:.1f} ms) | {self.ruta}"
+        )
+
+
+class ConsultaTelemetria:
+    # Consultas sobre la base de AlmacenSQLite, con su propia conexion de solo
+    # lectura; se puede usar mientras el control sigue escribiendo
+    def __init__(self, ruta: str):
+        self._conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, check_same_thread=False)
+
+    def rango(
+        self,
+        maceta: str,
+        variable: str,
+        desde: datetime,
+        hasta: Optional[datetime] = None
+    ) -> List[Tuple[datetime, float]]:
+        hasta = hasta or datetime.now()
+        filas = self._conexion.execute(
+            """
+            SELECT l.instante, l.valor FROM lecturas l
+            WHERE l.maceta = (SELECT id FROM macetas WHERE nombre = ?)
+              AND l.variable = (SELECT id FROM variables WHERE nombre = ?)
+              AND l.instante BETWEEN ? AND ?
+            ORDER BY l.instante
+            """,
+            (maceta, variable, int(desde.timestamp()), int(hasta.timestamp()))
+        ).fetchall()
+        return [(datetime.fromtimestamp(instante), valor) for instante, valor in filas]
+
+    def ultimo(self, maceta: str, variable: str) -> Optional[Tuple[datetime, float]]:
+        fila = self._conexion.execute(
+            """
+            SELECT l.instante, l.valor FROM lecturas l
+            WHERE l.maceta = (SELECT id FROM macetas WHERE nombre = ?)
+              AND l.variable = (SELECT id FROM variables WHERE nombre = ?)
+            ORDER BY l.instante DESC LIMIT 1
+            """,
+            (maceta, variable)
+        ).fetchone()
+        return None if fila is None else (datetime.fromtimestamp(fila[0]), fila[1])
+
+    def ultimos(self, maceta: str) -> Dict[str, Tuple[datetime, float]]:
+        valores = {}
+        for variable in VARIABLES:
+            ultimo = self.ultimo(maceta, variable)
+            if ultimo is not None:
+                valores[variable] = ultimo
+        return valores
+
+    def serie(
+        self,
+        maceta: str,
+        variable: str,
+        resolucion: str,
+        desde: datetime,
+        hasta: Optional[datetime] = None
+    ) -> List[Tuple[datetime, int, float, float, float]]:
+        # (inicio del bloque, cantidad, media, minimo, maximo) por minuto, hora o dia
+        hasta = hasta or datetime.now()
+        filas = self._conexion.execute(
+            """
+            SELECT r.inicio, r.cantidad, r.suma / r.cantidad, r.minimo, r.maximo FROM resumenes r
+            WHERE r.resolucion = ?
+              AND r.maceta = (SELECT id FROM macetas WHERE nombre = ?)
+              AND r.variable = (SELECT id FROM variables WHERE nombre = ?)
+              AND r.inicio BETWEEN ? AND ?
+            ORDER BY r.inicio
+            """,
+            (RESOLUCIONES[resolucion], maceta, variable, int(desde.timestamp()), int(hasta.timestamp()))
+        ).fetchall()
+        return [(datetime.fromtimestamp(inicio), *valores) for inicio, *valores in filas]
+
+    def dias(self, maceta: str, desde: date, hasta: Optional[date] = None) -> List[Dict[str, object]]:
+        # DLI del dia, horas de luz prendida y riegos pedidos
+        hasta = hasta or date.today()
+        filas = self._conexion.execute(
+            """
+            SELECT d.dia, d.dli, d.horas_luz, d.riegos FROM resumen_diario d
+            WHERE d.maceta = (SELECT id FROM macetas WHERE nombre = ?)
+              AND d.dia BETWEEN ? AND ?
+            ORDER BY d.dia
+            """,
+            (maceta, desde.isoformat(), hasta.isoformat())
+        ).fetchall()
+        return [
+            {"dia": date.fromisoformat(dia), "dli": dli, "horas_luz": horas_luz, "riegos": riegos}
+            for dia, dli, horas_luz, riegos in filas
+        ]
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+
+if __name__ == "__main__":
+    # python3 registro_sqlite.py telemetria.db maceta2 humedad_pct_promedio 7
+    ruta, maceta, variable = sys.argv[1:4]
+    dias = float(sys.argv[4]) if len(sys.argv) > 4 else 7
+    consulta = ConsultaTelemetria(ruta)
+
+    inicio = time.perf_counter()
+    valores = consulta.rango(maceta, variable, datetime.now() - timedelta(days=dias))
+    duracion = time.perf_counter() - inicio
+
+    for instante, valor in valores:
+        print(f"{instante:%Y-%m-%d %H:%M:%S}  {valor:g}")
+    print(f"{len(valores)} lecturas de {variable} ({maceta}) en {duracion * 1000:.1f} ms")
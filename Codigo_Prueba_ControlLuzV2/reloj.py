@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+
+class RelojSistema:
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, segundos: float) -> None:
+        time.sleep(segundos)
+
+    def esperar(self, evento: Optional[threading.Event], segundos: float) -> bool:
+        # Como evento.wait(segundos); devuelve True si se levanto el evento
+        if evento is None:
+            time.sleep(max(0.0, segundos))
+            return False
+        return evento.wait(max(0.0, segundos))
+
+    async def dormir_async(self, segundos: float) -> None:
+        await asyncio.sleep(max(0.0, segundos))
+
+    def participar(self):
+        return nullcontext()
+
+    def avanzar_hasta(self, instante: datetime) -> None:
+        pass
+
+
+class RelojVirtual:
+    # Reloj de eventos discretos para la simulacion: el tiempo no corre solo,
+    # salta al despertar pendiente mas cercano. Lo que tarda el codigo en
+    # correr (y el jitter del sistema operativo) no se vuelve tiempo simulado.
+    #
+    # El hilo que crea el reloj (el del control) participa desde el arranque y
+    # los otros hilos con bucle propio (DHT, muestreo) se anotan con
+    # participar(): mientras alguno trabaja el reloj no avanza, y cuando todos
+    # esperan salta enseguida. Las esperas de otros hilos (las latencias
+    # simuladas en el pool de adquisicion) hacen avanzar el reloj cuando lleva
+    # quietud_seg reales sin actividad.
+    def __init__(self, inicio: Optional[datetime] = None, quietud_seg: float = 0.002):
+        self.inicio = (inicio or datetime.now()).timestamp()
+        self.quietud_seg = quietud_seg
+        self._ahora = 0.0
+        self._condicion = threading.Condition()
+        # Despertares pendientes: clave -> (instante, participante que espera o None)
+        self._esperas: Dict[int, Tuple[float, Optional[int]]] = {}
+        self._claves = itertools.count()
+        # Participantes anotados y cuantas esperas tiene en curso cada uno
+        self._participantes: Dict[int, int] = {threading.get_ident(): 1}
+        self._esperando: Dict[int, int] = {}
+        self._actividad = time.monotonic()
+        self.pasos = 0
+
+    def monotonic(self) -> float:
+        with self._condicion:
+            self._actividad = time.monotonic()
+            return self._ahora
+
+    def time(self) -> float:
+        return self.inicio + self.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def sleep(self, segundos: float) -> None:
+        self.esperar(None, segundos)
+
+    def esperar(self, evento: Optional[threading.Event], segundos: float) -> bool:
+        participante = threading.get_ident()
+        with self._condicion:
+            if participante not in self._participantes:
+                participante = None
+        return self._esperar(evento, segundos, participante)
+
+    async def dormir_async(self, segundos: float) -> None:
+        # La espera corre en otro hilo a nombre del hilo del loop: si este
+        # participa, cuenta como esperando mientras haya una espera en curso.
+        # Si se cancela la tarea, el evento libera ese hilo.
+        participante = threading.get_ident()
+        with self._condicion:
+            if participante not in self._participantes:
+                participante = None
+        cancelada = threading.Event()
+        try:
+            await asyncio.to_thread(self._esperar, cancelada, segundos, participante)
+        finally:
+            cancelada.set()
+
+    @contextmanager
+    def participar(self):
+        ident = threading.get_ident()
+        with self._condicion:
+            self._participantes[ident] = self._participantes.get(ident, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._participantes[ident] -= 1
+                if not self._participantes[ident]:
+                    del self._participantes[ident]
+                self._condicion.notify_all()
+
+    def avanzar_hasta(self, instante: datetime) -> None:
+        # Para alinear el reloj de otro proceso (fragmentos) con el del coordinador
+        with self._condicion:
+            objetivo = instante.timestamp() - self.inicio
+            if objetivo > self._ahora:
+                self._ahora = objetivo
+                self._condicion.notify_all()
+
+    def _esperar(self, evento: Optional[threading.Event], segundos: float, participante: Optional[int]) -> bool:
+        with self._condicion:
+            despertar = self._ahora + max(0.0, segundos)
+            clave = next(self._claves)
+            self._esperas[clave] = (despertar, participante)
+            if participante is not None:
+                self._esperando[participante] = self._esperando.get(participante, 0) + 1
+            self._actividad = time.monotonic()
+
+            try:
+                while True:
+                    if evento is not None and evento.is_set():
+                        return True
+                    if self._ahora >= despertar:
+                        return False
+                    if not self._avanzar():
+                        # Sin avance posible se revisa de nuevo al cumplirse la
+                        # quietud (o cada 50 ms, por si se levanta el evento)
+                        self._condicion.wait(self.quietud_seg if self._hay_ajenas() else 0.05)
+            finally:
+                del self._esperas[clave]
+                if participante is not None:
+                    self._esperando[participante] -= 1
+                self._actividad = time.monotonic()
+                self._condicion.notify_all()
+
+    def _hay_ajenas(self) -> bool:
+        return any(participante is None for _, participante in self._esperas.values())
+
+    def _avanzar(self) -> bool:
+        # Se llama con la condicion tomada. Avanza al despertar mas cercano si
+        # todos los participantes estan esperando, o si hay esperas de otros
+        # hilos y nadie toco el reloj en quietud_seg. Si ya hay esperas
+        # vencidas se deja correr primero a esos hilos.
+        if any(instante <= self._ahora for instante, _ in self._esperas.values()):
+            return False
+
+        todos_esperando = all(self._esperando.get(ident, 0) > 0 for ident in self._participantes)
+        if not todos_esperando:
+            if not self._hay_ajenas() or time.monotonic() - self._actividad < self.quietud_seg:
+                return False
+
+        self._ahora = max(self._ahora, min(instante for instante, _ in self._esperas.values()))
+        self._actividad = time.monotonic()
+        self.pasos += 1
+        self._condicion.notify_all()
+        return True
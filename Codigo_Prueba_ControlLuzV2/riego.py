@@ -0,0 +1,208 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from models import MacetaConfig
+from reloj import RelojSistema
+
+REPOSO = "reposo"
+VALVULA_ABIERTA = "valvula_abierta"
+BOMBEANDO = "bombeando"
+DRENANDO = "drenando"
+
+# Espera entre abrir la valvula y prender la bomba
+ESPERA_VALVULA_SEG = 0.5
+
+
+def caudales_valvulas(caudal_bomba_lpm: float, caudales_lpm: Dict[str, float]) -> Dict[str, float]:
+    # Cada valvula deja pasar su propio caudal; si entre todas piden mas de lo
+    # que da la bomba, el caudal de la bomba se reparte en proporcion
+    total = sum(caudales_lpm.values())
+    if total <= 0:
+        return {nombre: 0.0 for nombre in caudales_lpm}
+
+    factor = min(1.0, caudal_bomba_lpm / total)
+    return {nombre: caudal * factor for nombre, caudal in caudales_lpm.items()}
+
+
+class MaquinaRiego:
+    # Riego por temporizadores: valvulas abiertas -> bomba prendida -> bomba
+    # apagada (drenaje) -> valvulas cerradas. No duerme: avanzar() hace las
+    # transiciones vencidas y devuelve cuanto falta para la proxima, asi el
+    # resto del control sigue corriendo mientras se riega.
+    #
+    # Con bomba.caudal_lpm y el caudal de cada valvula se riegan varias
+    # macetas a la vez (hasta bomba.max_valvulas_abiertas). tiempo_riego_seg
+    # es el tiempo con la maceta sola, asi que cada una recibe el volumen que
+    # recibiria sola: si la bomba no alcanza para todas, su riego se alarga.
+    # Sin caudales configurados se riega de a una, como antes.
+    def __init__(self, config, hw, reloj=None):
+        self.config = config
+        self.hw = hw
+        self.reloj = reloj or RelojSistema()
+        self.cola: Deque[MacetaConfig] = deque()
+        self.activas: Dict[str, MacetaConfig] = {}
+        self.restante_l: Dict[str, float] = {}
+        # Volumen que le faltaba a un riego cortado por un reinicio
+        self._reanudar_l: Dict[str, float] = {}
+        self.estado = REPOSO
+        self.plazo = 0.0
+        self._ultimo_bombeo = 0.0
+        self.riegos = 0
+        self.volumen_l = 0.0
+
+        bomba = config.bomba
+        self.paralelo = bomba.caudal_lpm > 0 and all(
+            maceta.caudal_valvula_lpm > 0 for maceta in config.macetas.values() if maceta.enabled
+        )
+        self.max_valvulas = bomba.max_valvulas_abiertas if self.paralelo else 1
+        self.caudal_bomba_lpm = bomba.caudal_lpm if self.paralelo else 1.0
+
+    @property
+    def activa(self) -> bool:
+        return self.estado != REPOSO or bool(self.cola)
+
+    def _caudal_valvula(self, maceta: MacetaConfig) -> float:
+        return maceta.caudal_valvula_lpm if self.paralelo else 1.0
+
+    def solicitar(self, maceta: MacetaConfig) -> bool:
+        # Una maceta que ya se esta regando o esta en cola no se repite
+        if maceta.nombre in self.activas or any(m.nombre == maceta.nombre for m in self.cola):
+            return False
+
+        self.cola.append(maceta)
+        return True
+
+    def avanzar(self) -> Optional[float]:
+        # Devuelve los segundos hasta la proxima transicion o None si no hay riego
+        while self.activa:
+            ahora = self.reloj.monotonic()
+
+            if self.estado == REPOSO:
+                self._abrir_tanda()
+                continue
+
+            if self.estado == BOMBEANDO:
+                self._descontar_volumen(ahora)
+                if not self._cerrar_terminadas():
+                    self.hw.set_bomba(False)
+                    self._pasar(DRENANDO, self.config.global_config.delay_post_bomba_seg)
+                    continue
+                self.plazo = ahora + self._segundos_para_proxima_terminada()
+
+            if ahora < self.plazo:
+                return self.plazo - ahora
+
+            if self.estado == VALVULA_ABIERTA:
+                self.hw.set_bomba(True)
+                self._ultimo_bombeo = self.reloj.monotonic()
+                self.estado = BOMBEANDO
+            elif self.estado == DRENANDO:
+                with self.hw.lote_salidas():
+                    for maceta in self.activas.values():
+                        self.hw.set_valvula_maceta(maceta, False)
+                self._terminar(list(self.activas))
+                self.estado = REPOSO
+
+        return None
+
+    def _abrir_tanda(self) -> None:
+        tanda = []
+        while self.cola and len(tanda) < self.max_valvulas:
+            tanda.append(self.cola.popleft())
+
+        print(f"\nRegando {', '.join(maceta.nombre for maceta in tanda)}")
+
+        with self.hw.lote_salidas():
+            for maceta in tanda:
+                # Volumen que entregaria la maceta regando sola
+                caudal_solo = min(self._caudal_valvula(maceta), self.caudal_bomba_lpm)
+                self.activas[maceta.nombre] = maceta
+                volumen = caudal_solo * maceta.tiempo_riego_seg / 60
+                self.restante_l[maceta.nombre] = min(volumen, self._reanudar_l.pop(maceta.nombre, volumen))
+                self.hw.set_valvula_maceta(maceta, True)
+
+        self._pasar(VALVULA_ABIERTA, ESPERA_VALVULA_SEG)
+
+    def _caudales_actuales(self) -> Dict[str, float]:
+        return caudales_valvulas(
+            self.caudal_bomba_lpm,
+            {nombre: self._caudal_valvula(maceta) for nombre, maceta in self.activas.items()}
+        )
+
+    def _descontar_volumen(self, ahora: float) -> None:
+        transcurrido = ahora - self._ultimo_bombeo
+        self._ultimo_bombeo = ahora
+
+        for nombre, caudal in self._caudales_actuales().items():
+            self.restante_l[nombre] -= caudal * transcurrido / 60
+
+    def _cerrar_terminadas(self) -> bool:
+        # Cierra las valvulas que ya recibieron su volumen mientras queden otras
+        # regando; devuelve False si ya terminaron todas (la ultima se cierra
+        # despues de apagar la bomba y drenar)
+        terminadas = [nombre for nombre, restante in self.restante_l.items() if restante <= 1e-9]
+        if len(terminadas) == len(self.activas):
+            return False
+
+        if terminadas:
+            with self.hw.lote_salidas():
+                for nombre in terminadas:
+                    self.hw.set_valvula_maceta(self.activas[nombre], False)
+            self._terminar(terminadas)
+
+        return True
+
+    def _segundos_para_proxima_terminada(self) -> float:
+        caudales = self._caudales_actuales()
+        return min(
+            self.restante_l[nombre] / caudales[nombre] * 60 if caudales[nombre] > 0 else float("inf")
+            for nombre in self.activas
+        )
+
+    def _terminar(self, nombres: List[str]) -> None:
+        for nombre in nombres:
+            maceta = self.activas.pop(nombre)
+            self.restante_l.pop(nombre)
+            self.riegos += 1
+            if self.paralelo:
+                self.volumen_l += min(maceta.caudal_valvula_lpm, self.caudal_bomba_lpm) * maceta.tiempo_riego_seg / 60
+
+    def _pasar(self, estado: str, duracion_seg: float) -> None:
+        # El plazo se cuenta desde la transicion real para no acortar el bombeo
+        # si el tick llego tarde
+        self.estado = estado
+        self.plazo = self.reloj.monotonic() + duracion_seg
+
+    def pendientes(self) -> Dict[str, Optional[float]]:
+        # Macetas con riego sin terminar y el volumen que les falta (None si
+        # todavia no empezaron), para retomarlo despues de un reinicio
+        if self.estado == BOMBEANDO:
+            self._descontar_volumen(self.reloj.monotonic())
+
+        pendientes: Dict[str, Optional[float]] = {
+            nombre: restante for nombre, restante in self.restante_l.items() if restante > 1e-9
+        }
+        for maceta in self.cola:
+            pendientes[maceta.nombre] = self._reanudar_l.get(maceta.nombre)
+        return pendientes
+
+    def reanudar(self, pendientes: Dict[str, Optional[float]], macetas: Dict[str, MacetaConfig]) -> None:
+        for nombre, restante in pendientes.items():
+            if nombre not in macetas or not self.solicitar(macetas[nombre]):
+                continue
+            if restante is not None:
+                self._reanudar_l[nombre] = restante
+
+    def cancelar(self) -> None:
+        # Corta el riego en curso y vacia la cola: primero la bomba, despues las valvulas
+        if self.activas:
+            self.hw.set_bomba(False)
+            with self.hw.lote_salidas():
+                for maceta in self.activas.values():
+                    self.hw.set_valvula_maceta(maceta, False)
+
+        self.cola.clear()
+        self.activas.clear()
+        self.restante_l.clear()
+        self._reanudar_l.clear()
+        self.estado = REPOSO
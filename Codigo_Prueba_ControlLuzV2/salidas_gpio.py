@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class RegistroSalidas:
+    # Registro sombra de las salidas: guarda el ultimo nivel mandado a cada pin
+    # y solo escribe cuando cambia. Dentro de lote() los cambios se acumulan y
+    # se mandan todos juntos en una sola escritura al salir del bloque.
+    def __init__(self, escribir: Callable[[List[Any], List[Any]], None]):
+        self.escribir = escribir
+        self.niveles: Dict[Any, Any] = {}
+        self.nombres: Dict[Any, str] = {}
+        self.transiciones: Dict[Any, int] = {}
+        self.escrituras = 0
+        self.escrituras_evitadas = 0
+        self.escrituras_bloqueadas = 0
+        self.congelado = False
+        self._pendientes: Dict[Any, Any] = {}
+        self._profundidad_lote = 0
+        self._lock = threading.RLock()
+
+    def configurar(self, pin: Any, nivel: Any, nombre: str = "") -> None:
+        # Nivel inicial: se escribe siempre y no cuenta como transicion
+        with self._lock:
+            self.escribir([pin], [nivel])
+            self.escrituras += 1
+            self.niveles[pin] = nivel
+            self.nombres[pin] = nombre or str(pin)
+            self.transiciones.setdefault(pin, 0)
+
+    def fijar(self, pin: Any, nivel: Any) -> None:
+        with self._lock:
+            if self.congelado:
+                self.escrituras_bloqueadas += 1
+                return
+
+            if self._profundidad_lote:
+                self._pendientes[pin] = nivel
+            else:
+                self._aplicar({pin: nivel})
+
+    @contextmanager
+    def lote(self) -> Iterator[None]:
+        with self._lock:
+            self._profundidad_lote += 1
+            try:
+                yield
+            finally:
+                self._profundidad_lote -= 1
+                if self._profundidad_lote == 0:
+                    pendientes, self._pendientes = self._pendientes, {}
+                    self._aplicar(pendientes)
+
+    @contextmanager
+    def congelar(self) -> Iterator[None]:
+        # Lo que se fija dentro del bloque se escribe y despues las salidas
+        # quedan fijas: se ignora todo fijar() hasta reiniciar (parada de emergencia)
+        with self._lock:
+            with self.lote():
+                yield
+            self.congelado = True
+
+    def _aplicar(self, niveles: Dict[Any, Any]) -> None:
+        cambios = {pin: nivel for pin, nivel in niveles.items() if self.niveles.get(pin) != nivel}
+        self.escrituras_evitadas += len(niveles) - len(cambios)
+
+        if not cambios:
+            return
+
+        self.escribir(list(cambios), list(cambios.values()))
+        self.escrituras += 1
+
+        for pin, nivel in cambios.items():
+            if pin in self.niveles:
+                self.transiciones[pin] = self.transiciones.get(pin, 0) + 1
+            self.niveles[pin] = nivel
+
+    def resumen(self) -> str:
+        with self._lock:
+            lineas = [
+                f"Salidas: {self.escrituras} escrituras, "
+                f"{self.escrituras_evitadas} evitadas por no haber cambio"
+            ]
+            if self.congelado:
+                lineas.append(f"Salidas congeladas: {self.escrituras_bloqueadas} escrituras bloqueadas")
+            for pin, cantidad in self.transiciones.items():
+                lineas.append(f" - {self.nombres.get(pin, str(pin)):<18} {cantidad} transiciones")
+            return "\n".join(lineas)
@@ -0,0 +1,64 @@
+import signal
+import threading
+from typing import Callable, Dict, List, Optional
+
+SENALES_SALIDA = (signal.SIGTERM, signal.SIGINT)
+SENALES_RECARGA = (signal.SIGHUP,) if hasattr(signal, "SIGHUP") else ()
+
+
+class ControlSenales:
+    # SIGTERM (systemd) y SIGINT terminan el programa, SIGHUP recarga el
+    # config.toml. Los handlers solo levantan un evento: las esperas de los
+    # planificadores duermen sobre el y se despiertan enseguida, aunque el
+    # intervalo sea de una hora. evento_salida solo se levanta al terminar:
+    # corta las esperas que una recarga deja seguir (el riego en curso).
+    def __init__(self):
+        self.evento = threading.Event()
+        self.evento_salida = threading.Event()
+        self.salir = False
+        self.recargar = False
+        self.avisos: List[Callable[[], None]] = []
+        self._anteriores: Dict[int, object] = {}
+
+    def instalar(self) -> None:
+        # signal.signal solo se puede llamar desde el hilo principal
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        for senal in SENALES_SALIDA + SENALES_RECARGA:
+            self._anteriores[senal] = signal.signal(senal, self._manejar)
+
+    def instalar_async(self, loop) -> None:
+        # En asyncio el handler tiene que pasar por el loop para despertarlo
+        for senal in SENALES_SALIDA + SENALES_RECARGA:
+            loop.add_signal_handler(senal, self._manejar, senal, None)
+
+    def restaurar(self, loop=None) -> None:
+        for senal, anterior in self._anteriores.items():
+            signal.signal(senal, anterior)
+        self._anteriores.clear()
+
+        if loop is not None:
+            for senal in SENALES_SALIDA + SENALES_RECARGA:
+                loop.remove_signal_handler(senal)
+
+    def al_recibir(self, aviso: Callable[[], None]) -> None:
+        self.avisos.append(aviso)
+
+    def _manejar(self, senal: int, frame: Optional[object]) -> None:
+        if senal in SENALES_RECARGA:
+            self.recargar = True
+        else:
+            self.salir = True
+            self.evento_salida.set()
+
+        self.evento.set()
+        for aviso in self.avisos:
+            aviso()
+
+    def reiniciar(self) -> None:
+        # Despues de una recarga se vuelve a esperar desde cero
+        self.recargar = False
+        self.avisos.clear()
+        if not self.salir:
+            self.evento.clear()
@@ -0,0 +1,546 @@
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lectura_adc import (
+    leer_canal_pcf8591,
+    leer_rafaga_pcf8591,
+    muestrear_canal,
+    parametros_muestreo,
+    resumir_canales,
+)
+from disyuntor import RegistroDisyuntores, claves_dispositivos_maceta
+from models import EstadoDisyuntor, MacetaConfig, MuestreoADC, SystemConfig
+from reloj import RelojSistema
+from salidas_gpio import RegistroSalidas
+
+# Bus a 100 kHz: 9 bits por byte (8 de datos + ACK)
+SEGUNDOS_POR_BYTE_I2C = 9 / 100_000
+# Lo que tarda en fallar una transaccion con un dispositivo que no responde
+TIMEOUT_I2C_SEG = 0.1
+
+
+class PCF8591Simulado:
+    # picos: probabilidad de que una conversion salga cualquier cosa (contacto flojo)
+    def __init__(self, valores: List[int], ruido: float = 0.0, semilla: Optional[int] = None, picos: float = 0.0):
+        self.valores = list(valores)
+        self.ruido = ruido
+        self.picos = picos
+        self.random = random.Random(semilla)
+        self.control = 0
+        self.canal = 0
+        self.ultima_conversion = 0x80
+
+    def escribir(self, datos: bytes) -> None:
+        if not datos:
+            return
+
+        self.control = datos[0]
+        self.canal = self.control & 0x03
+
+    def leer(self, cantidad: int) -> bytes:
+        # Cada byte transmitido es la conversion anterior; mientras se transmite
+        # se convierte el canal actual
+        salida = bytearray()
+
+        for _i in range(cantidad):
+            salida.append(self.ultima_conversion)
+            self.ultima_conversion = self._convertir(self.canal)
+
+            if self.control & 0x04:
+                self.canal = (self.canal + 1) % 4
+
+        return bytes(salida)
+
+    def _convertir(self, canal: int) -> int:
+        if self.picos and self.random.random() < self.picos:
+            return self.random.randrange(256)
+
+        valor = self.valores[canal] + self.random.gauss(0, self.ruido)
+        return max(0, min(255, int(round(valor))))
+
+
+class AnalogInSimulado:
+    # Mismo comportamiento que adafruit_pcf8591.analog_in.AnalogIn sobre el bus simulado
+    def __init__(self, bus, direccion: int, canal: int):
+        self.bus = bus
+        self.direccion = direccion
+        self.canal = canal
+
+    @property
+    def value(self) -> int:
+        return leer_canal_pcf8591(self.bus, self.direccion, self.canal) << 8
+
+
+class BusI2CSimulado:
+    def __init__(
+        self,
+        dispositivos: Dict[int, Any],
+        segundos_por_byte: float = SEGUNDOS_POR_BYTE_I2C,
+        dormir: Callable[[float], None] = time.sleep
+    ):
+        self.dispositivos = dispositivos
+        self.segundos_por_byte = segundos_por_byte
+        self.dormir = dormir
+        self.transacciones = 0
+        self.bytes_transferidos = 0
+        self._lock = threading.Lock()
+
+    def try_lock(self) -> bool:
+        return self._lock.acquire(blocking=False)
+
+    def unlock(self) -> None:
+        self._lock.release()
+
+    def writeto(self, direccion: int, buffer, *, start: int = 0, end: Optional[int] = None) -> None:
+        datos = bytes(buffer[start:end])
+        self._dispositivo(direccion).escribir(datos)
+        self._transaccion(len(datos))
+
+    def readfrom_into(self, direccion: int, buffer, *, start: int = 0, end: Optional[int] = None) -> None:
+        if end is None:
+            end = len(buffer)
+
+        datos = self._dispositivo(direccion).leer(end - start)
+        buffer[start:end] = datos
+        self._transaccion(len(datos))
+
+    def writeto_then_readfrom(
+        self,
+        direccion: int,
+        buffer_out,
+        buffer_in,
+        *,
+        out_start: int = 0,
+        out_end: Optional[int] = None,
+        in_start: int = 0,
+        in_end: Optional[int] = None
+    ) -> None:
+        self.writeto(direccion, buffer_out, start=out_start, end=out_end)
+        self.readfrom_into(direccion, buffer_in, start=in_start, end=in_end)
+
+    def _dispositivo(self, direccion: int):
+        dispositivo = self.dispositivos.get(direccion)
+        if dispositivo is None:
+            raise OSError(f"Sin ACK en la direccion I2C {hex(direccion)}")
+        return dispositivo
+
+    def _transaccion(self, cantidad_bytes: int) -> None:
+        # Se cuenta tambien el byte de direccion
+        self.transacciones += 1
+        self.bytes_transferidos += cantidad_bytes + 1
+        self.dormir((cantidad_bytes + 1) * self.segundos_por_byte)
+
+
+@dataclass
+class EstadisticaLlamadas:
+    llamadas: int = 0
+    fallos: int = 0
+    tiempo_seg: float = 0.0     # tiempo simulado total que ocuparon las llamadas
+
+
+class SimulatedHardwareManager:
+    # Mismos metodos publicos que HardwareManager, sin GPIO ni drivers.
+    # Todas las esperas pasan por el reloj (normalmente un RelojVirtual), cada
+    # llamada tiene un modelo de latencia (media + jitter) y una tasa de fallos.
+    # Cada dispositivo tiene su propio generador, sembrado con la semilla y su
+    # nombre: lo que sale de uno no depende del orden en que los hilos leen los
+    # demas. Los ADC se simulan a nivel de bus I2C.
+    def __init__(self, config: SystemConfig, reloj=None, lux_pico: float = 20000.0):
+        self.config = config
+        self.reloj = reloj or RelojSistema()
+        self._generadores: Dict[str, random.Random] = {}
+        self.i2c = None
+        self.adcs: Dict[str, Any] = {}
+        self.bh1750: Dict[str, Any] = {}
+        self.dht: Dict[str, Any] = {}
+        self.bus_lock = threading.Lock()
+        self.adc_locks: Dict[str, threading.Lock] = {}
+        self.canales_adc: Dict[Tuple[str, int], Any] = {}
+        self.ultimo_canal_adc: Dict[str, Optional[int]] = {}
+
+        self.latencia_seg = config.simulacion.latencia_seg
+        self.jitter_seg = config.simulacion.jitter_seg
+        self.tasa_fallo = config.simulacion.tasa_fallo
+        self.estadisticas: Dict[str, EstadisticaLlamadas] = {}
+        self._lock_estadisticas = threading.Lock()
+        self._local = threading.local()
+
+        # Modelo de planta: el suelo se seca con el tiempo y se moja al regar
+        self.lux_pico = lux_pico
+        self.secado_raw_por_hora = 2.0
+        self.riego_raw_por_seg = 1.5
+        self.raw_suelo: Dict[str, float] = {}
+        self._ultima_actualizacion: Optional[float] = None
+
+        # Estado logico de cada salida ("bomba", "maceta1.luz", ...) y su historial
+        self.salidas: Dict[str, bool] = {}
+        self.eventos: List[Tuple[float, str, bool]] = []
+        self.registro_salidas = RegistroSalidas(self._escribir_salidas)
+
+        # Dispositivos I2C que no responden ("adc.adc1", "bh1750.maceta1", ...)
+        self.desconectados = set()
+        self.disyuntores = RegistroDisyuntores(config.disyuntores, self.reloj)
+
+        # Pulsador de parada de emergencia
+        self._callback_parada: Optional[Callable[[float], None]] = None
+        self._cancelar_parada = threading.Event()
+
+    def inicializar(self) -> None:
+        dispositivos = {}
+
+        if self.config.i2c.enabled:
+            for nombre_adc, adc_cfg in self.config.adcs.items():
+                if not adc_cfg.enabled:
+                    continue
+
+                dispositivos[adc_cfg.direccion] = PCF8591Simulado(
+                    [self.config.global_config.raw_mojado] * 4,
+                    ruido=1.0,
+                    semilla=self._azar(f"pcf8591.{nombre_adc}").randrange(2 ** 32)
+                )
+                self.adcs[nombre_adc] = adc_cfg.direccion
+                self.adc_locks[nombre_adc] = threading.Lock()
+                self.disyuntores.agregar(f"adc.{nombre_adc}", f"adc.{nombre_adc}" not in self.desconectados)
+
+            self.i2c = BusI2CSimulado(dispositivos, dormir=self._dormir)
+
+        for nombre_maceta, maceta in self.config.macetas.items():
+            if not maceta.enabled:
+                continue
+
+            # Se arranca a mitad de camino entre seco y mojado
+            g = self.config.global_config
+            self.raw_suelo[nombre_maceta] = (g.raw_seco + g.raw_mojado) / 2
+
+            if maceta.bh1750.enabled and self.i2c is not None:
+                self.bh1750[nombre_maceta] = maceta.bh1750.direccion
+                clave = f"bh1750.{nombre_maceta}"
+                self.disyuntores.agregar(clave, clave not in self.desconectados)
+
+            if maceta.dht.enabled:
+                self.dht[nombre_maceta] = maceta.dht.gpio
+
+        self._ultima_actualizacion = self.reloj.monotonic()
+        self._actualizar_planta()
+        self.apagar_todo()
+
+    def _dormir(self, segundos: float) -> None:
+        self._local.tiempo = getattr(self._local, "tiempo", 0.0) + segundos
+        self.reloj.sleep(segundos)
+
+    def _azar(self, dispositivo: str) -> random.Random:
+        with self._lock_estadisticas:
+            if dispositivo not in self._generadores:
+                self._generadores[dispositivo] = random.Random(f"{self.config.simulacion.semilla}:{dispositivo}")
+            return self._generadores[dispositivo]
+
+    def _tiempo_hilo(self) -> float:
+        return getattr(self._local, "tiempo", 0.0)
+
+    def _registrar(self, nombre: str, inicio: float, fallo: bool) -> None:
+        with self._lock_estadisticas:
+            estadistica = self.estadisticas.setdefault(nombre, EstadisticaLlamadas())
+            estadistica.llamadas += 1
+            estadistica.fallos += int(fallo)
+            estadistica.tiempo_seg += self._tiempo_hilo() - inicio
+
+    def desconectar(self, dispositivo: str) -> None:
+        self.desconectados.add(dispositivo)
+
+    def conectar(self, dispositivo: str) -> None:
+        self.desconectados.discard(dispositivo)
+
+    def _reinicializar(self, dispositivo: str) -> None:
+        if dispositivo in self.desconectados:
+            self._dormir(TIMEOUT_I2C_SEG)
+            raise OSError(f"{dispositivo} no responde")
+
+    def _disponible(self, dispositivo: str) -> bool:
+        return self.disyuntores.disponible(dispositivo, lambda: self._reinicializar(dispositivo))
+
+    def _simular_llamada(self, nombre: str, dispositivo: str, conexion: bool = True) -> bool:
+        # Espera la latencia modelada y devuelve False si la llamada falla.
+        # conexion: la llamada toca el bus y falla si el dispositivo no responde.
+        if conexion and dispositivo in self.desconectados:
+            self._dormir(TIMEOUT_I2C_SEG)
+            return False
+
+        azar = self._azar(dispositivo)
+        media = self.latencia_seg.get(nombre, 0.0)
+        jitter = self.jitter_seg.get(nombre, 0.0)
+        latencia = max(0.0, azar.gauss(media, jitter)) if jitter > 0 else media
+
+        if latencia > 0:
+            self._dormir(latencia)
+
+        return azar.random() >= self.tasa_fallo.get(nombre, 0.0)
+
+    def _actualizar_planta(self) -> None:
+        ahora = self.reloj.monotonic()
+        dt = ahora - self._ultima_actualizacion
+        self._ultima_actualizacion = ahora
+        g = self.config.global_config
+        regando = self.salidas.get("bomba", False)
+
+        for nombre_maceta, raw in self.raw_suelo.items():
+            maceta = self.config.macetas[nombre_maceta]
+
+            if regando and self.salidas.get(f"{maceta.nombre}.valvula", False):
+                raw += math.copysign(self.riego_raw_por_seg * dt, g.raw_mojado - g.raw_seco)
+            else:
+                raw += math.copysign(self.secado_raw_por_hora * dt / 3600, g.raw_seco - g.raw_mojado)
+
+            raw = max(min(g.raw_seco, g.raw_mojado), min(max(g.raw_seco, g.raw_mojado), raw))
+            self.raw_suelo[nombre_maceta] = raw
+
+            for sensor in (maceta.sensor_humedad_1, maceta.sensor_humedad_2):
+                if sensor.enabled and sensor.adc in self.adcs:
+                    self.set_valor_adc(sensor.adc, sensor.canal, int(raw))
+
+    def set_valor_adc(self, adc_nombre: str, canal: int, valor: int) -> None:
+        direccion = self.config.adcs[adc_nombre].direccion
+        self.i2c.dispositivos[direccion].valores[canal] = valor
+
+    def _obtener_canal_adc(self, adc_nombre: str, canal: int):
+        clave = (adc_nombre, canal)
+        if clave not in self.canales_adc:
+            self.canales_adc[clave] = AnalogInSimulado(self.i2c, self.adcs[adc_nombre], canal)
+        return self.canales_adc[clave]
+
+    def _leer_canal(self, adc_nombre: str, canal: int) -> int:
+        canal_adc = self._obtener_canal_adc(adc_nombre, canal)
+        with self.bus_lock:
+            if not self._simular_llamada("leer_valor_canal", f"adc.{adc_nombre}"):
+                raise OSError(f"Fallo simulado en {adc_nombre} canal {canal}")
+
+            self._actualizar_planta()
+            return canal_adc.value
+
+    def leer_valor_canal(self, adc_nombre: str, canal: int) -> int:
+        if not self._disponible(f"adc.{adc_nombre}"):
+            raise ValueError(f"ADC no disponible: {adc_nombre}")
+
+        try:
+            valor = self._leer_canal(adc_nombre, canal)
+        except Exception:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
+            raise
+
+        self.disyuntores.exito(f"adc.{adc_nombre}")
+        return valor
+
+    def leer_humedad(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[MuestreoADC]:
+        if not self._disponible(f"adc.{adc_nombre}"):
+            return None
+
+        inicio = self._tiempo_hilo()
+        muestreo = None
+
+        with self.adc_locks[adc_nombre]:
+            if self._simular_llamada("leer_humedad", f"adc.{adc_nombre}", conexion=False):
+                calentar = self.ultimo_canal_adc.get(adc_nombre) != canal
+                self.ultimo_canal_adc[adc_nombre] = None
+
+                try:
+                    muestreo = muestrear_canal(
+                        lambda: self._leer_canal(adc_nombre, canal),
+                        *parametros_muestreo(self.config.global_config, muestras),
+                        self.config.global_config.agregacion_adc,
+                        calentar,
+                        dormir=self._dormir
+                    )
+                    self.ultimo_canal_adc[adc_nombre] = canal
+                except Exception:
+                    muestreo = None
+
+        if muestreo is None:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
+        else:
+            self.disyuntores.exito(f"adc.{adc_nombre}")
+
+        self._registrar("leer_humedad", inicio, muestreo is None)
+        return muestreo
+
+    def leer_humedad_raw(self, adc_nombre: str, canal: int, muestras: Optional[int] = None) -> Optional[int]:
+        muestreo = self.leer_humedad(adc_nombre, canal, muestras)
+        return None if muestreo is None else muestreo.raw
+
+    def leer_adc_muestreo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[MuestreoADC]]:
+        if not self._disponible(f"adc.{adc_nombre}"):
+            return None
+
+        direccion = self.adcs[adc_nombre]
+        inicio = self._tiempo_hilo()
+        vector = None
+        cantidad = muestras or self.config.global_config.muestras_max_adc
+
+        with self.adc_locks[adc_nombre], self.bus_lock:
+            self.ultimo_canal_adc[adc_nombre] = None
+
+            if self._simular_llamada("leer_adc_muestreo", f"adc.{adc_nombre}"):
+                self._actualizar_planta()
+                vector = resumir_canales(
+                    leer_rafaga_pcf8591(self.i2c, direccion, cantidad),
+                    self.config.global_config.agregacion_adc
+                )
+
+        if vector is None:
+            self.disyuntores.fallo(f"adc.{adc_nombre}")
+        else:
+            self.disyuntores.exito(f"adc.{adc_nombre}")
+
+        self._registrar("leer_adc_muestreo", inicio, vector is None)
+        return vector
+
+    def leer_adc_completo(self, adc_nombre: str, muestras: Optional[int] = None) -> Optional[List[int]]:
+        vector = self.leer_adc_muestreo(adc_nombre, muestras)
+        return None if vector is None else [muestreo.raw for muestreo in vector]
+
+    def leer_lux(self, nombre_maceta: str) -> Optional[float]:
+        clave = f"bh1750.{nombre_maceta}"
+        if not self._disponible(clave):
+            return None
+
+        inicio = self._tiempo_hilo()
+        lux = None
+
+        with self.bus_lock:
+            if self._simular_llamada("leer_lux", clave):
+                # Dia de 7 a 19 h con el maximo al mediodia
+                ahora = self.reloj.now()
+                hora = ahora.hour + ahora.minute / 60
+                if 7 <= hora < 19:
+                    lux = self.lux_pico * math.sin(math.pi * (hora - 7) / 12)
+                else:
+                    lux = 0.0
+
+        if lux is None:
+            self.disyuntores.fallo(clave)
+        else:
+            self.disyuntores.exito(clave)
+
+        self._registrar("leer_lux", inicio, lux is None)
+        return lux
+
+    def estados_disyuntores(self, maceta: MacetaConfig) -> List[EstadoDisyuntor]:
+        return self.disyuntores.estados(claves_dispositivos_maceta(maceta))
+
+    def leer_dht(self, nombre_maceta: str) -> Tuple[Optional[float], Optional[float]]:
+        if nombre_maceta not in self.dht:
+            return None, None
+
+        inicio = self._tiempo_hilo()
+        temperatura_c, humedad_ambiente_pct = None, None
+
+        dispositivo = f"dht.{nombre_maceta}"
+        if self._simular_llamada("leer_dht", dispositivo, conexion=False):
+            temperatura_c = round(self._azar(dispositivo).gauss(24.0, 0.3), 1)
+            humedad_ambiente_pct = round(self._azar(dispositivo).gauss(60.0, 1.0), 1)
+
+        self._registrar("leer_dht", inicio, temperatura_c is None)
+        return temperatura_c, humedad_ambiente_pct
+
+    def _escribir_salidas(self, nombres: List[str], valores: List[bool]) -> None:
+        # Equivale a un GPIO.output: el suelo se actualiza hasta este instante
+        # con el estado anterior de bomba y valvulas
+        if self.raw_suelo:
+            self._actualizar_planta()
+
+        ahora = self.reloj.monotonic()
+        for nombre, valor in zip(nombres, valores):
+            self.salidas[nombre] = valor
+            self.eventos.append((ahora, nombre, valor))
+
+    def _set_salida(self, nombre: str, valor: bool) -> None:
+        self.registro_salidas.fijar(nombre, valor)
+
+    @contextmanager
+    def lote_salidas(self):
+        with self.registro_salidas.lote():
+            yield
+
+    def set_bomba(self, encendida: bool) -> None:
+        if not self.config.bomba.enabled:
+            return
+
+        self._set_salida("bomba", encendida)
+
+    def set_luz_maceta(self, maceta: MacetaConfig, encendida: bool) -> None:
+        if not maceta.luz.enabled:
+            return
+
+        self._set_salida(f"{maceta.nombre}.luz", encendida)
+
+    def set_valvula_maceta(self, maceta: MacetaConfig, abierta: bool) -> None:
+        if not maceta.valvula.enabled:
+            return
+
+        self._set_salida(f"{maceta.nombre}.valvula", abierta)
+
+    def set_ventilador_maceta(self, maceta: MacetaConfig, encendido: bool) -> None:
+        if not maceta.ventilador.enabled:
+            return
+
+        self._set_salida(f"{maceta.nombre}.ventilador", encendido)
+
+    def apagar_todo(self) -> None:
+        with self.lote_salidas():
+            self.set_bomba(False)
+
+            for maceta in self.config.macetas.values():
+                self.set_luz_maceta(maceta, False)
+                self.set_valvula_maceta(maceta, False)
+                self.set_ventilador_maceta(maceta, False)
+
+    def configurar_parada_emergencia(self, callback: Callable[[float], None]) -> None:
+        self._callback_parada = callback
+
+        segundos = self.config.simulacion.parada_emergencia_seg
+        if segundos > 0:
+            threading.Thread(
+                target=self._temporizar_parada,
+                args=(segundos,),
+                name="parada_simulada",
+                daemon=True
+            ).start()
+
+    def _temporizar_parada(self, segundos: float) -> None:
+        # Espera en tiempo simulado: participa para que el reloj no salte el instante
+        with self.reloj.participar():
+            if not self.reloj.esperar(self._cancelar_parada, segundos):
+                self.presionar_parada_emergencia()
+
+    def presionar_parada_emergencia(self) -> None:
+        # Flanco en la entrada: como en RPi.GPIO, el callback corre en otro hilo
+        if self._callback_parada is None:
+            return
+
+        instante = time.perf_counter()
+        threading.Thread(
+            target=self._callback_parada,
+            args=(instante,),
+            name="gpio_evento",
+            daemon=True
+        ).start()
+
+    def parada_emergencia(self) -> None:
+        with self.registro_salidas.congelar():
+            self.apagar_todo()
+
+    def cleanup(self) -> None:
+        self._cancelar_parada.set()
+
+    def imprimir_resumen(self) -> None:
+        print(f"\nSimulacion: {self.reloj.monotonic():.0f} s simulados")
+
+        for nombre, estadistica in sorted(self.estadisticas.items()):
+            media_ms = estadistica.tiempo_seg / estadistica.llamadas * 1000 if estadistica.llamadas else 0.0
+            print(
+                f" - {nombre:<18} {estadistica.llamadas:5d} llamadas | "
+                f"{estadistica.fallos:4d} fallos | {media_ms:7.1f} ms/llamada"
+            )
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models import MacetaEstado
+from registro_binario import EscritorBinario
+from registro_csv import EscritorCSV, agregar_filas_csv
+from registro_sqlite import AlmacenSQLite
+
+
+def archivo_csv(config) -> str:
+    if config.simulacion.enabled:
+        return config.simulacion.archivo_csv
+    return config.global_config.archivo_csv
+
+
+def archivo_binario(config) -> str:
+    if config.simulacion.enabled:
+        return config.simulacion.archivo_binario
+    return config.registro_binario.archivo
+
+
+def archivo_sqlite(config) -> str:
+    if config.simulacion.enabled:
+        return config.simulacion.archivo_sqlite
+    return config.sqlite.archivo
+
+
+class RegistroTelemetria:
+    # Destinos de los estados de cada ciclo: el CSV (con EscritorCSV si
+    # [registro_csv] esta habilitado, si no abriendo el archivo en cada
+    # llamada), la base SQLite y el log binario opcionales
+    def __init__(self, config):
+        self.archivo_csv = archivo_csv(config)
+        self.escritor_csv: Optional[EscritorCSV] = None
+        self.almacen: Optional[AlmacenSQLite] = None
+        self.binario: Optional[EscritorBinario] = None
+
+        if config.registro_csv.enabled:
+            self.escritor_csv = EscritorCSV(self.archivo_csv, config.registro_csv)
+        if config.sqlite.enabled:
+            self.almacen = AlmacenSQLite(
+                archivo_sqlite(config), config.sqlite.resumenes, config.global_config.intervalo_lectura_seg
+            )
+        if config.registro_binario.enabled:
+            self.binario = EscritorBinario(archivo_binario(config))
+
+    def guardar(self, estados: Dict[str, MacetaEstado], ahora: datetime) -> None:
+        if self.escritor_csv is not None:
+            self.escritor_csv.escribir(estados, ahora)
+        else:
+            agregar_filas_csv(self.archivo_csv, estados, ahora)
+
+        if self.almacen is not None:
+            self.almacen.guardar(estados, ahora)
+        if self.binario is not None:
+            self.binario.escribir(estados, ahora)
+
+    def cerrar(self) -> None:
+        # Lo que quedo en el buffer se baja y se hace fsync antes de salir
+        if self.escritor_csv is not None:
+            self.escritor_csv.cerrar()
+        if self.almacen is not None:
+            self.almacen.cerrar()
+        if self.binario is not None:
+            self.binario.cerrar()
+
+    def resumen(self) -> List[str]:
+        return [destino.resumen() for destino in (self.escritor_csv, self.almacen, self.binario) if destino is not None]
@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+from cola_subida import DESCARTAR, ENVIADO, REINTENTAR, ColaSubida, ruta_rechazadas
+from models import ColaSubidaConfig
+
+
+class Servidor:
+    # Hace de ThingSpeak: contesta segun el payload y anota lo aceptado
+    def __init__(self, respuestas=None):
+        self.respuestas = respuestas or {}
+        self.aceptados = []
+
+    def __call__(self, payload, timeout_seg):
+        resultado = self.respuestas.get(payload["x"], ENVIADO)
+        if resultado == ENVIADO:
+            self.aceptados.append(payload["x"])
+        return resultado
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "cola_subida.jsonl")
+
+
+def configuracion(**cambios) -> ColaSubidaConfig:
+    return ColaSubidaConfig(enabled=True, espaciado_seg=0.0, espera_max_seg=0.01, **cambios)
+
+
+def esperar_vacia(cola: ColaSubida, timeout_seg: float = 5.0) -> None:
+    limite = time.monotonic() + timeout_seg
+    while cola.pendientes and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert not cola.pendientes
+
+
+def test_lo_encolado_se_reenvia_en_orden_despues_de_reiniciar(ruta):
+    # Sin red: se encola y se apaga sin haber enviado nada
+    cola = ColaSubida(ruta, configuracion(), Servidor())
+    for x in range(5):
+        cola.encolar({"x": x})
+    cola.detener()
+
+    servidor = Servidor()
+    cola = ColaSubida(ruta, configuracion(), servidor)
+    assert cola.pendientes == 5
+    cola.iniciar()
+    esperar_vacia(cola)
+    cola.detener()
+
+    assert servidor.aceptados == [0, 1, 2, 3, 4]
+    # Lo confirmado no se vuelve a enviar
+    assert ColaSubida(ruta, configuracion(), Servidor()).pendientes == 0
+
+
+def test_compacta_lo_ya_enviado(ruta):
+    servidor = Servidor({3: REINTENTAR, 4: REINTENTAR})
+    cola = ColaSubida(ruta, configuracion(compactar_bytes=1), servidor)
+    for x in range(5):
+        cola.encolar({"x": x})
+    cola.iniciar()
+
+    limite = time.monotonic() + 5.0
+    while (cola.pendientes > 2 or not cola.compactaciones) and time.monotonic() < limite:
+        time.sleep(0.01)
+    cola.detener()
+
+    # Solo quedan en el archivo las dos entradas sin enviar
+    with open(ruta, encoding="utf-8") as f:
+        assert [json.loads(linea)["payload"]["x"] for linea in f] == [3, 4]
+    assert servidor.aceptados == [0, 1, 2]
+
+    servidor = Servidor()
+    cola = ColaSubida(ruta, configuracion(), servidor)
+    cola.iniciar()
+    esperar_vacia(cola)
+    cola.detener()
+    assert servidor.aceptados == [3, 4]
+
+
+def test_un_rechazo_permanente_no_traba_la_cola(ruta):
+    # Regresion: un 4xx se reintentaba para siempre y frenaba lo que venia detras
+    servidor = Servidor({1: DESCARTAR})
+    cola = ColaSubida(ruta, configuracion(), servidor)
+    for x in range(3):
+        cola.encolar({"x": x})
+    cola.iniciar()
+    esperar_vacia(cola)
+    cola.detener()
+
+    assert servidor.aceptados == [0, 2]
+    assert cola.rechazadas == 1
+    with open(ruta_rechazadas(ruta), encoding="utf-8") as f:
+        assert [json.loads(linea)["payload"] for linea in f] == [{"x": 1}]
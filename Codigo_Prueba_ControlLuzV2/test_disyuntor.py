@@ -0,0 +1,83 @@
+from disyuntor import ABIERTO, CERRADO, SEMIABIERTO, Disyuntor, RegistroDisyuntores
+from models import DisyuntorConfig
+
+
+class RelojManual:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+
+def disyuntor():
+    reloj = RelojManual()
+    config = DisyuntorConfig(fallos_para_abrir=3, espera_inicial_seg=30.0, espera_max_seg=100.0)
+    return Disyuntor(config, reloj), reloj
+
+
+def test_abre_despues_de_fallos_seguidos():
+    d, _ = disyuntor()
+    d.registrar_fallo()
+    d.registrar_fallo()
+    d.registrar_exito()
+    d.registrar_fallo()
+    d.registrar_fallo()
+    assert d.estado == CERRADO and d.permitir()
+
+    d.registrar_fallo()
+    assert d.estado == ABIERTO
+    assert not d.permitir()
+    assert d.segundos_para_reintento() == 30.0
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba():
+    d, reloj = disyuntor()
+    for _ in range(3):
+        d.registrar_fallo()
+
+    reloj.t = 30.0
+    assert d.permitir()
+    assert d.estado == SEMIABIERTO
+    assert not d.permitir()
+
+    d.registrar_exito()
+    assert d.estado == CERRADO
+    assert d.fallos_consecutivos == 0
+    assert d.espera_seg == 30.0
+
+
+def test_prueba_fallida_reabre_con_el_doble_de_espera_hasta_el_maximo():
+    d, reloj = disyuntor()
+    for _ in range(3):
+        d.registrar_fallo()
+
+    esperas = []
+    for _ in range(3):
+        reloj.t = d.proximo_intento
+        assert d.permitir()
+        d.registrar_fallo()
+        assert d.estado == ABIERTO
+        esperas.append(d.segundos_para_reintento())
+
+    assert esperas == [60.0, 100.0, 100.0]
+
+
+def test_registro_reinicializa_el_dispositivo_en_la_prueba():
+    reloj = RelojManual()
+    registro = RegistroDisyuntores(DisyuntorConfig(espera_inicial_seg=10.0), reloj)
+    # Fallo en el arranque: abierto de entrada
+    registro.agregar("bh1750.maceta1", disponible=False)
+    reinicios = []
+
+    assert not registro.disponible("bh1750.maceta1", lambda: reinicios.append(reloj.t))
+    assert [e.estado for e in registro.estados(["bh1750.maceta1"])] == [ABIERTO]
+
+    reloj.t = 10.0
+    assert registro.disponible("bh1750.maceta1", lambda: reinicios.append(reloj.t))
+    registro.exito("bh1750.maceta1")
+
+    assert reinicios == [10.0]
+    assert registro.estados(["bh1750.maceta1"]) == []
+    # Una clave desconocida nunca esta disponible
+    assert not registro.disponible("adc.adc9")
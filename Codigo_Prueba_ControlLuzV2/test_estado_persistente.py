@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from control import incremento_dli
+from estado_persistente import EstadoControlador
+from models import MacetaEstado, SystemState
+
+
+class RelojManual:
+    def __init__(self, inicio: datetime):
+        self.actual = inicio
+
+    def time(self) -> float:
+        return self.actual.timestamp()
+
+    def now(self) -> datetime:
+        return self.actual
+
+
+@pytest.fixture
+def config(config_simulada):
+    config_simulada.estado_persistente.enabled = True
+    config_simulada.tareas.enabled = False
+    return config_simulada
+
+
+def estado_con_luz(config, lux: float) -> SystemState:
+    estado = SystemState(macetas={nombre: MacetaEstado() for nombre in config.macetas})
+    for estado_maceta in estado.macetas.values():
+        estado_maceta.lux = lux
+        estado_maceta.luz_encendida = True
+    return estado
+
+
+def restaurar(config, reloj):
+    estado = SystemState(macetas={nombre: MacetaEstado() for nombre in config.macetas})
+    dli = {nombre: 0.0 for nombre in config.macetas}
+    controlador = EstadoControlador(config, reloj)
+    assert controlador.restaurar(estado, dli, None)
+    return controlador, estado, dli
+
+
+def test_ida_y_vuelta_del_checkpoint(config):
+    reloj = RelojManual(datetime(2026, 10, 18, 12, 0, 0))
+    estado = estado_con_luz(config, 800.0)
+    estado.macetas["maceta1"].ventilador_encendido = True
+
+    EstadoControlador(config, reloj).guardar(
+        estado, {"maceta1": 5.0, "maceta2": 2.0}, None, dli_hasta=reloj.now()
+    )
+    _, restaurado, dli = restaurar(config, reloj)
+
+    assert dli == {"maceta1": 5.0, "maceta2": 2.0}
+    assert restaurado.macetas["maceta1"].luz_encendida
+    assert restaurado.macetas["maceta1"].ventilador_encendido
+    assert restaurado.macetas["maceta1"].lux == 800.0
+
+
+def test_apagado_limpio_no_pierde_el_tramo_desde_el_ultimo_control(config):
+    # Regresion: el DLI valia hasta el ultimo control pero se guardaba con la
+    # hora del apagado, y se perdia hasta un intervalo de luz
+    maceta = config.macetas["maceta1"]
+    ultimo_control = datetime(2026, 10, 18, 12, 0, 0)
+    reloj = RelojManual(ultimo_control)
+    estado = estado_con_luz(config, 800.0)
+
+    controlador = EstadoControlador(config, reloj)
+    controlador.guardar(estado, {"maceta1": 5.0, "maceta2": 2.0}, None, dli_hasta=ultimo_control)
+    reloj.actual = ultimo_control + timedelta(minutes=40)
+    controlador.guardar(estado, {"maceta1": 5.0, "maceta2": 2.0}, None, salidas_apagadas=True)
+
+    # Se reinicia enseguida: el foco estuvo prendido los 40 minutos
+    _, restaurado, dli = restaurar(config, reloj)
+
+    assert dli["maceta1"] == pytest.approx(5.0 + incremento_dli(maceta, 800.0, True, 40 * 60))
+    assert not restaurado.macetas["maceta1"].luz_encendida
+
+
+def test_caida_larga_se_extrapola_a_lo_sumo_un_intervalo(config):
+    maceta = config.macetas["maceta1"]
+    intervalo = config.global_config.intervalo_lectura_seg
+    reloj = RelojManual(datetime(2026, 10, 18, 8, 0, 0))
+    estado = estado_con_luz(config, 800.0)
+
+    EstadoControlador(config, reloj).guardar(estado, {"maceta1": 1.0, "maceta2": 0.0}, None, dli_hasta=reloj.now())
+    # Corte de luz sin apagado limpio, de 5 intervalos
+    reloj.actual += timedelta(seconds=5 * intervalo)
+    controlador, restaurado, dli = restaurar(config, reloj)
+
+    assert controlador.extrapolado_seg == intervalo
+    assert dli["maceta1"] == pytest.approx(1.0 + incremento_dli(maceta, 800.0, True, intervalo))
+    assert restaurado.macetas["maceta1"].luz_encendida
+
+
+def test_otro_dia_no_se_restaura(config):
+    reloj = RelojManual(datetime(2026, 10, 18, 23, 0, 0))
+    estado = estado_con_luz(config, 800.0)
+
+    EstadoControlador(config, reloj).guardar(estado, {"maceta1": 9.0, "maceta2": 9.0}, None, dli_hasta=reloj.now())
+    reloj.actual += timedelta(hours=2)
+
+    assert not EstadoControlador(config, reloj).restaurar(estado, {}, None)
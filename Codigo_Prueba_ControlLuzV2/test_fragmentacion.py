@@ -0,0 +1,164 @@
+import os
+import signal
+import time
+from datetime import datetime
+
+import pytest
+
+from fragmentacion import (
+    CoordinadorFragmentos,
+    agrupar_macetas,
+    config_coordinador,
+    config_fragmento,
+    config_hw_fragmento,
+)
+
+
+def test_macetas_con_el_mismo_adc_van_al_mismo_fragmento(config_simulada):
+    fragmentos = agrupar_macetas(config_simulada, 4)
+
+    # maceta1 y maceta2 leen los dos del adc1
+    assert fragmentos == [["maceta1", "maceta2"]]
+
+
+def test_fragmento_decide_riego_pero_no_maneja_valvulas(config_simulada):
+    fragmento = config_fragmento(config_simulada, ["maceta1"])
+    config_hw = config_hw_fragmento(fragmento)
+
+    assert fragmento.macetas["maceta1"].valvula.enabled
+    assert not config_hw.macetas["maceta1"].valvula.enabled
+    assert not fragmento.bomba.enabled
+    assert config_coordinador(config_simulada).macetas["maceta1"].valvula.enabled
+
+
+def test_coordinador_pide_riego_de_maceta_seca(config_simulada):
+    # Regresion: con fragmentacion ninguna maceta se regaba nunca
+    pytest.importorskip("requests")     # lo importa main en cada fragmento
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.procesos = 2
+    coordinador = CoordinadorFragmentos(config_simulada)
+    coordinador.iniciar()
+    try:
+        estados = coordinador.ciclo(60.0, datetime.now(), {})
+    finally:
+        coordinador.detener()
+
+    maceta1 = config_simulada.macetas["maceta1"]
+    estado = estados["maceta1"]
+    # El suelo simulado arranca a mitad de camino, debajo del umbral
+    assert estado.humedad_suelo_promedio_pct < maceta1.umbral_humedad_suelo_pct
+    assert estado.riego_pendiente
+    # maceta2 no tiene valvula
+    assert not estados["maceta2"].riego_pendiente
+
+
+def test_fragmento_caido_no_frena_el_ciclo(config_simulada):
+    # Regresion: un proceso muerto cortaba el ciclo con EOFError y uno
+    # colgado lo bloqueaba para siempre
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.timeout_seg = 5.0
+    coordinador = CoordinadorFragmentos(config_simulada)
+    coordinador.iniciar()
+    try:
+        coordinador.procesos[0].terminate()
+        coordinador.procesos[0].join(5.0)
+        estados = coordinador.ciclo(60.0, datetime.now(), {"maceta1": 3.5})
+        otro = coordinador.ciclo(60.0, datetime.now(), {"maceta1": 3.5})
+    finally:
+        coordinador.detener()
+
+    assert 0 in coordinador.caidos
+    for estados_ciclo in (estados, otro):
+        assert estados_ciclo["maceta1"].humedad_suelo_promedio_pct is None
+        assert not estados_ciclo["maceta1"].riego_pendiente
+        assert estados_ciclo["maceta1"].dli_acumulado == 3.5
+        assert "sin lecturas" in estados_ciclo["maceta1"].alertas[0]
+
+
+def test_fragmento_colgado_se_corta_por_timeout(config_simulada, monkeypatch):
+    pytest.importorskip("requests")
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.timeout_seg = 0.5
+    coordinador = CoordinadorFragmentos(config_simulada)
+    coordinador.iniciar()
+    try:
+        # El proceso sigue vivo pero nunca contesta
+        monkeypatch.setattr(coordinador.conexiones[0], "send", lambda mensaje: None)
+        inicio = time.monotonic()
+        estados = coordinador.ciclo(60.0, datetime.now(), {})
+        demora = time.monotonic() - inicio
+    finally:
+        coordinador.detener()
+
+    assert demora < 5.0
+    assert "sin respuesta" in coordinador.caidos[0]
+    assert estados["maceta2"].alertas
+
+
+def test_fragmento_que_no_contesta_se_detiene_sin_matarlo(config_simulada, monkeypatch):
+    pytest.importorskip("requests")
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.timeout_seg = 0.5
+    coordinador = CoordinadorFragmentos(config_simulada)
+    coordinador.iniciar()
+    try:
+        proceso = coordinador.procesos[0]
+        monkeypatch.setattr(coordinador.conexiones[0], "send", lambda mensaje: None)
+        coordinador.ciclo(60.0, datetime.now(), {})
+    finally:
+        coordinador.detener()
+
+    # Termino solo y pudo apagar sus salidas
+    assert proceso.exitcode == 0
+    assert coordinador.matados == 0
+
+
+def test_fragmento_colgado_se_mata_con_las_salidas_apagadas(config_simulada):
+    # Regresion: con SIGKILL el finally del proceso no corria y las luces y
+    # ventiladores quedaban como estaban
+    pytest.importorskip("requests")
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.timeout_seg = 0.5
+    config_simulada.fragmentacion.timeout_parada_seg = 0.5
+    coordinador = CoordinadorFragmentos(config_simulada)
+    apagados = []
+    apagar_salidas = coordinador._apagar_salidas
+
+    def registrar(i):
+        hw = apagar_salidas(i)
+        apagados.append(dict(hw.registro_salidas.niveles))
+        return hw
+
+    coordinador._apagar_salidas = registrar
+    coordinador.iniciar()
+    try:
+        # Congelado: no atiende ni el pedido de detenerse
+        os.kill(coordinador.procesos[0].pid, signal.SIGSTOP)
+        coordinador.ciclo(60.0, datetime.now(), {})
+    finally:
+        coordinador.detener()
+
+    assert coordinador.matados == 1
+    assert "maceta1.luz" in apagados[0]
+    assert not any(apagados[0].values())
+
+
+def test_fragmento_caido_se_reinicia(config_simulada):
+    pytest.importorskip("requests")
+    config_simulada.fragmentacion.enabled = True
+    config_simulada.fragmentacion.timeout_seg = 5.0
+    config_simulada.fragmentacion.espera_reinicio_seg = 0.0
+    coordinador = CoordinadorFragmentos(config_simulada)
+    coordinador.iniciar()
+    try:
+        coordinador.procesos[0].kill()
+        coordinador.procesos[0].join(5.0)
+        coordinador.ciclo(60.0, datetime.now(), {})
+        assert 0 in coordinador.caidos
+        estados = coordinador.ciclo(60.0, datetime.now(), {})
+    finally:
+        coordinador.detener()
+
+    assert coordinador.reinicios == 1
+    assert not coordinador.caidos
+    assert estados["maceta1"].humedad_suelo_promedio_pct is not None
@@ -0,0 +1,41 @@
+import pytest
+
+# Solo corre donde estan los drivers de la Raspberry
+GPIO = pytest.importorskip("RPi.GPIO")
+pytest.importorskip("board")
+pytest.importorskip("adafruit_pcf8591")
+
+import hardware
+from fragmentacion import config_coordinador, config_fragmento, config_hw_fragmento
+
+
+@pytest.fixture
+def gpio(monkeypatch):
+    llamadas = {"setup": [], "cleanup": []}
+    monkeypatch.setattr(hardware.GPIO, "setup", lambda pin, *a, **k: llamadas["setup"].append(pin))
+    monkeypatch.setattr(hardware.GPIO, "output", lambda *a: None)
+    monkeypatch.setattr(hardware.GPIO, "cleanup", lambda pines=None: llamadas["cleanup"].append(pines))
+    monkeypatch.setattr(hardware.GPIO, "add_event_detect", lambda *a, **k: None)
+    monkeypatch.setattr(hardware.GPIO, "remove_event_detect", lambda *a: None)
+    return llamadas
+
+
+def test_cleanup_de_un_fragmento_no_toca_pines_ajenos(config_simulada, gpio):
+    config = config_hw_fragmento(config_fragmento(config_simulada, ["maceta1", "maceta2"]))
+    hw = hardware.HardwareManager(config)
+    hw._inicializar_gpio()
+    hw.cleanup()
+
+    # Solo las luces del fragmento; ni la bomba (24) ni las valvulas
+    assert gpio["cleanup"] == [[26, 19]]
+
+
+def test_cleanup_del_coordinador_incluye_la_parada(config_simulada, gpio):
+    config_simulada.parada_emergencia.enabled = True
+    hw = hardware.HardwareManager(config_coordinador(config_simulada))
+    hw._inicializar_gpio()
+    hw.configurar_parada_emergencia(lambda instante: None)
+    hw.cleanup()
+
+    pines = gpio["cleanup"][0]
+    assert set(pines) == {config_simulada.bomba.gpio, 22, config_simulada.parada_emergencia.gpio}
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from lectura_adc import (
+    CONTROL_AUTOINCREMENTO,
+    CONTROL_SALIDA_ANALOGICA,
+    leer_canal_pcf8591,
+    leer_rafaga_pcf8591,
+)
+from simulacion import BusI2CSimulado, PCF8591Simulado
+
+DIRECCION = 0x48
+
+
+def bus_simulado() -> BusI2CSimulado:
+    return BusI2CSimulado({DIRECCION: PCF8591Simulado([10, 20, 30, 40])}, segundos_por_byte=0.0)
+
+
+class BusNumerado:
+    # Devuelve 0, 1, 2... en cada byte leido para ver que posiciones se usan
+    def __init__(self):
+        self.escrito = None
+        self.tomado = False
+
+    def try_lock(self):
+        self.tomado = True
+        return True
+
+    def unlock(self):
+        self.tomado = False
+
+    def writeto(self, direccion, datos):
+        self.escrito = bytes(datos)
+
+    def readfrom_into(self, direccion, buffer):
+        for i in range(len(buffer)):
+            buffer[i] = i
+
+
+def test_rafaga_descarta_el_byte_viejo_y_el_primer_barrido():
+    bus = BusNumerado()
+    muestras = leer_rafaga_pcf8591(bus, DIRECCION, 3)
+
+    assert bus.escrito == bytes([CONTROL_SALIDA_ANALOGICA | CONTROL_AUTOINCREMENTO])
+    assert not bus.tomado
+    # Byte 0: conversion anterior; 1 a 4: primer barrido. Despues los canales
+    # vienen intercalados 0, 1, 2, 3, 0, 1...
+    assert muestras == [[5, 9, 13], [6, 10, 14], [7, 11, 15], [8, 12, 16]]
+
+
+def test_rafaga_del_pcf8591_simulado():
+    bus = bus_simulado()
+    # La conversion anterior queda en otro canal: no tiene que aparecer
+    assert leer_canal_pcf8591(bus, DIRECCION, 3) == 40
+
+    assert leer_rafaga_pcf8591(bus, DIRECCION, 4) == [[10] * 4, [20] * 4, [30] * 4, [40] * 4]
+
+
+def test_espera_a_que_otro_driver_suelte_el_bus():
+    bus = bus_simulado()
+    assert bus.try_lock()
+    threading.Timer(0.05, bus.unlock).start()
+
+    # El canal 2 del PCF8591 simulado esta fijo en 30
+    assert leer_canal_pcf8591(bus, DIRECCION, 2) == 30
+    # Y queda libre despues de la lectura
+    assert bus.try_lock()
+
+
+def test_bus_tomado_falla_con_timeout_sin_quemar_cpu(monkeypatch):
+    # Regresion: _tomar_bus giraba sobre try_lock hasta que se liberara
+    monkeypatch.setattr("lectura_adc.TIMEOUT_BUS_SEG", 0.1)
+    bus = bus_simulado()
+    assert bus.try_lock()
+
+    inicio_cpu = time.process_time()
+    with pytest.raises(TimeoutError):
+        leer_canal_pcf8591(bus, DIRECCION, 0)
+    assert time.process_time() - inicio_cpu < 0.05
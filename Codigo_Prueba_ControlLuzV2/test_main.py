@@ -0,0 +1,63 @@
+import os
+import signal
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+import main
+from senales import ControlSenales
+
+
+def ejecutar_con_senales(config, monkeypatch, senales_a_mandar):
+    # Manda las senales de verdad apenas se pide el primer riego, con el
+    # suelo simulado debajo del umbral desde el arranque
+    senales = ControlSenales()
+    solicitar = main.MaquinaRiego.solicitar
+
+    def solicitar_y_senalar(maquina, maceta):
+        pedido = solicitar(maquina, maceta)
+        for senal in senales_a_mandar:
+            os.kill(os.getpid(), senal)
+        return pedido
+
+    monkeypatch.setattr(main.MaquinaRiego, "solicitar", solicitar_y_senalar)
+    senales.instalar()
+    try:
+        inicio = time.monotonic()
+        recargar = main.ejecutar(config, senales, {}, ciclos=3)
+        return recargar, time.monotonic() - inicio
+    finally:
+        senales.restaurar()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="sin SIGHUP")
+def test_recarga_termina_el_riego_en_curso(config_simulada, monkeypatch, capsys):
+    # Regresion: SIGHUP cancelaba el riego a mitad de camino
+    recargar, _ = ejecutar_con_senales(config_simulada, monkeypatch, [signal.SIGHUP])
+    salida = capsys.readouterr().out
+
+    assert recargar
+    assert "Se termina el riego en curso" in salida
+    assert "Riegos completos: 1" in salida
+
+
+def test_sigterm_corta_enseguida_y_apaga_todo(config_simulada, monkeypatch, capsys):
+    recargar, demora = ejecutar_con_senales(config_simulada, monkeypatch, [signal.SIGTERM])
+    salida = capsys.readouterr().out
+
+    assert not recargar
+    assert demora < 10.0
+    # El riego no se espera: se corta y se apagan las salidas
+    assert "Riegos completos: 0" in salida
+    assert "Sistema detenido y GPIO liberados" in salida
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="sin SIGHUP")
+def test_sigterm_durante_una_recarga_no_espera_el_riego(config_simulada, monkeypatch, capsys):
+    recargar, _ = ejecutar_con_senales(config_simulada, monkeypatch, [signal.SIGHUP, signal.SIGTERM])
+    salida = capsys.readouterr().out
+
+    assert not recargar
+    assert "Riegos completos: 0" in salida
@@ -0,0 +1,57 @@
+import asyncio
+import re
+import signal
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+import main_async
+from senales import ControlSenales
+
+
+def ejecutar(config, senales=None, ciclos=2):
+    return asyncio.run(main_async.ejecutar_async(config, senales or ControlSenales(), {}, ciclos))
+
+
+@pytest.mark.parametrize("seccion", ["tareas", "fragmentacion", "presupuesto"])
+def test_rechaza_lo_que_el_modo_async_no_soporta(config_simulada, seccion):
+    # Regresion: se ignoraban sin avisar
+    getattr(config_simulada, seccion).enabled = True
+
+    with pytest.raises(ValueError, match=seccion):
+        ejecutar(config_simulada)
+
+
+def test_corre_y_riega(config_simulada, capsys):
+    assert not ejecutar(config_simulada, ciclos=3)
+
+    salida = capsys.readouterr().out
+    # El suelo simulado arranca debajo del umbral de maceta1
+    assert int(re.search(r"Riegos completos: (\d+)", salida).group(1)) >= 1
+    assert "Sistema detenido y GPIO liberados" in salida
+
+
+def test_parada_espera_la_llamada_en_curso_antes_de_liberar_el_hardware(config_simulada, monkeypatch):
+    # Regresion: la tarea de to_thread se cancelaba pero el hilo seguia, y el
+    # apagado liberaba el hardware con la llamada todavia corriendo
+    senales = ControlSenales()
+    eventos = []
+
+    def guardar_lento(registro, estados, ahora):
+        senales._manejar(signal.SIGTERM, None)
+        time.sleep(0.3)
+        eventos.append("guardar")
+
+    cleanup = main_async.AsyncHardwareManager.cleanup
+
+    def cleanup_anotado(ahw):
+        eventos.append("cleanup")
+        cleanup(ahw)
+
+    monkeypatch.setattr(main_async.RegistroTelemetria, "guardar", guardar_lento)
+    monkeypatch.setattr(main_async.AsyncHardwareManager, "cleanup", cleanup_anotado)
+
+    assert not ejecutar(config_simulada, senales)
+    assert eventos == ["guardar", "cleanup"]
@@ -0,0 +1,88 @@
+import pytest
+
+from models import MuestreoADC
+from muestreo_continuo import MuestreadorContinuo
+
+
+class RelojManual:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+
+class SensoresFalsos:
+    # Lux y humedad fijos hasta que se "desconectan" (devuelven None)
+    def __init__(self):
+        self.conectados = True
+
+    def leer_lux(self, nombre_maceta):
+        return 19318.5 if self.conectados else None
+
+    def leer_humedad(self, adc, canal):
+        return MuestreoADC(raw=156, muestras=10, varianza=0.5) if self.conectados else None
+
+    def estados_disyuntores(self, maceta):
+        return []
+
+
+@pytest.fixture
+def muestreador(config_simulada):
+    config_simulada.muestreo.enabled = True
+    config_simulada.global_config.modo_lectura_adc = "canal"
+    config_simulada.macetas["maceta1"].dht.enabled = False
+    return MuestreadorContinuo(SensoresFalsos(), config_simulada, reloj=RelojManual())
+
+
+def correr_hasta(m: MuestreadorContinuo, hasta: float) -> None:
+    while m.reloj.t < hasta:
+        m.reloj.t += m.sondear() or 1.0
+
+
+def test_con_sensores_vivos_se_usa_la_media_de_la_ventana(muestreador):
+    correr_hasta(muestreador, 600.0)
+    lecturas = muestreador.lecturas_maceta("maceta1", muestreador.config.macetas["maceta1"], 600.0)
+
+    assert lecturas["lux"] == 19318.5
+    assert lecturas["humedad_raw_1"] == 156
+
+
+def test_sensor_caido_no_repite_su_ultimo_valor_para_siempre(muestreador):
+    # Regresion: con el BH1750 y el ADC desconectados al mediodia, a la
+    # medianoche seguia el lux del mediodia (y el DLI sumando toda la noche)
+    maceta = muestreador.config.macetas["maceta1"]
+    correr_hasta(muestreador, 60.0)
+    muestreador.hw.conectados = False
+
+    correr_hasta(muestreador, 60.0 + 12 * 3600)
+    lecturas = muestreador.lecturas_maceta("maceta1", maceta, 3600.0)
+
+    assert lecturas["lux"] is None
+    assert lecturas["humedad_raw_1"] is None
+    assert lecturas["humedad_raw_2"] is None
+    assert muestreador.resumen("maceta1", "lux", 3600.0) is None
+
+
+def test_la_ultima_muestra_vale_hasta_la_edad_maxima(muestreador):
+    maceta = muestreador.config.macetas["maceta1"]
+    max_edad_lux = muestreador.config.muestreo.max_edad_lux_seg
+    correr_hasta(muestreador, 10.0)
+    muestreador.hw.conectados = False
+    ultima = muestreador.buffers[("maceta1", "lux")].ultimo()[0]
+
+    muestreador.reloj.t = ultima + max_edad_lux
+    assert muestreador.lecturas_maceta("maceta1", maceta, max_edad_lux)["lux"] == 19318.5
+
+    muestreador.reloj.t = ultima + max_edad_lux + 1.0
+    assert muestreador.lecturas_maceta("maceta1", maceta, max_edad_lux)["lux"] is None
+
+
+def test_ventana_sin_muestras_da_none(muestreador):
+    correr_hasta(muestreador, 10.0)
+    muestreador.hw.conectados = False
+    muestreador.reloj.t += 30.0
+
+    # La ultima muestra todavia es vigente pero no cae en los ultimos 5 s
+    assert muestreador.resumen("maceta1", "lux", 5.0) is None
+    assert muestreador.resumen("maceta1", "lux", 60.0) is not None
@@ -0,0 +1,67 @@
+import pytest
+
+from parada_emergencia import LATENCIA_MAX_MS, ParadaEmergencia
+from reloj import RelojVirtual
+from simulacion import SimulatedHardwareManager
+
+
+@pytest.fixture
+def hw(config_simulada):
+    config_simulada.parada_emergencia.enabled = True
+    for maceta in config_simulada.macetas.values():
+        maceta.valvula.enabled = True
+        maceta.ventilador.enabled = True
+    hw = SimulatedHardwareManager(config_simulada, RelojVirtual())
+    hw.inicializar()
+    yield hw
+    hw.cleanup()
+
+
+def encender_todo(hw) -> None:
+    hw.set_bomba(True)
+    for maceta in hw.config.macetas.values():
+        hw.set_luz_maceta(maceta, True)
+        hw.set_valvula_maceta(maceta, True)
+        hw.set_ventilador_maceta(maceta, True)
+
+
+def test_pulsador_corta_todas_las_salidas_a_tiempo(hw):
+    parada = ParadaEmergencia(hw, hw.config.parada_emergencia)
+    avisos = []
+    parada.al_activar(lambda: avisos.append(1))
+    parada.iniciar()
+    encender_todo(hw)
+    assert all(hw.registro_salidas.niveles.values())
+
+    hw.presionar_parada_emergencia()
+    assert parada.evento.wait(5.0)
+
+    niveles = hw.registro_salidas.niveles
+    assert {"bomba", "maceta1.luz", "maceta1.valvula", "maceta1.ventilador"} <= set(niveles)
+    assert not any(niveles.values())
+    assert parada.latencia_ms < LATENCIA_MAX_MS
+    assert avisos == [1]
+
+    # Congeladas hasta reiniciar: el control ya no las puede volver a prender
+    encender_todo(hw)
+    assert not any(hw.registro_salidas.niveles.values())
+
+
+def test_pulsador_simulado_a_tiempo_programado(config_simulada):
+    config_simulada.parada_emergencia.enabled = True
+    config_simulada.simulacion.parada_emergencia_seg = 30.0
+    reloj = RelojVirtual()
+    hw = SimulatedHardwareManager(config_simulada, reloj)
+    hw.inicializar()
+    parada = ParadaEmergencia(hw, config_simulada.parada_emergencia)
+    parada.iniciar()
+    encender_todo(hw)
+    try:
+        # El reloj salta hasta el pulsador sin esperar 30 s reales
+        assert reloj.esperar(parada.evento, 60.0)
+    finally:
+        hw.cleanup()
+
+    assert 30.0 <= reloj.monotonic() < 60.0
+    assert not any(hw.registro_salidas.niveles.values())
+    assert parada.latencia_ms < LATENCIA_MAX_MS
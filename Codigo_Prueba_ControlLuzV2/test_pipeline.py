@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime
+
+from models import PipelineConfig
+from pipeline import BLOQUEAR, DESCARTAR_VIEJO, ColaAcotada, PipelineSalidas
+
+
+def test_descartar_viejo_se_queda_con_lo_mas_nuevo():
+    cola = ColaAcotada(2, DESCARTAR_VIEJO)
+    for x in range(5):
+        cola.poner(x)
+
+    assert list(cola.elementos) == [3, 4]
+    assert cola.descartados == 3
+
+
+def test_bloquear_espera_a_que_haya_lugar():
+    cola = ColaAcotada(1, BLOQUEAR, timeout_seg=5.0)
+    cola.poner(0)
+    threading.Timer(0.1, cola.sacar).start()
+    cola.poner(1)
+
+    assert list(cola.elementos) == [1]
+    assert cola.bloqueos == 1
+    assert cola.descartados == 0
+
+
+def test_bloquear_no_espera_mas_que_el_timeout():
+    # Regresion: con la SD trabada el control quedaba esperando para siempre
+    cola = ColaAcotada(1, BLOQUEAR, timeout_seg=0.2)
+    cola.poner(0)
+    inicio = time.monotonic()
+    cola.poner(1)
+
+    assert time.monotonic() - inicio < 2.0
+    assert list(cola.elementos) == [1]
+    assert cola.descartados == 1
+
+
+def test_bloquear_se_corta_al_pedir_detener():
+    detener = threading.Event()
+    cola = ColaAcotada(1, BLOQUEAR, timeout_seg=60.0, detener=detener)
+    cola.poner(0)
+    threading.Timer(0.1, detener.set).start()
+    inicio = time.monotonic()
+    cola.poner(1)
+
+    assert time.monotonic() - inicio < 2.0
+    assert cola.descartados == 1
+
+
+def test_pipeline_persiste_en_orden_y_vacia_al_detener():
+    persistidos = []
+    subidos = []
+    liberar = threading.Event()
+
+    def persistir(estados, ahora):
+        liberar.wait(5.0)
+        persistidos.append(estados["n"])
+
+    pipeline = PipelineSalidas(
+        PipelineConfig(enabled=True, capacidad_persistencia=10, capacidad_subida=1),
+        persistir,
+        lambda estados, ahora: subidos.append(estados["n"])
+    )
+    pipeline.iniciar()
+    estados = {"n": 0}
+    for n in range(3):
+        estados["n"] = n
+        pipeline.persistir(estados, datetime.now())
+    # Se encolo una copia: cambiar los estados despues no afecta lo encolado
+    estados["n"] = 99
+    liberar.set()
+    pipeline.subir({"n": 7}, datetime.now())
+    pipeline.detener()
+
+    assert persistidos == [0, 1, 2]
+    assert subidos == [7]
+    assert pipeline.persistencia.procesados == 3
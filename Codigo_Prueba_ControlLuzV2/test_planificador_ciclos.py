@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta
+
+from planificador_ciclos import PlanificadorCiclos
+
+
+class RelojManual:
+    # El tiempo solo avanza con esperar() o a mano con avanzar()
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+    def now(self) -> datetime:
+        return datetime(2026, 10, 18, 0, 0, 0) + timedelta(seconds=self.t)
+
+    def avanzar(self, segundos: float) -> None:
+        self.t += segundos
+
+    def esperar(self, evento, segundos: float) -> bool:
+        if evento is not None and evento.is_set():
+            return True
+        self.t += segundos
+        return False
+
+
+def planificador(politica: str, **kwargs) -> PlanificadorCiclos:
+    return PlanificadorCiclos(60.0, RelojManual(), politica, alinear=False, **kwargs)
+
+
+def test_los_plazos_no_acumulan_la_duracion_del_ciclo():
+    p = planificador("saltar")
+    programados = []
+    for _ in range(4):
+        programados.append(p.esperar().programado)
+        p.reloj.avanzar(7.0)
+        p.terminar_ciclo()
+
+    assert programados == [0.0, 60.0, 120.0, 180.0]
+    assert p.sobrepasados == 0
+
+
+def test_saltar_descarta_los_plazos_vencidos():
+    p = planificador("saltar")
+    p.esperar()
+    p.reloj.avanzar(150.0)
+    p.terminar_ciclo()
+
+    info = p.esperar()
+
+    assert info.programado == 180.0
+    assert info.dt_segundos == 180.0
+    assert p.saltados == 2
+    assert p.sobrepasados == 1
+
+
+def test_saltar_tolera_un_atraso_chico():
+    # Regresion: pasarse unos ms del plazo perdia un intervalo entero
+    p = planificador("saltar", tolerancia_seg=1.0)
+    p.esperar()
+    p.reloj.avanzar(60.005)
+    p.terminar_ciclo()
+
+    info = p.esperar()
+
+    assert info.programado == 60.0
+    assert abs(info.retraso_seg - 0.005) < 1e-9
+    assert p.saltados == 0
+    # El ciclo siguiente vuelve a la grilla
+    assert p.proximo == 120.0
+
+
+def test_recuperar_corre_los_ciclos_atrasados_seguidos():
+    p = planificador("recuperar")
+    p.esperar()
+    p.reloj.avanzar(150.0)
+    p.terminar_ciclo()
+
+    infos = [p.esperar() for _ in range(3)]
+
+    assert [info.programado for info in infos] == [60.0, 120.0, 180.0]
+    assert [info.dt_segundos for info in infos] == [60.0, 60.0, 60.0]
+    assert p.reloj.monotonic() == 180.0
+    assert p.saltados == 0
+
+
+def test_esperar_detenido_no_arranca_ni_cuenta_el_ciclo():
+    detener = threading.Event()
+    p = planificador("saltar", detener=detener)
+    p.esperar()
+    detener.set()
+
+    assert p.esperar() is None
+    assert p.ciclos == 1
+
+
+def test_el_temporizador_avanza_durante_la_espera():
+    p = planificador("saltar")
+    p.esperar()
+    llamadas = []
+
+    def avanzar():
+        llamadas.append(p.reloj.monotonic())
+        return 25.0 if len(llamadas) < 3 else None
+
+    p.esperar(avanzar)
+
+    assert llamadas == [0.0, 25.0, 50.0]
+    assert p.reloj.monotonic() == 60.0
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from control import procesar_maceta
+from models import MacetaEstado
+from planificador_dht import PlanificadorDHT
+
+
+class RelojManual:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+
+class DHTFalso:
+    # Devuelve la lectura fija mientras funciona; si no, como un fallo de checksum
+    def __init__(self):
+        self.funciona = True
+        self.lecturas = 0
+
+    def leer_dht(self, nombre_maceta):
+        self.lecturas += 1
+        return (24.5, 61.0) if self.funciona else (None, None)
+
+
+def crear(config, tipo="DHT22", periodo_seg=2.0):
+    maceta = config.macetas["maceta1"]
+    maceta.dht.enabled = True
+    maceta.dht.tipo = tipo
+    config.global_config.periodo_dht_seg = periodo_seg
+    return PlanificadorDHT(DHTFalso(), config, RelojManual())
+
+
+def test_respeta_el_periodo_minimo_del_sensor(config_simulada):
+    planificador = crear(config_simulada, tipo="DHT22", periodo_seg=0.5)
+    assert planificador.periodos["maceta1"] == 2.0
+
+    assert planificador.sondear() == 2.0
+    planificador.reloj.t = 1.0
+    planificador.sondear()
+    assert planificador.hw.lecturas == 1
+
+    assert crear(config_simulada, tipo="DHT11", periodo_seg=0.5).periodos["maceta1"] == 1.0
+
+
+def test_un_fallo_conserva_la_ultima_lectura_y_reintenta_al_minimo(config_simulada):
+    planificador = crear(config_simulada, periodo_seg=30.0)
+    planificador.sondear()
+
+    planificador.hw.funciona = False
+    planificador.reloj.t = 30.0
+    # Reintento al periodo minimo del DHT22, no a los 30 s
+    assert planificador.sondear() == 2.0
+
+    lectura = planificador.ultima_lectura("maceta1")
+    assert lectura.fallos_consecutivos == 1
+    assert planificador.leer("maceta1") == (24.5, 61.0, 30.0)
+
+
+def test_lectura_vieja_se_descarta_con_alerta(config_simulada):
+    # Con el DHT fallando el planificador sigue dando la ultima lectura
+    # valida; el control la descarta pasado max_edad_dht_seg
+    planificador = crear(config_simulada)
+    global_config = config_simulada.global_config
+    maceta = config_simulada.macetas["maceta1"]
+    planificador.sondear()
+    planificador.hw.funciona = False
+
+    def procesar():
+        temperatura_c, humedad_ambiente_pct, edad_dht_seg = planificador.leer("maceta1")
+        lecturas = {
+            "temperatura_c": temperatura_c,
+            "humedad_ambiente_pct": humedad_ambiente_pct,
+            "edad_dht_seg": edad_dht_seg,
+        }
+        estado, _ = procesar_maceta(maceta, MacetaEstado(), lecturas, global_config, ahora=datetime(2026, 10, 18, 12))
+        return estado
+
+    planificador.reloj.t = global_config.max_edad_dht_seg - 1
+    assert procesar().temperatura_c == 24.5
+
+    planificador.reloj.t = global_config.max_edad_dht_seg + 1
+    estado = procesar()
+    assert estado.temperatura_c is None and estado.humedad_ambiente_pct is None
+    assert any("obsoleta" in alerta for alerta in estado.alertas)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from models import TareaConfig
+from planificador_tareas import PlanificadorTareas
+
+
+class RelojManual:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+    def now(self) -> datetime:
+        return datetime(2026, 10, 18, 0, 0, 0) + timedelta(seconds=self.t)
+
+    def esperar(self, evento, segundos: float) -> bool:
+        if evento is not None and evento.is_set():
+            return True
+        self.t += segundos
+        return False
+
+
+def test_cada_tarea_corre_a_su_periodo_y_por_prioridad():
+    reloj = RelojManual()
+    planificador = PlanificadorTareas(reloj, alinear=False)
+    corridas = []
+    planificador.agregar("subida", TareaConfig(60.0, prioridad=5), lambda info: corridas.append(("subida", reloj.t)))
+    planificador.agregar("lux", TareaConfig(20.0, prioridad=1), lambda info: corridas.append(("lux", reloj.t)))
+    planificador.agregar("apagada", TareaConfig(1.0, prioridad=0, enabled=False), lambda info: corridas.append(None))
+
+    planificador.ejecutar(lambda: reloj.t <= 60.0)
+
+    # Cuando vencen juntas corre primero la de menor prioridad
+    assert corridas == [("lux", 0.0), ("subida", 0.0), ("lux", 20.0), ("lux", 40.0), ("lux", 60.0), ("subida", 60.0)]
+
+
+def test_una_tarea_atrasada_saltea_los_plazos_vencidos():
+    reloj = RelojManual()
+    planificador = PlanificadorTareas(reloj, alinear=False)
+    corridas = []
+
+    def lenta(info):
+        corridas.append(reloj.t)
+        if len(corridas) == 1:
+            reloj.t += 35.0
+
+    planificador.agregar("lux", TareaConfig(10.0, prioridad=1), lenta)
+    planificador.ejecutar(lambda: reloj.t < 60.0)
+
+    tarea = planificador.tarea("lux")
+    assert corridas == [0.0, 35.0, 40.0, 50.0]
+    assert tarea.planificador.saltados == 2
+
+
+def test_un_error_se_cuenta_y_no_frena_las_otras_tareas():
+    reloj = RelojManual()
+    planificador = PlanificadorTareas(reloj, alinear=False)
+    corridas = []
+
+    def falla(info):
+        raise RuntimeError("sensor")
+
+    planificador.agregar("dht", TareaConfig(30.0, prioridad=0), falla)
+    planificador.agregar("lux", TareaConfig(30.0, prioridad=1), lambda info: corridas.append(reloj.t))
+    planificador.ejecutar(lambda: reloj.t <= 30.0)
+
+    assert planificador.tarea("dht").errores == 2
+    assert corridas == [0.0, 30.0]
+
+
+def test_los_temporizadores_acortan_la_espera():
+    reloj = RelojManual()
+    planificador = PlanificadorTareas(reloj, alinear=False)
+    planificador.agregar("control", TareaConfig(60.0, prioridad=0), lambda info: None)
+    avances = []
+
+    def riego():
+        avances.append(reloj.t)
+        return 15.0 if reloj.t < 45.0 else None
+
+    planificador.agregar_temporizador(riego)
+    planificador.ejecutar(lambda: reloj.t < 60.0)
+
+    assert avances == [0.0, 15.0, 30.0, 45.0]
@@ -0,0 +1,100 @@
+from collections import deque
+from datetime import datetime
+
+import pytest
+
+import presupuesto as modulo
+from models import PresupuestoConfig
+from presupuesto import REGISTRO, SENSORES, SUBIDA, PresupuestoCiclo
+
+
+class Cronometro:
+    # Reemplaza a perf_counter: el tiempo solo avanza cuando el test lo pide
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def cronometro(monkeypatch):
+    cronometro = Cronometro()
+    monkeypatch.setattr(modulo.time, "perf_counter", cronometro)
+    return cronometro
+
+
+def crear(ciclo_seg: float = 10.0, intervalo_seg: float = 60.0, **cambios) -> PresupuestoCiclo:
+    return PresupuestoCiclo(PresupuestoConfig(enabled=True, ciclo_seg=ciclo_seg, **cambios), intervalo_seg)
+
+
+def test_restante_descuenta_lo_transcurrido(cronometro):
+    presupuesto = crear(ciclo_seg=10.0)
+    presupuesto.iniciar_ciclo()
+    cronometro.t += 3.5
+
+    assert presupuesto.transcurrido() == pytest.approx(3.5)
+    assert presupuesto.restante() == pytest.approx(6.5)
+
+    # Nunca mas que el intervalo de lectura
+    assert crear(ciclo_seg=90.0, intervalo_seg=60.0).ciclo_seg == 60.0
+    assert crear(ciclo_seg=0.0, intervalo_seg=60.0).ciclo_seg == 60.0
+
+
+def test_ciclo_excedido_se_cuenta_y_recorta_lo_que_no_entra(cronometro):
+    presupuesto = crear(ciclo_seg=10.0, margen=1.0)
+
+    presupuesto.iniciar_ciclo()
+    with presupuesto.etapa("registro"):
+        cronometro.t += 4.0
+    with presupuesto.etapa("sensores"):
+        cronometro.t += 8.0
+    assert presupuesto.terminar_ciclo() == pytest.approx(1.2)
+    assert presupuesto.excedidos == 1
+
+    presupuesto.iniciar_ciclo()
+    cronometro.t += 7.0
+    # Los sensores corren siempre; el registro estimado en 4 s ya no entra
+    assert presupuesto.permitir("sensores", SENSORES)
+    assert not presupuesto.permitir("registro", REGISTRO)
+    # La subida nunca medida entra mientras quede algo
+    assert presupuesto.permitir("subida", SUBIDA)
+    assert presupuesto.terminar_ciclo() == pytest.approx(0.7)
+
+    assert presupuesto.excedidos == 1
+    assert presupuesto.recortes["registro"] == 1
+    assert presupuesto.uso_max == pytest.approx(1.2)
+    assert "recortado: registro" in presupuesto.describir_ciclo()
+
+
+def test_deshabilitado_permite_todo(cronometro):
+    presupuesto = PresupuestoCiclo(PresupuestoConfig(enabled=False, ciclo_seg=1.0), 60.0)
+    presupuesto.iniciar_ciclo()
+    with presupuesto.etapa("subida"):
+        cronometro.t += 5.0
+
+    assert presupuesto.permitir("subida", SUBIDA, bloquearia=True)
+    assert not presupuesto.recortes
+
+
+def test_deshabilitado_no_acorta_la_subida(config_simulada, cronometro, monkeypatch):
+    # Regresion: sin [presupuesto] la espera a ThingSpeak igual se recortaba
+    # a lo que quedaba del ciclo
+    pytest.importorskip("requests")
+    import main
+
+    timeouts = []
+    monkeypatch.setattr(
+        main, "persistir_y_subir",
+        lambda *args, timeout_subida_seg=5.0, **kwargs: timeouts.append(timeout_subida_seg)
+    )
+    presupuesto = PresupuestoCiclo(config_simulada.presupuesto, 1.0)
+    presupuesto.iniciar_ciclo()
+    cronometro.t += 0.9
+
+    main.registrar_y_subir_con_presupuesto(
+        config_simulada, None, None, presupuesto, deque(maxlen=2), {}, datetime.now()
+    )
+
+    assert not config_simulada.presupuesto.enabled
+    assert timeouts[-1] == 5.0
@@ -0,0 +1,142 @@
+import os
+from datetime import datetime, timedelta
+from itertools import product
+
+import pytest
+
+from models import MacetaEstado
+from registro_binario import (
+    ENCABEZADO,
+    REGISTRO,
+    EscritorBinario,
+    abrir_memmap,
+    iterar_registros,
+    leer_macetas,
+    rango_memmap,
+)
+
+INICIO = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def test_ida_y_vuelta_de_un_registro(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    ahora = datetime(2026, 10, 18, 12, 0, 0)
+    escritor = EscritorBinario(ruta)
+    escritor.escribir({
+        "maceta1": MacetaEstado(
+            humedad_suelo_raw_1=155,
+            humedad_suelo_1_pct=46.9,
+            humedad_suelo_promedio_pct=46.4,
+            lux=800.0,
+            luz_encendida=True,
+            alertas=["Lectura invalida de DHT"]
+        ),
+        "maceta2": MacetaEstado(riego_pendiente=True),
+    }, ahora)
+    escritor.cerrar()
+
+    maceta1, maceta2 = iterar_registros(ruta)
+
+    assert maceta1["instante"] == ahora
+    assert maceta1["maceta"] == "maceta1"
+    assert maceta1["humedad_raw_1"] == 155
+    # Regresion: el porcentaje se truncaba (46.9 quedaba en 46)
+    assert maceta1["humedad_pct_1"] == 47
+    assert maceta1["humedad_pct_promedio"] == 46
+    assert maceta1["humedad_pct_2"] is None
+    assert maceta1["lux"] == 800.0
+    assert maceta1["temperatura_c"] is None
+    assert maceta1["luz_encendida"] and not maceta1["riego_pendiente"]
+    assert maceta2["maceta"] == "maceta2"
+    assert maceta2["riego_pendiente"]
+
+
+def test_campos_sin_dato(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    escritor = EscritorBinario(ruta)
+    escritor.escribir({"maceta1": MacetaEstado(dli_acumulado=0.0)}, INICIO)
+    escritor.cerrar()
+
+    (registro,) = iterar_registros(ruta)
+
+    for campo in (
+        "lux", "temperatura_c", "humedad_ambiente_pct", "humedad_raw_1", "humedad_raw_2",
+        "humedad_pct_1", "humedad_pct_2", "humedad_pct_promedio",
+    ):
+        assert registro[campo] is None, campo
+    # 0 es un dato, no la marca de sin dato
+    assert registro["dli_acumulado"] == 0.0
+    assert not (registro["luz_encendida"] or registro["ventilador_encendido"] or registro["riego_pendiente"])
+
+
+def test_banderas_independientes(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    combinaciones = list(product((False, True), repeat=3))
+    escritor = EscritorBinario(ruta)
+    for i, (luz, ventilador, riego) in enumerate(combinaciones):
+        escritor.escribir({"maceta1": MacetaEstado(
+            luz_encendida=luz, ventilador_encendido=ventilador, riego_pendiente=riego
+        )}, INICIO + timedelta(minutes=i))
+    escritor.cerrar()
+
+    leidas = [
+        (r["luz_encendida"], r["ventilador_encendido"], r["riego_pendiente"]) for r in iterar_registros(ruta)
+    ]
+    assert leidas == combinaciones
+
+
+def test_reabrir_recorta_el_registro_a_medias(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    escritor = EscritorBinario(ruta)
+    escritor.escribir({"maceta1": MacetaEstado(lux=1.0), "maceta2": MacetaEstado(lux=2.0)}, INICIO)
+    escritor.cerrar()
+
+    # Corte de luz a mitad de una escritura
+    with open(ruta, "ab") as f:
+        f.write(b"\x01" * (REGISTRO.size // 2))
+    # La lectura ignora el pedazo
+    assert [r["lux"] for r in iterar_registros(ruta)] == [1.0, 2.0]
+
+    escritor = EscritorBinario(ruta)
+    assert os.path.getsize(ruta) == ENCABEZADO.size + 2 * REGISTRO.size
+    escritor.escribir({"maceta2": MacetaEstado(lux=3.0)}, INICIO + timedelta(minutes=1))
+    escritor.cerrar()
+
+    registros = list(iterar_registros(ruta))
+    assert [r["lux"] for r in registros] == [1.0, 2.0, 3.0]
+    # Se conservan los indices de las macetas del archivo
+    assert registros[-1]["maceta"] == "maceta2"
+    assert leer_macetas(ruta) == ["maceta1", "maceta2"]
+
+
+def test_archivo_de_otra_version_no_se_abre(tmp_path):
+    ruta = str(tmp_path / "telemetria.bin")
+    with open(ruta, "wb") as f:
+        f.write(b"x" * (ENCABEZADO.size + REGISTRO.size))
+
+    with pytest.raises(ValueError):
+        EscritorBinario(ruta)
+
+
+def test_rango_memmap_incluye_los_dos_extremos(tmp_path):
+    pytest.importorskip("numpy")
+    ruta = str(tmp_path / "telemetria.bin")
+    escritor = EscritorBinario(ruta)
+    assert len(abrir_memmap(ruta)) == 0
+
+    for minuto in range(5):
+        escritor.escribir({"maceta1": MacetaEstado(lux=float(minuto))}, INICIO + timedelta(minutes=minuto))
+    escritor.cerrar()
+    datos = abrir_memmap(ruta)
+
+    def lux(desde_min, hasta_min):
+        desde = INICIO + timedelta(minutes=desde_min)
+        hasta = INICIO + timedelta(minutes=hasta_min)
+        return [float(valor) for valor in rango_memmap(datos, desde, hasta)["lux"]]
+
+    assert lux(1, 3) == [1.0, 2.0, 3.0]
+    assert lux(-10, 0) == [0.0]
+    assert lux(4, 10) == [4.0]
+    # Entre dos registros, o fuera del archivo
+    assert lux(1.5, 1.9) == []
+    assert lux(10, 20) == []
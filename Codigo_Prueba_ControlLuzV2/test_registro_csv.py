@@ -0,0 +1,95 @@
+import csv
+import os
+from datetime import datetime, timedelta
+
+from models import MacetaEstado, RegistroCSVConfig
+from registro_csv import COLUMNAS_CSV, EscritorCSV, agregar_filas_csv
+
+INICIO = datetime(2026, 10, 18, 23, 0, 0)
+
+
+def estados(humedad: float = 40.0):
+    return {"maceta1": MacetaEstado(humedad_suelo_promedio_pct=humedad, dli_acumulado=1.0)}
+
+
+def leer(ruta):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_agrupa_filas_y_las_baja_al_llenar_el_buffer(tmp_path):
+    ruta = str(tmp_path / "registro.csv")
+    escritor = EscritorCSV(ruta, RegistroCSVConfig(enabled=True, filas_buffer=3, vaciado_seg=3600, fsync_seg=3600))
+
+    for i in range(2):
+        escritor.escribir(estados(), INICIO + timedelta(seconds=i))
+    assert len(escritor.filas_pendientes) == 2
+    assert len(leer(ruta)) <= 1
+
+    escritor.escribir(estados(), INICIO + timedelta(seconds=2))
+    assert len(leer(ruta)) == 4
+    assert escritor.vaciados == 1
+
+    # Lo que quedo en memoria se escribe al cerrar, con fsync
+    escritor.escribir(estados(), INICIO + timedelta(seconds=3))
+    escritor.cerrar()
+    assert len(leer(ruta)) == 5
+    assert escritor.filas == 4
+    assert escritor.fsyncs == 1
+
+
+def test_vacia_por_tiempo_con_la_hora_de_las_filas(tmp_path):
+    ruta = str(tmp_path / "registro.csv")
+    escritor = EscritorCSV(ruta, RegistroCSVConfig(enabled=True, filas_buffer=100, vaciado_seg=60, fsync_seg=120))
+
+    escritor.escribir(estados(), INICIO)
+    escritor.escribir(estados(), INICIO + timedelta(seconds=30))
+    assert escritor.vaciados == 0
+    escritor.escribir(estados(), INICIO + timedelta(seconds=60))
+    assert escritor.vaciados == 1 and escritor.fsyncs == 0
+    escritor.escribir(estados(), INICIO + timedelta(seconds=120))
+    assert escritor.vaciados == 2 and escritor.fsyncs == 1
+    escritor.cerrar()
+
+
+def test_rotacion_diaria_un_archivo_por_dia(tmp_path):
+    ruta = str(tmp_path / "registro.csv")
+    escritor = EscritorCSV(ruta, RegistroCSVConfig(enabled=True, filas_buffer=100, rotacion_diaria=True))
+
+    escritor.escribir(estados(40.0), INICIO)
+    escritor.escribir(estados(50.0), INICIO + timedelta(hours=2))
+    escritor.cerrar()
+
+    assert escritor.rotaciones == 1
+    ayer = leer(str(tmp_path / "registro_2026-10-18.csv"))
+    hoy = leer(str(tmp_path / "registro_2026-10-19.csv"))
+    assert ayer[0] == hoy[0] == COLUMNAS_CSV
+    assert [fila[7] for fila in ayer[1:]] == ["40.0"]
+    assert [fila[7] for fila in hoy[1:]] == ["50.0"]
+
+
+def test_csv_con_otras_columnas_se_aparta(tmp_path):
+    # Regresion: las filas nuevas de 16 columnas se agregaban debajo de un
+    # encabezado de 15 y pandas las leia corridas
+    ruta = str(tmp_path / "registro.csv")
+    viejo = [COLUMNAS_CSV[:-1], ["2026-10-17"] + [""] * 14]
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(viejo)
+
+    escritor = EscritorCSV(ruta, RegistroCSVConfig(enabled=True, filas_buffer=1))
+    escritor.escribir(estados(), INICIO)
+    escritor.cerrar()
+
+    assert leer(str(tmp_path / "registro_15_columnas.csv")) == viejo
+    filas = leer(ruta)
+    assert filas[0] == COLUMNAS_CSV
+    assert all(len(fila) == len(COLUMNAS_CSV) for fila in filas)
+
+    # Sin buffer igual, sin pisar lo apartado antes
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(viejo)
+    agregar_filas_csv(ruta, estados(), INICIO)
+
+    assert os.path.isfile(str(tmp_path / "registro_15_columnas_2.csv"))
+    assert leer(ruta)[0] == COLUMNAS_CSV
+    assert len(leer(ruta)) == 2
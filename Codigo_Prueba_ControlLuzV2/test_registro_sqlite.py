@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import MacetaEstado
+from registro_sqlite import AlmacenSQLite, ConsultaTelemetria
+
+INICIO = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def estado(humedad: float, luz: bool = True, riego: bool = False, dli: float = 1.0) -> MacetaEstado:
+    return MacetaEstado(
+        humedad_suelo_promedio_pct=humedad,
+        luz_encendida=luz,
+        riego_pendiente=riego,
+        dli_acumulado=dli
+    )
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "telemetria.db")
+
+
+def consultar(ruta):
+    consulta = ConsultaTelemetria(ruta)
+    try:
+        minutos = consulta.serie("maceta1", "humedad_pct_promedio", "minuto", INICIO, INICIO + timedelta(hours=2))
+        horas = consulta.serie("maceta1", "humedad_pct_promedio", "hora", INICIO, INICIO + timedelta(hours=2))
+        dias = consulta.dias("maceta1", INICIO.date(), INICIO.date())
+    finally:
+        consulta.cerrar()
+    return minutos, horas, dias
+
+
+def test_resumenes_por_minuto_hora_y_dia(ruta):
+    almacen = AlmacenSQLite(ruta, intervalo_seg=30.0)
+    almacen.guardar({"maceta1": estado(40.0)}, INICIO)
+    almacen.guardar({"maceta1": estado(50.0, riego=True, dli=1.5)}, INICIO + timedelta(seconds=30))
+    almacen.guardar({"maceta1": estado(60.0, dli=2.0)}, INICIO + timedelta(seconds=60))
+    almacen.cerrar()
+
+    minutos, horas, dias = consultar(ruta)
+
+    assert [fila[1:] for fila in minutos] == [(2, 45.0, 40.0, 50.0), (1, 60.0, 60.0, 60.0)]
+    assert horas[0][1:] == (3, 50.0, 40.0, 60.0)
+    assert dias[0]["dli"] == 2.0
+    assert dias[0]["horas_luz"] == pytest.approx(60.0 / 3600)
+    assert dias[0]["riegos"] == 1
+
+
+def test_instante_repetido_no_se_cuenta_dos_veces(ruta):
+    # Regresion: el INSERT OR REPLACE pisaba la lectura pero el resumen
+    # sumaba otra muestra (cantidad=2)
+    almacen = AlmacenSQLite(ruta, intervalo_seg=30.0)
+    almacen.guardar({"maceta1": estado(40.0)}, INICIO)
+    almacen.guardar({"maceta1": estado(50.0, riego=True)}, INICIO + timedelta(seconds=30))
+    almacen.guardar({"maceta1": estado(54.0, riego=True)}, INICIO + timedelta(seconds=30))
+    almacen.cerrar()
+
+    # Tambien tras un reinicio, cuando ya no esta la muestra en memoria
+    almacen = AlmacenSQLite(ruta, intervalo_seg=30.0)
+    almacen.guardar({"maceta1": estado(54.0, riego=True)}, INICIO + timedelta(seconds=30))
+    almacen.cerrar()
+
+    minutos, _, dias = consultar(ruta)
+
+    assert minutos[0][1:] == (2, 47.0, 40.0, 54.0)
+    assert dias[0]["horas_luz"] == pytest.approx(30.0 / 3600)
+    assert dias[0]["riegos"] == 1
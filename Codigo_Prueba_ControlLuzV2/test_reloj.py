@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import datetime
+
+from reloj import RelojVirtual
+from simulacion import SimulatedHardwareManager
+
+
+def test_sleep_avanza_justo_lo_pedido():
+    reloj = RelojVirtual(datetime(2026, 10, 18, 12, 0, 0))
+
+    reloj.sleep(3600)
+    reloj.sleep(0.5)
+
+    assert reloj.monotonic() == 3600.5
+    assert reloj.now() == datetime(2026, 10, 18, 13, 0, 0, 500000)
+
+
+def test_hilos_despiertan_en_orden_y_sin_retraso():
+    reloj = RelojVirtual()
+    despertares = []
+    anotado = threading.Event()
+    detener = threading.Event()
+
+    def periodico():
+        with reloj.participar():
+            anotado.set()
+            while not reloj.esperar(detener, 2.0):
+                despertares.append(reloj.monotonic())
+
+    hilo = threading.Thread(target=periodico)
+    hilo.start()
+    anotado.wait(5.0)
+    reloj.sleep(9.0)
+    assert reloj.monotonic() == 9.0
+    detener.set()
+    hilo.join(5.0)
+
+    assert despertares == [2.0, 4.0, 6.0, 8.0]
+
+
+def test_el_reloj_no_avanza_mientras_un_participante_trabaja():
+    # Regresion: el tiempo real del codigo (y el jitter) se multiplicaba por
+    # factor_tiempo y aparecian sobrepasos falsos
+    reloj = RelojVirtual()
+    detener = threading.Event()
+    anotado = threading.Event()
+
+    def esperar_largo():
+        with reloj.participar():
+            anotado.set()
+            reloj.esperar(detener, 10.0)
+
+    hilo = threading.Thread(target=esperar_largo)
+    hilo.start()
+    anotado.wait(5.0)
+
+    # Este hilo creo el reloj y "trabaja" sin esperar en el
+    time.sleep(0.05)
+    assert reloj.monotonic() == 0.0
+
+    reloj.sleep(1.0)
+    assert reloj.monotonic() == 1.0
+    detener.set()
+    hilo.join(5.0)
+
+
+def test_esperar_devuelve_true_si_se_levanta_el_evento():
+    reloj = RelojVirtual()
+    evento = threading.Event()
+    evento.set()
+
+    assert reloj.esperar(evento, 60.0)
+    assert reloj.monotonic() == 0.0
+    assert not reloj.esperar(None, 60.0)
+
+
+def test_cada_dispositivo_simulado_tiene_su_azar(config_simulada):
+    # Lo que sale del DHT no depende de cuantas veces se leyo el BH1750
+    lecturas = []
+    for leer_lux in (False, True):
+        hw = SimulatedHardwareManager(config_simulada, RelojVirtual())
+        hw.inicializar()
+        serie = []
+        for _ in range(20):
+            if leer_lux:
+                hw.leer_lux("maceta1")
+            serie.append(hw.leer_dht("maceta1"))
+        lecturas.append(serie)
+
+    assert lecturas[0] == lecturas[1]
@@ -0,0 +1,142 @@
+from contextlib import nullcontext
+
+import pytest
+
+from riego import BOMBEANDO, DRENANDO, REPOSO, VALVULA_ABIERTA, MaquinaRiego
+
+
+class RelojManual:
+    def __init__(self):
+        self.t = 0.0
+
+    def monotonic(self) -> float:
+        return self.t
+
+
+class SalidasFalsas:
+    # Anota (instante, salida, valor) de cada cambio
+    def __init__(self, reloj: RelojManual):
+        self.reloj = reloj
+        self.cambios = []
+
+    def lote_salidas(self):
+        return nullcontext()
+
+    def set_bomba(self, encendida: bool) -> None:
+        self.cambios.append((self.reloj.t, "bomba", encendida))
+
+    def set_valvula_maceta(self, maceta, abierta: bool) -> None:
+        self.cambios.append((self.reloj.t, maceta.nombre, abierta))
+
+
+@pytest.fixture
+def config(config_simulada):
+    config_simulada.global_config.delay_post_bomba_seg = 2.0
+    for maceta in config_simulada.macetas.values():
+        maceta.enabled = True
+        maceta.tiempo_riego_seg = 20.0
+    return config_simulada
+
+
+def maquina(config):
+    reloj = RelojManual()
+    salidas = SalidasFalsas(reloj)
+    return MaquinaRiego(config, salidas, reloj), salidas, reloj
+
+
+def correr(maquina_riego: MaquinaRiego, reloj: RelojManual) -> None:
+    # Avanza el reloj justo hasta cada transicion, como la espera entre ciclos
+    espera = maquina_riego.avanzar()
+    while espera is not None:
+        reloj.t += espera
+        espera = maquina_riego.avanzar()
+
+
+def test_sin_caudales_riega_de_a_una_maceta(config):
+    config.bomba.caudal_lpm = 0.0
+    m, salidas, reloj = maquina(config)
+    maceta1, maceta2 = config.macetas["maceta1"], config.macetas["maceta2"]
+
+    assert m.solicitar(maceta1) and m.solicitar(maceta2)
+    assert not m.solicitar(maceta1)
+    correr(m, reloj)
+
+    assert salidas.cambios == [
+        (0.0, "maceta1", True), (0.5, "bomba", True), (20.5, "bomba", False), (22.5, "maceta1", False),
+        (22.5, "maceta2", True), (23.0, "bomba", True), (43.0, "bomba", False), (45.0, "maceta2", False),
+    ]
+    assert m.riegos == 2
+    assert m.estado == REPOSO and not m.activa
+
+
+def test_los_estados_avanzan_sin_dormir(config):
+    config.bomba.caudal_lpm = 0.0
+    m, _, reloj = maquina(config)
+    m.solicitar(config.macetas["maceta1"])
+
+    assert m.avanzar() == 0.5
+    assert m.estado == VALVULA_ABIERTA
+    reloj.t = 0.5
+    assert m.avanzar() == 20.0
+    assert m.estado == BOMBEANDO
+    reloj.t = 20.5
+    assert m.avanzar() == 2.0
+    assert m.estado == DRENANDO
+
+
+def test_en_paralelo_la_bomba_se_reparte_y_cada_una_recibe_su_volumen(config):
+    # Bomba de 2 l/min para dos valvulas de 2 l/min: mientras riegan juntas
+    # cada una recibe 1 l/min. maceta1 (20 s solo = 0.667 l) termina a los
+    # 40 s; maceta2 (40 s solo = 1.333 l) sigue sola a 2 l/min otros 20 s.
+    config.bomba.caudal_lpm = 2.0
+    config.macetas["maceta2"].tiempo_riego_seg = 40.0
+    for maceta in config.macetas.values():
+        maceta.caudal_valvula_lpm = 2.0
+    m, salidas, reloj = maquina(config)
+
+    m.solicitar(config.macetas["maceta1"])
+    m.solicitar(config.macetas["maceta2"])
+    correr(m, reloj)
+
+    assert [(pytest.approx(t), salida, valor) for t, salida, valor in salidas.cambios] == [
+        (0.0, "maceta1", True), (0.0, "maceta2", True), (0.5, "bomba", True),
+        (40.5, "maceta1", False), (60.5, "bomba", False), (62.5, "maceta2", False),
+    ]
+    assert m.riegos == 2
+    assert m.volumen_l == pytest.approx(2.0 * 20 / 60 + 2.0 * 40 / 60)
+
+
+def test_riego_cortado_se_retoma_con_lo_que_faltaba(config):
+    config.bomba.caudal_lpm = 0.0
+    m, _, reloj = maquina(config)
+    m.solicitar(config.macetas["maceta1"])
+    m.avanzar()
+    reloj.t = 0.5
+    m.avanzar()
+    reloj.t = 10.5
+
+    pendientes = m.pendientes()
+    assert pendientes["maceta1"] == pytest.approx(10 / 60)
+
+    # Reinicio: otra maquina retoma el volumen que faltaba
+    otra, salidas, reloj2 = maquina(config)
+    otra.reanudar(pendientes, config.macetas)
+    correr(otra, reloj2)
+    assert [cambio for cambio in salidas.cambios if cambio[1] == "bomba"] == [
+        (0.5, "bomba", True), (pytest.approx(10.5), "bomba", False)
+    ]
+
+
+def test_cancelar_apaga_la_bomba_antes_que_las_valvulas(config):
+    config.bomba.caudal_lpm = 0.0
+    m, salidas, reloj = maquina(config)
+    m.solicitar(config.macetas["maceta1"])
+    m.solicitar(config.macetas["maceta2"])
+    m.avanzar()
+    reloj.t = 5.0
+    m.avanzar()
+
+    m.cancelar()
+
+    assert salidas.cambios[-2:] == [(5.0, "bomba", False), (5.0, "maceta1", False)]
+    assert not m.activa and m.pendientes() == {}
@@ -0,0 +1,107 @@
+import threading
+
+from salidas_gpio import RegistroSalidas
+
+
+class GPIOFalso:
+    # Anota cada escritura como la haria GPIO.output con listas
+    def __init__(self):
+        self.escrituras = []
+
+    def __call__(self, pines, niveles):
+        self.escrituras.append(dict(zip(pines, niveles)))
+
+
+def crear():
+    gpio = GPIOFalso()
+    registro = RegistroSalidas(gpio)
+    for pin in (17, 22, 26):
+        registro.configurar(pin, 0, f"pin{pin}")
+    gpio.escrituras.clear()
+    return registro, gpio
+
+
+def test_solo_escribe_cuando_cambia_el_nivel():
+    registro, gpio = crear()
+    registro.fijar(17, 1)
+    registro.fijar(17, 1)
+    registro.fijar(22, 0)
+
+    assert gpio.escrituras == [{17: 1}]
+    assert registro.escrituras_evitadas == 2
+    assert registro.transiciones[17] == 1
+
+
+def test_lote_junta_los_cambios_en_una_escritura():
+    registro, gpio = crear()
+    with registro.lote():
+        registro.fijar(17, 1)
+        with registro.lote():
+            registro.fijar(22, 1)
+        # Nada sale hasta cerrar el lote de afuera
+        assert gpio.escrituras == []
+        registro.fijar(26, 1)
+        registro.fijar(26, 0)
+
+    # El ultimo nivel de cada pin, en una sola escritura (26 no cambio)
+    assert gpio.escrituras == [{17: 1, 22: 1}]
+    assert registro.niveles == {17: 1, 22: 1, 26: 0}
+
+
+def test_congelar_escribe_el_bloque_y_despues_bloquea_todo():
+    registro, gpio = crear()
+    registro.fijar(17, 1)
+    registro.fijar(22, 1)
+
+    with registro.congelar():
+        registro.fijar(17, 0)
+        registro.fijar(22, 0)
+
+    registro.fijar(17, 1)
+    with registro.lote():
+        registro.fijar(22, 1)
+
+    assert gpio.escrituras[-1] == {17: 0, 22: 0}
+    assert registro.niveles == {17: 0, 22: 0, 26: 0}
+    assert registro.congelado
+    assert registro.escrituras_bloqueadas == 2
+    assert "congeladas" in registro.resumen()
+
+
+def test_al_reiniciar_el_registro_nuevo_arranca_sin_congelar():
+    # La parada de emergencia vale hasta reiniciar el programa: el
+    # HardwareManager nuevo arma otro registro, que arranca sin congelar
+    registro, _ = crear()
+    with registro.congelar():
+        registro.fijar(17, 0)
+
+    nuevo, gpio = crear()
+    nuevo.fijar(17, 1)
+    assert not nuevo.congelado
+    assert gpio.escrituras == [{17: 1}]
+
+
+def test_congelar_espera_al_lote_de_otro_hilo():
+    # El lote de otro hilo termina entero antes de congelar; lo que llega
+    # despues queda bloqueado
+    registro, gpio = crear()
+    en_lote = threading.Event()
+    seguir = threading.Event()
+
+    def control():
+        with registro.lote():
+            registro.fijar(17, 1)
+            en_lote.set()
+            seguir.wait(5.0)
+
+    hilo = threading.Thread(target=control)
+    hilo.start()
+    en_lote.wait(5.0)
+    threading.Timer(0.05, seguir.set).start()
+    with registro.congelar():
+        registro.fijar(17, 0)
+    hilo.join(5.0)
+    registro.fijar(17, 1)
+
+    assert gpio.escrituras == [{17: 1}, {17: 0}]
+    assert registro.niveles[17] == 0
@@ -0,0 +1,50 @@
+import os
+import signal
+
+import pytest
+
+from senales import ControlSenales
+
+
+def test_salida_levanta_el_evento_y_avisa():
+    senales = ControlSenales()
+    avisos = []
+    senales.al_recibir(lambda: avisos.append(1))
+    senales._manejar(signal.SIGTERM, None)
+
+    assert senales.salir and not senales.recargar
+    assert senales.evento.is_set()
+    assert avisos == [1]
+
+    # Despues de salir el evento sigue levantado aunque se reinicie
+    senales.reiniciar()
+    assert senales.evento.is_set()
+    assert not senales.avisos
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="sin SIGHUP")
+def test_recarga_se_limpia_al_reiniciar():
+    senales = ControlSenales()
+    senales._manejar(signal.SIGHUP, None)
+
+    assert senales.recargar and not senales.salir
+    assert senales.evento.is_set()
+
+    senales.reiniciar()
+    assert not senales.recargar
+    assert not senales.evento.is_set()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="sin SIGHUP")
+def test_instalar_atiende_la_senal_real_y_restaurar_la_devuelve():
+    anterior = signal.getsignal(signal.SIGHUP)
+    senales = ControlSenales()
+    senales.instalar()
+    try:
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert senales.evento.wait(5.0)
+        assert senales.recargar
+    finally:
+        senales.restaurar()
+
+    assert signal.getsignal(signal.SIGHUP) is anterior